@@ -1,12 +1,16 @@
 import streamlit as st
 import pandas as pd
 import datetime
-import matplotlib.pyplot as plt
-from PIL import Image
+import os
+
+import assets
+import charts
+import storage_engines
+from session_ledger import DISPLAY_COLUMNS
 
 #Logo
-logo=Image.open("ZachTechs.jpg")
-st.image(logo, width=150)
+# Read and sized once per process instead of re-encoded on every rerun
+st.image(assets.image_bytes("ZachTechs.jpg", width=150), width=150)
 
 # Page configuration
 st.set_page_config(
@@ -15,90 +19,68 @@ st.set_page_config(
     layout="wide"
 )
 
-# Initialize session state for data persistence
-if 'expenses' not in st.session_state:
-    st.session_state.expenses = pd.DataFrame(columns=['Date', 'Category', 'Description', 'Amount', 'Type'])
+# Storage engine (see storage_engines.py): 'memory' keeps each session's
+# transactions in typed columns in session state; a persistent spec such as
+# 'sqlite:expenses.db' or 'journal:expenses.json' is shared by every session
+STORAGE = os.environ.get("EXPENSES_STORAGE", "memory")
+
+if 'engine' not in st.session_state:
+    st.session_state.engine = storage_engines.shared_engine(STORAGE)
+engine = st.session_state.engine
 
 
 def add_expense(date, category, description, amount, expense_type):
-    """Add a new expense/income to the dataframe"""
-    new_entry = {
-        'Date': date,
-        'Category': category,
-        'Description': description,
-        'Amount': amount,
-        'Type': expense_type
-    }
+    """Add a new expense/income to the storage engine"""
+    engine.add({'Date': date, 'Category': category, 'Description': description,
+                'Amount': amount, 'Type': expense_type})
 
-    # Convert to DataFrame and concatenate
-    new_df = pd.DataFrame([new_entry])
-    st.session_state.expenses = pd.concat([st.session_state.expenses, new_df], ignore_index=True)
 
-def delete_expense(index):
-    """Delete an expense by index"""
-    st.session_state.expenses = st.session_state.expenses.drop(index).reset_index(drop=True)
+def delete_expenses(ids):
+    """Delete the transactions with the given ids (one write); returns the number deleted"""
+    return engine.delete(ids)
 
 
 def get_summary():
     """Calculate summary statistics"""
-    if st.session_state.expenses.empty:
-        return 0, 0, 0
+    return engine.summary()
 
-    expenses = st.session_state.expenses[st.session_state.expenses['Type'] == 'Expense']
-    income = st.session_state.expenses[st.session_state.expenses['Type'] == 'Income']
 
-    total_expenses = expenses['Amount'].sum() if not expenses.empty else 0
-    total_income = income['Amount'].sum() if not income.empty else 0
-    balance = total_income - total_expenses
+def category_totals():
+    """Expense totals per category in the shape charts.py expects"""
+    totals = engine.category_totals()
+    return pd.DataFrame({'category': list(totals), 'total_amount': list(totals.values())},
+                        columns=['category', 'total_amount'])
 
-    return total_income, total_expenses, balance
 
+def monthly_totals():
+    """Month x type table of totals in the shape charts.py expects"""
+    columns = {trans_type: pd.Series(engine.month_totals(trans_type), dtype=float)
+               for trans_type in ('Expense', 'Income')}
+    table = pd.DataFrame({name: series for name, series in columns.items() if not series.empty})
+    return table.fillna(0).sort_index()
 
-def plot_expenses_by_category():
-    """Create a pie chart of expenses by category"""
-    if st.session_state.expenses.empty:
-        return None
 
-    expenses_df = st.session_state.expenses[st.session_state.expenses['Type'] == 'Expense']
+def history_frame():
+    """Rows for the history table and CSV export (dates as ISO text)"""
+    frame = engine.to_frame()
+    frame.columns = DISPLAY_COLUMNS
+    return frame
 
-    if expenses_df.empty:
-        return None
 
-    category_totals = expenses_df.groupby('Category')['Amount'].sum()
+def plot_expenses_by_category():
+    """Create a pie chart of expenses by category (PNG bytes)"""
+    if engine.count() == 0:
+        return None
 
-    fig, ax = plt.subplots(figsize=(8, 6))
-    ax.pie(category_totals.values, labels=category_totals.index, autopct='%1.1f%%', startangle=90)
-    ax.set_title('Expenses by Category')
-    return fig
+    return charts.category_pie_png(category_totals(), currency='KSH.')
 
 
 def plot_monthly_trend():
-    """Create a line chart of monthly expenses and income"""
-    if st.session_state.expenses.empty:
+    """Create a line chart of monthly expenses and income (PNG bytes)"""
+    if engine.count() == 0:
         return None
 
-    # Convert date and extract year-month
-    df = st.session_state.expenses.copy()
-    df['Date'] = pd.to_datetime(df['Date'])
-    df['Year-Month'] = df['Date'].dt.to_period('M').astype(str)
-
-    monthly_data = df.groupby(['Year-Month', 'Type'])['Amount'].sum().unstack(fill_value=0)
-
-    fig, ax = plt.subplots(figsize=(10, 6))
-
-    if 'Expense' in monthly_data.columns:
-        ax.plot(monthly_data.index, monthly_data['Expense'], marker='o', label='Expenses', color='red')
-    if 'Income' in monthly_data.columns:
-        ax.plot(monthly_data.index, monthly_data['Income'], marker='o', label='Income', color='green')
-
-    ax.set_title('Monthly Income vs Expenses')
-    ax.set_xlabel('Month')
-    ax.set_ylabel('Amount (KSH)')
-    ax.legend()
-    ax.tick_params(axis='x', rotation=45)
-    plt.tight_layout()
-
-    return fig
+    return charts.monthly_trend_png(monthly_totals(), currency='KSH')
 
 
 def main():
@@ -150,27 +132,41 @@ def main():
 
     with col1:
         st.subheader("Expense Distribution")
-        pie_chart = plot_expenses_by_category()
-        if pie_chart:
-            st.pyplot(pie_chart)
+        if charts.use_native_charts():
+            category_data = category_totals() if engine.count() else pd.DataFrame()
+            if not category_data.empty:
+                st.vega_lite_chart(category_data, charts.category_donut_spec(), width="stretch")
+            else:
+                st.info("No expense data to display")
         else:
-            st.info("No expense data to display")
+            pie_chart = plot_expenses_by_category()
+            if pie_chart:
+                st.image(pie_chart, width="stretch")
+            else:
+                st.info("No expense data to display")
 
     with col2:
         st.subheader("Monthly Trends")
-        trend_chart = plot_monthly_trend()
-        if trend_chart:
-            st.pyplot(trend_chart)
+        if charts.use_native_charts():
+            monthly_data = monthly_totals() if engine.count() else pd.DataFrame()
+            if not monthly_data.empty:
+                st.line_chart(monthly_data, x_label="Month", y_label="Amount (KSH)",
+                              color=charts.monthly_chart_colors(monthly_data))
+            else:
+                st.info("No data to display trends")
         else:
-            st.info("No data to display trends")
+            trend_chart = plot_monthly_trend()
+            if trend_chart:
+                st.image(trend_chart, width="stretch")
+            else:
+                st.info("No data to display trends")
 
     # Data table and management
     st.subheader("Transaction History")
 
-    if not st.session_state.expenses.empty:
-        # Convert date to string for display
-        display_df = st.session_state.expenses.copy()
-        display_df['Date'] = display_df['Date'].astype(str)
+    if engine.count():
+        # Dates are already ISO strings in the display frame
+        display_df = history_frame()
 
         # Add delete buttons
         display_df['Delete'] = False
@@ -183,15 +179,14 @@ def main():
                     default=False
                 )
             },
+            disabled=["ID"],
             hide_index=True,
             width="stretch"
         )
 
-        # Process deletions
+        # Process deletions: by id, all checked rows at once
         if edited_df['Delete'].any():
-            indices_to_delete = edited_df[edited_df['Delete'] == True].index
-            for idx in indices_to_delete:
-                delete_expense(idx)
+            delete_expenses(edited_df.loc[edited_df['Delete'], 'ID'])
             st.rerun()
 
         # Export options
@@ -199,7 +194,7 @@ def main():
 
         with col1:
             if st.button("📥 Export to CSV"):
-                csv = st.session_state.expenses.to_csv(index=False)
+                csv = history_frame().drop(columns='ID').to_csv(index=False)
                 st.download_button(
                     label="Download CSV",
                     data=csv,
@@ -210,8 +205,7 @@ def main():
         with col2:
             if st.button("🗑️ Clear All Data"):
                 if st.checkbox("I'm sure I want to delete all data"):
-                    st.session_state.expenses = pd.DataFrame(
-                        columns=['Date', 'Category', 'Description', 'Amount', 'Type'])
+                    engine.clear()
                     st.rerun()
 
     else:
@@ -232,8 +226,7 @@ def main():
                 {'Date': datetime.date(2024, 1, 20), 'Category': 'Freelance', 'Description': 'Web Design',
                  'Amount': 500, 'Type': 'Income'},
             ]
-            for data in sample_data:
-                add_expense(data['Date'], data['Category'], data['Description'], data['Amount'], data['Type'])
+            engine.add_many(sample_data)
             st.success("Sample data loaded! Scroll up to see the dashboard.")
             st.rerun()
 
@@ -1,21 +1,25 @@
 import streamlit as st
 import pandas as pd
 import datetime
-import matplotlib.pyplot as plt
-import sqlite3
-from contextlib import contextmanager
 import os
-
-
-# --- FIX: Register adapters and converters for date & datetime ---
-
-# Convert Python date → SQLite text
-sqlite3.register_adapter(datetime.date, lambda d: d.isoformat())
-sqlite3.register_adapter(datetime.datetime, lambda dt: dt.isoformat(" "))
-
-# Convert SQLite text → Python date/datetime
-sqlite3.register_converter("DATE", lambda s: datetime.date.fromisoformat(s.decode()))
-sqlite3.register_converter("TIMESTAMP", lambda s: datetime.datetime.fromisoformat(s.decode()))
+import uuid
+
+import budgets
+from expense_core import (
+    DB_FILE, add_category, add_sample_data, cashflow_stats, check_summary_totals,
+    clear_transactions, delete_budget, delete_category, delete_transaction, get_app_pool, get_budget_report,
+    get_cashflow, get_categories, get_dashboard_snapshot, get_history_page, get_write_queue, import_statement,
+    init_database, overspend_alert, pending_transactions, plot_balance, plot_expenses_by_category,
+    plot_monthly_trend, prepare_export, roll_budgets_forward, search_history, set_budget, submit_transaction,
+    sync_external_writes, take_write_failures,
+)
+from filters import PERIODS, TransactionFilter, period_range
+from query_cache import data_version, cache_stats
+import assets
+import cashflow
+import charts
+import perf
+from history import DEFAULT_PAGE_SIZE, PAGE_SIZE_OPTIONS, format_history_page
 
 
 # Page configuration
@@ -25,364 +29,99 @@ st.set_page_config(
     layout="wide"
 )
 
-# Database configuration
-DB_FILE = "expenses.db"
-INITIAL_CATEGORIES = {
-    "Expense": ["Food & Dining", "Transportation", "Entertainment", "Shopping",
-                "Bills & Utilities", "Healthcare", "Education", "Other"],
-    "Income": ["Salary", "Freelance", "Investment", "Gift", "Other"]
-}
-
-
-@contextmanager
-def get_db_connection():
-    """Context manager for database connections"""
-    conn = sqlite3.connect(DB_FILE,
-                           detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES
-                           )
-    conn.row_factory = sqlite3.Row  # Return rows as dictionaries
-    try:
-        yield conn
-    finally:
-        conn.close()
-
-
-def init_database():
-    """Initialize the database with required tables"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-
-        # Create transactions table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS transactions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date DATE NOT NULL,
-                category TEXT NOT NULL,
-                description TEXT NOT NULL,
-                amount REAL NOT NULL,
-                type TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-
-        # Create categories table for user customization
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS categories (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                type TEXT NOT NULL,
-                color TEXT,
-                icon TEXT
-            )
-        ''')
-
-        # Create budgets table for future extension
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS budgets (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                category TEXT NOT NULL,
-                monthly_limit REAL NOT NULL,
-                year_month TEXT NOT NULL,
-                UNIQUE(category, year_month)
-            )
-        ''')
-
-        # Create user settings table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS settings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                key TEXT NOT NULL UNIQUE,
-                value TEXT NOT NULL
-            )
-        ''')
-
-        # Insert default categories if not exists
-        for trans_type, categories in INITIAL_CATEGORIES.items():
-            for category in categories:
-                cursor.execute('''
-                    INSERT OR IGNORE INTO categories (name, type) 
-                    VALUES (?, ?)
-                ''', (category, trans_type))
-
-        # Set default currency
-        cursor.execute('''
-            INSERT OR IGNORE INTO settings (key, value) 
-            VALUES ('currency', 'KSH')
-        ''')
-
-        conn.commit()
-
-
-def add_transaction(date, category, description, amount, trans_type):
-    """Add a new transaction to the database"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO transactions (date, category, description, amount, type)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (date, category, description, amount, trans_type))
-        conn.commit()
-        return cursor.lastrowid
-
-
-def get_all_transactions():
-    """Get all transactions from database"""
-    with get_db_connection() as conn:
-        query = '''
-            SELECT id, date, category, description, amount, type, created_at
-            FROM transactions
-            ORDER BY date DESC, created_at DESC
-        '''
-        df = pd.read_sql_query(query, conn)
-
-        # Convert date columns to datetime
-        if not df.empty:
-            df['date'] = pd.to_datetime(df['date'])
-            df['created_at'] = pd.to_datetime(df['created_at'])
-
-        return df
-
-
-def delete_transaction(transaction_id):
-    """Delete a transaction by ID"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM transactions WHERE id = ?', (transaction_id,))
-        conn.commit()
-        return cursor.rowcount > 0
-
-
-def update_transaction(transaction_id, date, category, description, amount, trans_type):
-    """Update an existing transaction"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            UPDATE transactions 
-            SET date = ?, category = ?, description = ?, amount = ?, type = ?
-            WHERE id = ?
-        ''', (date, category, description, amount, trans_type, transaction_id))
-        conn.commit()
-        return cursor.rowcount > 0
-
-
-def get_categories(trans_type=None):
-    """Get categories from database"""
-    with get_db_connection() as conn:
-        if trans_type:
-            query = "SELECT name FROM categories WHERE type = ? ORDER BY name"
-            categories = pd.read_sql_query(query, conn, params=(trans_type,))
-        else:
-            query = "SELECT name, type FROM categories ORDER BY type, name"
-            categories = pd.read_sql_query(query, conn)
-        return categories
-
-
-def add_category(name, trans_type, color=None, icon=None):
-    """Add a new category"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        try:
-            cursor.execute('''
-                INSERT INTO categories (name, type, color, icon)
-                VALUES (?, ?, ?, ?)
-            ''', (name, trans_type, color, icon))
-            conn.commit()
-            return True
-        except sqlite3.IntegrityError:
-            return False  # Category already exists
-
-
-def delete_category(name):
-    """Delete a category"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM categories WHERE name = ?', (name,))
-        conn.commit()
-        return cursor.rowcount > 0
-
-
-def get_summary():
-    """Calculate summary statistics from database"""
-    with get_db_connection() as conn:
-        # Get total income
-        income_query = "SELECT COALESCE(SUM(amount), 0) as total FROM transactions WHERE type = 'Income'"
-        income_result = conn.execute(income_query).fetchone()
-        total_income = income_result['total']
-
-        # Get total expenses
-        expense_query = "SELECT COALESCE(SUM(amount), 0) as total FROM transactions WHERE type = 'Expense'"
-        expense_result = conn.execute(expense_query).fetchone()
-        total_expenses = expense_result['total']
-
-        balance = total_income - total_expenses
 
-        return float(total_income), float(total_expenses), float(balance)
+def session_key():
+    """Identifies this browser session to the write queue (for read-your-writes)"""
+    if 'session_key' not in st.session_state:
+        st.session_state.session_key = uuid.uuid4().hex
+    return st.session_state.session_key
 
 
-def get_category_summary():
-    """Get summary by category"""
-    with get_db_connection() as conn:
-        query = '''
-            SELECT 
-                category,
-                type,
-                SUM(amount) as total_amount,
-                COUNT(*) as transaction_count
-            FROM transactions
-            GROUP BY category, type
-            ORDER BY type, total_amount DESC
-        '''
-        return pd.read_sql_query(query, conn)
+def transaction_filter_controls():
+    """Period, type and category filters for the whole page; returns a TransactionFilter"""
+    with st.expander("🔍 Filters"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            period = st.selectbox("Period", PERIODS, key="filter_period")
+            start, end = period_range(period)
+            if period == "Custom":
+                today = datetime.date.today()
+                picked = st.date_input("Date range", (today.replace(day=1), today), key="filter_dates")
+                # Only the start date is set while the range is being picked
+                if len(picked) == 2:
+                    start, end = picked
+        with col2:
+            types = st.multiselect("Type", ["Expense", "Income"], key="filter_types")
+        with col3:
+            categories_df = get_categories()
+            if types:
+                categories_df = categories_df[categories_df['type'].isin(types)]
+            categories = st.multiselect("Category", sorted(set(categories_df['name'])), key="filter_categories")
+    # Sorted, so the same selection is the same cache key
+    return TransactionFilter(start, end, tuple(sorted(types)), tuple(sorted(categories)))
+
+
+def performance_panel():
+    """Spans and statement counts of this rerun, earlier reruns, and the optional profilers"""
+    with st.expander("⏱️ Performance"):
+        profile = perf.current()
+        if profile is not None:
+            result = profile.as_dict()
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("This rerun so far", f"{result['total_ms']:,.1f} ms")
+            with col2:
+                st.metric("SQL statements", result['queries'])
+            with col3:
+                st.metric("Spans", len(result['spans']))
+
+            spans = pd.DataFrame(result['spans'])
+            # Indent nested spans under their section
+            spans['name'] = spans['depth'].map(lambda depth: "\u2003" * depth) + spans['name']
+            st.dataframe(spans[['name', 'ms', 'queries', 'start_ms']], hide_index=True, width="stretch")
+            if result['statements']:
+                st.caption("Most frequent statements in this rerun")
+                st.dataframe(pd.DataFrame(result['statements']), hide_index=True, width="stretch")
+
+        history = perf.recent(session_key())
+        if history:
+            st.caption(f"Last {len(history)} reruns of this session")
+            trend = pd.DataFrame([{"rerun": i + 1, "total ms": result['total_ms'], "statements": result['queries']}
+                                  for i, result in enumerate(history)])
+            st.line_chart(trend, x="rerun", y=["total ms", "statements"])
+
+            previous = history[-1]
+            if previous['functions']:
+                st.caption("cProfile of the previous rerun (by cumulative time)")
+                st.dataframe(pd.DataFrame(previous['functions']), hide_index=True, width="stretch")
+            if previous['memory']:
+                st.caption(f"Memory in the previous rerun: peak {previous['memory']['peak_kb']:,.0f} KB "
+                           f"(tracemalloc, all sessions)")
+                st.dataframe(pd.DataFrame(previous['memory']['top']), hide_index=True, width="stretch")
 
-
-def get_monthly_summary():
-    """Get monthly summary"""
-    with get_db_connection() as conn:
-        query = '''
-            SELECT 
-                strftime('%Y-%m', date) as month,
-                type,
-                SUM(amount) as total_amount,
-                COUNT(*) as transaction_count
-            FROM transactions
-            GROUP BY month, type
-            ORDER BY month DESC
-        '''
-        return pd.read_sql_query(query, conn)
-
-
-def export_to_csv():
-    """Export all transactions to CSV"""
-    df = get_all_transactions()
-    if df.empty:
-        return None
-
-    # Format for export
-    export_df = df.copy()
-    export_df['date'] = export_df['date'].dt.strftime('%Y-%m-%d')
-    export_df['created_at'] = export_df['created_at'].dt.strftime('%Y-%m-%d %H:%M:%S')
-
-    return export_df.to_csv(index=False)
-
-
-def plot_expenses_by_category():
-    """Create a pie chart of expenses by category"""
-    category_summary = get_category_summary()
-
-    if category_summary.empty:
-        return None
-
-    expenses_df = category_summary[category_summary['type'] == 'Expense']
-
-    if expenses_df.empty or expenses_df['total_amount'].sum() == 0:
-        return None
-
-    fig, ax = plt.subplots(figsize=(8, 6))
-    custom_colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEAA7',
-                     '#DDA0DD', '#98D8C8', '#F7DC6F', '#BB8FCE', '#85C1E9']
-    colors = custom_colors[:len(expenses_df)]
-
-
-    wedges, texts, autotexts = ax.pie(
-        expenses_df['total_amount'],
-        labels=expenses_df['category'],
-        autopct=lambda p: f'{p:.1f}%\n(Ksh. {(p / 100) * expenses_df["total_amount"].sum():.0f})',
-        startangle=90,
-        colors=colors,
-        pctdistance=0.85
-    )
-
-    # Draw a circle in the center to make it a donut chart
-    centre_circle = plt.Circle((0, 0), 0.70, fc='white')
-    ax.add_artist(centre_circle)
-
-    for autotext in autotexts:
-        autotext.set_color('black')
-        autotext.set_fontweight('bold')
-        autotext.set_fontsize(9)
-
-    ax.set_title('Expenses by Category', fontweight='bold', pad=20)
-    return fig
-
-
-def plot_monthly_trend():
-    """Create a line chart of monthly expenses and income"""
-    monthly_summary = get_monthly_summary()
-
-    if monthly_summary.empty:
-        return None
-
-    # Pivot the data
-    pivot_df = monthly_summary.pivot(index='month', columns='type', values='total_amount').fillna(0)
-
-    fig, ax = plt.subplots(figsize=(10, 6))
-
-    if 'Expense' in pivot_df.columns and pivot_df['Expense'].sum() > 0:
-        ax.plot(pivot_df.index, pivot_df['Expense'], marker='o', label='Expenses',
-                color='#FF6B6B', linewidth=2, markersize=8)
-
-    if 'Income' in pivot_df.columns and pivot_df['Income'].sum() > 0:
-        ax.plot(pivot_df.index, pivot_df['Income'], marker='s', label='Income',
-                color='#51CF66', linewidth=2, markersize=8)
-
-    ax.set_title('Monthly Income vs Expenses', fontweight='bold')
-    ax.set_xlabel('Month')
-    ax.set_ylabel('Amount (Ksh)')
-    ax.legend()
-    ax.grid(True, alpha=0.3)
-    ax.tick_params(axis='x', rotation=45)
-
-    # Add value labels on points
-    for col in ['Expense', 'Income']:
-        if col in pivot_df.columns:
-            for i, (month, value) in enumerate(zip(pivot_df.index, pivot_df[col])):
-                if value > 0:
-                    ax.annotate(f'Ksh{value:,.0f}',
-                                xy=(i, value),
-                                xytext=(0, 10 if col == 'Expense' else -15),
-                                textcoords="offset points",
-                                ha='center',
-                                fontsize=8,
-                                color='#FF6B6B' if col == 'Expense' else '#51CF66',
-                                fontweight='bold')
-
-    plt.tight_layout()
-    return fig
-
-
-def add_sample_data():
-    """Add sample data for demonstration"""
-    sample_data = [
-        (datetime.date(2024, 1, 15), 'Salary', 'Monthly Salary', 3000, 'Income'),
-        (datetime.date(2024, 1, 16), 'Food & Dining', 'Groceries', 150, 'Expense'),
-        (datetime.date(2024, 1, 17), 'Transportation', 'Gas', 60, 'Expense'),
-        (datetime.date(2024, 1, 18), 'Entertainment', 'Movie', 35, 'Expense'),
-        (datetime.date(2024, 1, 20), 'Freelance', 'Web Design', 500, 'Income'),
-        (datetime.date(2024, 2, 1), 'Bills & Utilities', 'Electricity', 80, 'Expense'),
-        (datetime.date(2024, 2, 5), 'Salary', 'Monthly Salary', 3000, 'Income'),
-        (datetime.date(2024, 2, 10), 'Food & Dining', 'Restaurant', 75, 'Expense'),
-        (datetime.date(2024, 2, 15), 'Shopping', 'Clothes', 120, 'Expense'),
-    ]
-
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.executemany('''
-            INSERT INTO transactions (date, category, description, amount, type)
-            VALUES (?, ?, ?, ?, ?)
-        ''', sample_data)
-        conn.commit()
+        col1, col2 = st.columns(2)
+        with col1:
+            st.checkbox("Profile reruns with cProfile", key="perf_cprofile")
+        with col2:
+            st.checkbox("Trace memory allocations (tracemalloc)", key="perf_tracemalloc")
+        if perf.log_path():
+            st.caption(f"Every rerun is logged to {perf.log_path()}")
 
 
 def main():
     # Initialize database
+    perf.section("init")
     init_database()
+    # Writes made by the API server (another process) invalidate this process's cache
+    sync_external_writes()
 
     st.title("💰 Personal Expense Tracker ")
     st.markdown("Track your Transactions effortlessly!")
 
     # Sidebar for adding new entries
+    perf.section("sidebar")
     with st.sidebar:
-        st.sidebar.image("ZachTechs.jpg")
+        st.sidebar.image(assets.image_bytes("ZachTechs.jpg"))
         st.header("➕ Add New Transaction")
 
         with st.form("add_transaction", clear_on_submit=True):
@@ -401,8 +140,18 @@ def main():
 
             if submitted:
                 if amount > 0 and description.strip():
-                    transaction_id = add_transaction(date, category, description.strip(), amount, trans_type)
-                    st.success(f"✅ Transaction #{transaction_id} saved successfully!")
+                    ticket = submit_transaction(date, category, description.strip(), amount, trans_type,
+                                                session=session_key())
+                    if not ticket.done:
+                        st.success("✅ Transaction queued for saving!")
+                    else:
+                        st.success(f"✅ Transaction #{ticket.result} saved successfully!")
+                    if trans_type == "Expense":
+                        # Counts the amount in only while the row is still queued
+                        alert = overspend_alert(category, date, ticket)
+                        if alert:
+                            st.warning(f"⚠️ {alert.category} is over its {alert.year_month} budget: "
+                                       f"Ksh. {alert.spent:,.2f} of Ksh. {alert.limit:,.2f}")
                 else:
                     st.error("❌ Please enter a valid amount and description")
 
@@ -445,14 +194,76 @@ def main():
                             st.rerun()
                 else:
                     st.info("No categories to delete")
+
+        # Budgets
+        st.header("🎯 Budgets")
+        with st.expander("Monthly Limits"):
+            with st.form("budget_form", clear_on_submit=True):
+                budget_month = st.date_input("Month", datetime.date.today(), key="budget_month")
+                expense_categories = get_categories("Expense")['name'].tolist()
+                budget_category = st.selectbox("Category", expense_categories)
+                budget_limit = st.number_input("Monthly limit (Ksh)", min_value=0.0, step=100.0, format="%.2f")
+                if st.form_submit_button("Save Limit", width="stretch") and budget_category:
+                    set_budget(budget_category, budget_month, budget_limit)
+                    st.success(f"✅ {budget_category}: Ksh. {budget_limit:,.2f} for {budget_month:%B %Y}")
+
+            if st.button("⏩ Roll limits forward to this month", width="stretch"):
+                created = roll_budgets_forward()
+                st.info(f"Carried limits into {created} empty month(s)")
+
+        # Bulk import
+        st.header("📤 Import Statement")
+        with st.expander("Import CSV / OFX / QIF"):
+            with st.form("import_form", clear_on_submit=True):
+                statement = st.file_uploader("Statement file", type=["csv", "txt", "ofx", "qfx", "qif"])
+                unsigned_choice = st.radio(
+                    "Rows without a type are",
+                    ["Signed (negative = expense)", "All expenses", "All income"]
+                )
+                if st.form_submit_button("Import", width="stretch") and statement is not None:
+                    unsigned_type = {"All expenses": "Expense", "All income": "Income"}.get(
+                        unsigned_choice)
+                    progress_bar = st.progress(0.0, text="Importing...")
+
+                    def show_progress(report):
+                        progress_bar.progress(report.fraction_done,
+                                              text=f"{report.rows_read:,} rows · {report.rows_per_sec:,.0f} rows/s")
+
+                    report = import_statement(statement, unsigned_type, show_progress)
+                    if report.error:
+                        st.error(f"❌ {report.error}")
+                    else:
+                        st.success(f"✅ Imported {report.inserted:,} of {report.rows_read:,} rows "
+                                   f"in {report.elapsed:.1f}s ({report.rows_per_sec:,.0f} rows/s)")
+                    if report.duplicates:
+                        st.info(f"Skipped {report.duplicates:,} already-imported rows")
+                    if report.recategorized:
+                        st.info(f"{report.recategorized:,} rows with unknown categories were filed under 'Other'")
+                    if report.invalid:
+                        st.warning(f"{report.invalid:,} invalid rows skipped:\n\n" + "\n\n".join(report.errors))
         st.markdown("---")
         st.caption("© 2025 Expenses Tracker™ ")
         st.caption("@ Zach Techs ")
 
-    # Main content area
+    # Main content area: every query below is restricted to the filter in SQL
+    perf.section("filters")
+    transaction_filter = transaction_filter_controls()
+    perf.section("metrics")
     col1, col2, col3 = st.columns(3)
 
-    total_income, total_expenses, balance = get_summary()
+    # One query for every aggregate on the page
+    snapshot = get_dashboard_snapshot(transaction_filter)
+    total_income, total_expenses, balance = snapshot.total_income, snapshot.total_expenses, snapshot.balance
+
+    # Read-your-writes: count this session's rows that are still in the write queue
+    pending = pending_transactions(session_key(), transaction_filter)
+    if not pending.empty:
+        pending_totals = pending.groupby('type')['amount'].sum()
+        total_income += pending_totals.get('Income', 0.0)
+        total_expenses += pending_totals.get('Expense', 0.0)
+        balance = total_income - total_expenses
+    for failed in take_write_failures(session_key()):
+        st.error(f"❌ Could not save '{failed.record[2]}': {failed.error}")
 
     with col1:
         st.metric("💰 Total Income", f"Ksh. {total_income:,.2f}", delta=None)
@@ -464,86 +275,209 @@ def main():
         st.metric(f"{balance_icon} Balance", f"Ksh. {balance:,.2f}", delta=None, delta_color=balance_color)
 
     # Charts
-    if not get_all_transactions().empty:
+    perf.section("charts")
+    if not snapshot.empty:
         col1, col2 = st.columns(2)
 
         with col1:
             st.subheader("📊 Expense Distribution")
-            pie_chart = plot_expenses_by_category()
-            if pie_chart:
-                st.pyplot(pie_chart)
+            if charts.use_native_charts():
+                # Only the per-category totals are sent to the browser
+                category_data = charts.category_chart_data(snapshot.category_summary)
+                if not category_data.empty:
+                    st.vega_lite_chart(category_data, charts.category_donut_spec(), width="stretch")
+                else:
+                    st.info("No expense data to display")
             else:
-                st.info("No expense data to display")
+                pie_chart = plot_expenses_by_category(transaction_filter=transaction_filter)
+                if pie_chart:
+                    st.image(pie_chart, width="stretch")
+                else:
+                    st.info("No expense data to display")
 
         with col2:
             st.subheader("📈 Monthly Trends")
-            trend_chart = plot_monthly_trend()
-            if trend_chart:
-                st.pyplot(trend_chart)
+            if charts.use_native_charts():
+                monthly_data = charts.monthly_chart_data(snapshot.monthly_summary)
+                if not monthly_data.empty:
+                    st.line_chart(monthly_data, x_label="Month", y_label="Amount (Ksh)",
+                                  color=charts.monthly_chart_colors(monthly_data))
+                else:
+                    st.info("No data to display trends")
+            else:
+                trend_chart = plot_monthly_trend(transaction_filter=transaction_filter)
+                if trend_chart:
+                    st.image(trend_chart, width="stretch")
+                else:
+                    st.info("No data to display trends")
+
+        # Running balance of the whole ledger; the filter's dates only set the range shown
+        perf.section("cash flow")
+        st.subheader("💹 Balance Over Time")
+        freq = st.radio("Period", list(cashflow.FREQUENCIES), index=2, horizontal=True, key="cashflow_freq",
+                        format_func=lambda f: cashflow.FREQUENCIES[f][0], label_visibility="collapsed")
+        if charts.use_native_charts():
+            balance_data = charts.balance_chart_data(
+                get_cashflow(freq, start=transaction_filter.start, end=transaction_filter.end))
+            if not balance_data.empty:
+                st.line_chart(balance_data, x_label="Period", y_label="Amount (Ksh)")
+            else:
+                st.info("No transactions in this period")
+        else:
+            balance_chart = plot_balance(freq, transaction_filter.start, transaction_filter.end)
+            if balance_chart:
+                st.image(balance_chart, width="stretch")
             else:
-                st.info("No data to display trends")
+                st.info("No transactions in this period")
+        _, window, unit = cashflow.FREQUENCIES[freq]
+        st.caption(f"Balance of all transactions (filters set only the dates shown); "
+                   f"net flow averaged over the last {window} {unit}.")
+
+    # Budget vs actual: the filtered month if the filter ends in one, else this month
+    perf.section("budgets")
+    budget_month = budgets.month_key(transaction_filter.end or datetime.date.today())
+    budget_report = get_budget_report(budget_month)
+    if not budget_report.empty:
+        st.subheader(f"🎯 Budgets · {budget_month}")
+        for row in budget_report.itertuples(index=False):
+            col1, col2 = st.columns([4, 1])
+            with col1:
+                st.progress(min(row.used, 1.0),
+                            text=f"{row.category}: Ksh. {row.spent:,.2f} of Ksh. {row.limit:,.2f}")
+            with col2:
+                if row.over:
+                    st.markdown(f"🔴 **Ksh. {-row.remaining:,.2f} over**")
+                else:
+                    st.markdown(f"🟢 Ksh. {row.remaining:,.2f} left")
+                if st.button("✖", key=f"budget_del_{row.category}", help="Remove this limit"):
+                    delete_budget(row.category, budget_month)
+                    st.rerun()
 
     # Transaction History with Edit/Delete
+    perf.section("history")
     st.subheader("📋 Transaction History")
 
-    transactions_df = get_all_transactions()
-
-    if not transactions_df.empty:
-        # Format for display
-        display_df = transactions_df.copy()
-        display_df['date'] = display_df['date'].dt.strftime('%Y-%m-%d')
-        display_df['amount'] = display_df['amount'].apply(lambda x: f"Ksh. {x:,.2f}")
-        display_df = display_df[['id', 'date', 'type', 'category', 'description', 'amount']]
-
-
-
+    if not pending.empty:
+        st.caption(f"⏳ Saving {len(pending)} new transaction(s)...")
+        st.dataframe(pending, hide_index=True, width="stretch")
+
+    # Search: index lookups, not a scan of the history
+    search_text = st.text_input("🔎 Search transactions", key="history_search",
+                                placeholder="Description or category, e.g. groc nai").strip()
+    if search_text:
+        results = search_history(search_text, transaction_filter)
+        if results.empty:
+            st.info(f"No transactions match '{search_text}'.")
+        else:
+            st.caption(f"Best {len(results)} matches")
+            st.dataframe(
+                format_history_page(results)[['id', 'date_text', 'type_text', 'category', 'description', 'amount_text']]
+                .rename(columns={'id': 'ID', 'date_text': 'Date', 'type_text': 'Type', 'category': 'Category',
+                                 'description': 'Description', 'amount_text': 'Amount'}),
+                hide_index=True, width="stretch"
+            )
 
-        # Display with edit/delete options
-        for _, row in display_df.iterrows():
+    if not snapshot.empty:
+        # Page size and the cursor stack survive reruns; page_cursors[i] is the
+        # keyset cursor that starts page i (None for the newest page)
+        page_size = st.selectbox("Rows per page", PAGE_SIZE_OPTIONS,
+                                 index=PAGE_SIZE_OPTIONS.index(DEFAULT_PAGE_SIZE), key="history_page_size")
+        if st.session_state.get("history_cursors_for") != (page_size, transaction_filter):
+            st.session_state.history_cursors = [None]
+            st.session_state.history_cursors_for = (page_size, transaction_filter)
+        page_cursors = st.session_state.history_cursors
+        page_number = len(page_cursors)
+
+        page_df, next_cursor = get_history_page(page_size, page_cursors[-1], transaction_filter)
+        if page_df.empty and page_number > 1:
+            # The rows of this page were deleted; fall back to the first page
+            st.session_state.history_cursors = [None]
+            st.rerun()
+
+        # Format the whole page at once
+        display_df = format_history_page(page_df)
+
+        # Display with edit/delete options (at most page_size rows)
+        for row in display_df.itertuples(index=False):
             with st.container():
                 col1, col2, col3, col4, col5, col6, col7 = st.columns([1, 1, 2, 2, 3, 2, 2])
                 with col1:
-                    st.text(f"#{row['id']}")
+                    st.text(f"#{row.id}")
                 with col2:
-                    st.text(row['date'])
+                    st.text(row.date_text)
                 with col3:
-                    type_color = "🟢" if row['type'] == 'Income' else "🔴"
-                    st.text(f"{type_color} {row['type']}")
+                    st.text(row.type_text)
                 with col4:
-                    st.text(row['category'])
+                    st.text(row.category)
                 with col5:
-                    st.text(row['description'][:30] + ("..." if len(row['description']) > 30 else ""))
+                    st.text(row.short_description)
                 with col6:
-                    amount_color = "green" if row['type'] == 'Income' else "red"
-                    st.markdown(f"<span style='color:{amount_color}; font-weight:bold;'>{row['amount']}</span>",
+                    st.markdown(f"<span style='color:{row.amount_color}; font-weight:bold;'>{row.amount_text}</span>",
                                 unsafe_allow_html=True)
                 with col7:
                     col_edit, col_del = st.columns(2)
                     with col_edit:
-                        if st.button("✏️", key=f"edit_{row['id']}", help="Edit"):
-                            st.session_state[f"edit_{row['id']}"] = True
+                        if st.button("✏️", key=f"edit_{row.id}", help="Edit"):
+                            st.session_state[f"edit_{row.id}"] = True
                     with col_del:
-                        if st.button("🗑️", key=f"del_{row['id']}", help="Delete"):
-                            if delete_transaction(row['id']):
-                                st.success(f"Transaction #{row['id']} deleted!")
+                        if st.button("🗑️", key=f"del_{row.id}", help="Delete"):
+                            if delete_transaction(row.id):
+                                st.success(f"Transaction #{row.id} deleted!")
                                 st.rerun()
 
-
+        # Page navigation
+        first_row = (page_number - 1) * page_size + 1
+        col_prev, col_page, col_next = st.columns([1, 3, 1])
+        with col_prev:
+            if st.button("◀ Newer", disabled=page_number == 1, width="stretch"):
+                page_cursors.pop()
+                st.rerun()
+        with col_page:
+            st.caption(f"Page {page_number} · transactions {first_row}–{first_row + len(page_df) - 1} "
+                       f"of {snapshot.transaction_count}")
+        with col_next:
+            if st.button("Older ▶", disabled=next_cursor is None, width="stretch"):
+                page_cursors.append(next_cursor)
+                st.rerun()
 
         # Export options
+        perf.section("export")
         st.divider()
         col1, col2, col3 = st.columns(3)
 
         with col1:
-            csv_data = export_to_csv()
-            if csv_data:
+            # Built only when asked for, then reused until the data changes. The
+            # exporter is imported here, not at startup (only the history view needs it)
+            import exporter
+
+            export_format = st.selectbox("Export format", exporter.available_formats(),
+                                         label_visibility="collapsed")
+            ready = exporter.export_cache.get(export_format, data_version(), transaction_filter)
+            if ready is None:
+                if st.button("📦 Prepare Export", width="stretch"):
+                    with st.spinner("Exporting..."):
+                        prepare_export(export_format, transaction_filter)
+                    st.rerun()
+            else:
+                export_path, export_rows = ready
+                extension, mime = exporter.FORMATS[export_format]
+
+                # Deferred: the file is read when the button is clicked, not on every rerun
+                def read_export(path=export_path, fmt=export_format, export_filter=transaction_filter):
+                    try:
+                        export_file = open(path, "rb")
+                    except FileNotFoundError:
+                        # Removed since this button was drawn: export the current data again
+                        export_file = open(prepare_export(fmt, export_filter)[0], "rb")
+                    with export_file:
+                        return export_file.read()
+
                 st.download_button(
-                    label="📥 Export to CSV",
-                    data=csv_data,
-                    file_name=f"expenses_{datetime.date.today()}.csv",
-                    mime="text/csv",
+                    label=f"📥 Download {export_rows:,} rows",
+                    data=read_export,
+                    file_name=f"expenses_{datetime.date.today()}{extension}",
+                    mime=mime,
                     width="stretch"
-
                 )
 
         with col2:
@@ -551,9 +485,7 @@ def main():
                 st.warning("⚠️ This will delete ALL transactions!")
                 confirm = st.checkbox("I understand this action cannot be undone")
                 if confirm and st.button("Confirm Delete All", type="primary"):
-                    with get_db_connection() as conn:
-                        conn.execute("DELETE FROM transactions")
-                        conn.commit()
+                    clear_transactions()
                     st.error("All data deleted!")
                     st.rerun()
 
@@ -561,10 +493,13 @@ def main():
             db_size = os.path.getsize(DB_FILE) if os.path.exists(DB_FILE) else 0
             st.info(f"Database: {db_size / 1024:.1f} KB")
 
+    elif transaction_filter.active:
+        st.info("🔍 No transactions match the filters.")
     else:
         st.info("📭 No transactions yet. Add some using the sidebar!")
 
     # Footer with database info and sample data
+    perf.section("database tools")
     with st.expander("⚙️ Database Tools & Info"):
         col1, col2 = st.columns(2)
 
@@ -581,17 +516,46 @@ def main():
             if os.path.exists(DB_FILE):
                 db_stats = {
                     "File Size": f"{os.path.getsize(DB_FILE) / 1024:.1f} KB",
-                    "Transactions": len(transactions_df),
+                    "Transactions": get_dashboard_snapshot().transaction_count,
                     "Categories": len(get_categories())
                 }
                 for key, value in db_stats.items():
                     st.text(f"{key}: {value}")
+
+                pool = get_app_pool().stats()
+                st.text(f"Connections: {pool['created']} opened, {pool['reused']} reused, "
+                        f"{pool['idle']} idle")
+                cache = cache_stats()
+                st.text(f"Query cache: {cache['hits']} hits, {cache['misses']} misses "
+                        f"({cache['hit_rate']:.0%}), {cache['size']}/{cache['maxsize']} entries")
+                flow = cashflow_stats()
+                st.text(f"Cash flow: {flow['days']} days, {flow['full']} full and "
+                        f"{flow['incremental']} incremental refreshes")
+                writes = get_write_queue().stats()
+                st.text(f"Writes ({writes['durability']}): {writes['committed']} committed in "
+                        f"{writes['batches']} commits, {writes['queued']} queued, {writes['failed']} failed")
+
+                if st.button("Check Summary Totals"):
+                    mismatches, rows = check_summary_totals()
+                    if mismatches:
+                        st.warning(f"Found {mismatches} out-of-date totals; rebuilt {rows} rows.")
+                    else:
+                        st.success("Summary totals match the transactions.")
             else:
                 st.warning("Database file not found!")
 
+    perf.section("performance")
+    performance_panel()
+
 
 if __name__ == "__main__":
-    main()
+    # Spans, statement counts and (when switched on in the Performance panel)
+    # profiler output for this rerun; see perf.py
+    perf.enable_log()
+    with perf.rerun("E_APP1", session=session_key(),
+                    cprofile=st.session_state.get("perf_cprofile", False),
+                    memory=st.session_state.get("perf_tracemalloc", False)):
+        main()
 st.markdown("---")
 st.caption("© 2025 Expenses Tracker™ ")
 st.caption("@ Zach Techs ")
\ No newline at end of file
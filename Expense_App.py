@@ -1,24 +1,57 @@
 import streamlit as st
-import json
 import pandas as pd
 from datetime import datetime
-import plotly.express as px
+import uuid
+
+import write_queue
+from expense_journal import get_shared
+from expense_ledger import ExpenseLedger
+from money import format_cents, from_cents, to_cents
 
 # -----------------------------
 # File setup
 # -----------------------------
 DATA_FILE = "expenses.json"
 
+# Shared with ExpensesApp.py: snapshot in expenses.json, changes appended to
+# expenses.json.log, running totals in expenses.json.totals.
+# One ledger per process for every session: a rerun only re-reads the files
+# when another writer changed them, and writes are locked (see expense_journal.py)
+journal = get_shared(ExpenseLedger, DATA_FILE)
+
+# sync (default) / group / async -- see write_queue.py
+WRITE_DURABILITY = write_queue.durability_from_env()
+
 def load_expenses():
-    try:
-        with open(DATA_FILE, "r") as file:
-            return json.load(file)
-    except FileNotFoundError:
-        return []
+    """Consistent copy of the expenses and their totals in cents (other sessions may be writing)"""
+    with journal.lock:
+        journal.refresh()
+        return list(journal.expenses), journal.total_cents, dict(journal.category_cents)
+
+def session_key():
+    if "session_key" not in st.session_state:
+        st.session_state.session_key = uuid.uuid4().hex
+    return st.session_state.session_key
+
+def get_write_queue():
+    # The queue (and the journal it writes with) outlive this rerun; see write_queue.py
+    return write_queue.get_write_queue(
+        ("journal", DATA_FILE),
+        lambda: write_queue.JournalSink(journal),
+        durability=WRITE_DURABILITY,
+    )
+
+def save_expense(expense):
+    if WRITE_DURABILITY == write_queue.SYNC:
+        journal.add(expense)
+    else:
+        get_write_queue().submit(expense, session=session_key())
 
-def save_expenses(expenses):
-    with open(DATA_FILE, "w") as file:
-        json.dump(expenses, file, indent=4)
+def pending_expenses():
+    """This session's expenses still waiting in the write queue"""
+    if WRITE_DURABILITY == write_queue.SYNC:
+        return []
+    return get_write_queue().pending(session_key())
 
 # -----------------------------
 # Streamlit UI
@@ -28,12 +61,6 @@ st.set_page_config(page_title="💰 Expense Tracker", page_icon="💵", layout="
 st.title("💰 Personal Expense Tracker")
 st.markdown("### Track your daily expenses easily and visualize spending by category.")
 
-# Load existing data
-expenses = load_expenses()
-
-# Convert to DataFrame
-df = pd.DataFrame(expenses)
-
 # Tabs for navigation
 tab1, tab2, tab3 = st.tabs(["➕ Add Expense", "📋 View All", "📊 Category Summary"])
 
@@ -55,15 +82,31 @@ with tab1:
             if not category or not description or amount <= 0:
                 st.warning("⚠️ Please fill in all fields correctly.")
             else:
+                cents = to_cents(amount)
                 new_expense = {
                     "category": category,
                     "description": description,
-                    "amount": amount,
+                    "amount": from_cents(cents),
                     "date": date.strftime("%Y-%m-%d")
                 }
-                expenses.append(new_expense)
-                save_expenses(expenses)
-                st.success(f"✅ Added {amount:.2f} under {category}")
+                save_expense(new_expense)
+                st.success(f"✅ Added {format_cents(cents)} under {category}")
+
+# Load existing data (after the form, so a new entry shows up right away)
+expenses, total_cents, category_cents = load_expenses()
+
+# Convert to DataFrame
+df = pd.DataFrame(expenses)
+
+# Read-your-writes: this session's queued entries count everywhere on the
+# page (table, total and category charts), not just in the table
+pending = pending_expenses()
+if pending:
+    df = pd.concat([df, pd.DataFrame(pending)], ignore_index=True)
+    for e in pending:
+        cents = to_cents(e["amount"])
+        total_cents += cents
+        category_cents[e["category"]] = category_cents.get(e["category"], 0) + cents
 
 # -----------------------------
 # Tab 2: View All Expenses
@@ -75,8 +118,7 @@ with tab2:
         st.info("No expenses recorded yet.")
     else:
         st.dataframe(df, width='stretch')
-        total_spent = df["amount"].sum()
-        st.markdown(f"### 💵 Total Spending: **${total_spent:.2f}**")
+        st.markdown(f"### 💵 Total Spending: **${format_cents(total_cents)}**")
 
 # -----------------------------
 # Tab 3: Category Summary
@@ -87,15 +129,22 @@ with tab3:
     if df.empty:
         st.info("No data available for summary.")
     else:
-        category_totals = df.groupby("category")["amount"].sum().reset_index()
+        # graph_objects, imported only once there is something to plot: plotly.express
+        # would add ~150 ms to every cold start for two simple charts
+        import plotly.graph_objects as go
+
+        categories = list(category_cents)
+        amounts = [from_cents(category_cents[category]) for category in categories]
 
         # Pie chart visualization
-        fig = px.pie(category_totals, names="category", values="amount", title="Spending Breakdown")
+        fig = go.Figure(go.Pie(labels=categories, values=amounts))
+        fig.update_layout(title="Spending Breakdown")
         st.plotly_chart(fig, width='stretch')
 
         # Bar chart
-        fig2 = px.bar(category_totals, x="category", y="amount", text="amount",
-                      title="Spending per Category", color="category")
+        fig2 = go.Figure([go.Bar(x=[category], y=[amount], text=[amount], name=category)
+                          for category, amount in zip(categories, amounts)])
+        fig2.update_layout(title="Spending per Category", xaxis_title="category", yaxis_title="amount")
         st.plotly_chart(fig2, width='stretch')
 
 st.markdown("---")
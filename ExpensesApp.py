@@ -1,23 +1,26 @@
-import json
 from datetime import datetime
 
+from itertools import islice
+
+from expense_journal import ConflictError
+from expense_ledger import ExpenseLedger
+from money import from_cents, to_cents
+
 # -----------------------------
 # File setup
 # -----------------------------
 DATA_FILE = "expenses.json"
 
+PAGE_SIZE = 20
 
-def load_expenses():
-    try:
-        with open(DATA_FILE, "r") as file:
-            return json.load(file)
-    except FileNotFoundError:
-        return []
+# Changes are appended to expenses.json.log and folded into expenses.json
+# every 1000 operations; category/month totals are kept up to date as we go
+# (see expense_journal.py and expense_ledger.py)
+journal = ExpenseLedger(DATA_FILE)
 
 
-def save_expenses(expenses):
-    with open(DATA_FILE, "w") as file:
-        json.dump(expenses, file, indent=4)
+def load_expenses():
+    return journal.load()
 
 
 # -----------------------------
@@ -30,7 +33,8 @@ def add_expense(expenses):
 
     while True:
         try:
-            amount = float(input("Enter amount: "))
+            # Rounded to the cent so stored amounts match the ledger totals
+            amount = from_cents(to_cents(input("Enter amount: ").strip()))
             break
         except ValueError:
             print("⚠️ Please enter a valid number.")
@@ -45,19 +49,33 @@ def add_expense(expenses):
         "amount": amount,
         "date": date
     }
-    expenses.append(expense)
-    save_expenses(expenses)
+    journal.add(expense)
     print(f"✅ Expense added: {amount} in {category}")
 
 
-def view_expenses(expenses):
+def view_expenses(expenses, page_size=PAGE_SIZE):
     print("\n📋 All Expenses:")
     if not expenses:
         print("No expenses recorded yet.")
         return
 
-    for i, exp in enumerate(expenses, 1):
-        print(f"{i}. {exp['date']} - {exp['category']}: {exp['description']} (${exp['amount']:.2f})")
+    # Print one page at a time instead of every row at once
+    pages = (len(expenses) + page_size - 1) // page_size
+    page = 0
+    while True:
+        start = page * page_size
+        for i, exp in enumerate(islice(expenses, start, start + page_size), start + 1):
+            print(f"{i}. {exp['date']} - {exp['category']}: {exp['description']} (${exp['amount']:.2f})")
+
+        if pages == 1:
+            return
+        choice = input(f"-- Page {page + 1}/{pages} -- [n]ext, [p]revious, [q]uit: ").strip().lower()
+        if choice == "n" and page + 1 < pages:
+            page += 1
+        elif choice == "p" and page > 0:
+            page -= 1
+        elif choice in ("q", ""):
+            return
 
 
 def total_per_category(expenses):
@@ -66,15 +84,21 @@ def total_per_category(expenses):
         print("No expenses recorded yet.")
         return
 
-    totals = {}
-    for exp in expenses:
-        category = exp["category"]
-        totals[category] = totals.get(category, 0) + exp["amount"]
-
-    for cat, total in totals.items():
+    # Running totals maintained by the ledger -- no pass over the expenses
+    for cat, total in journal.category_totals.items():
         print(f"{cat}: ${total:.2f}")
 
 
+def total_per_month(expenses):
+    print("\n📅 Total Spending per Month:")
+    if not expenses:
+        print("No expenses recorded yet.")
+        return
+
+    for month, total in sorted(journal.month_totals.items()):
+        print(f"{month}: ${total:.2f}")
+
+
 # -----------------------------
 # Edit & Delete Functions
 # -----------------------------
@@ -100,20 +124,23 @@ def edit_expense(expenses):
 
     try:
         new_amount = input(f"New amount [{exp['amount']}]: ").strip()
-        new_amount = float(new_amount) if new_amount else exp["amount"]
+        new_amount = from_cents(to_cents(new_amount)) if new_amount else exp["amount"]
     except ValueError:
         print("⚠️ Invalid amount. Keeping old value.")
         new_amount = exp["amount"]
 
     new_date = input(f"New date [{exp['date']}]: ").strip() or exp["date"]
 
-    expenses[idx] = {
-        "category": new_category,
-        "description": new_description,
-        "amount": new_amount,
-        "date": new_date
-    }
-    save_expenses(expenses)
+    try:
+        journal.edit(idx, {
+            "category": new_category,
+            "description": new_description,
+            "amount": new_amount,
+            "date": new_date
+        })
+    except ConflictError:
+        print("⚠️ This expense was changed or deleted elsewhere in the meantime. Nothing was saved.")
+        return
     print("✅ Expense updated successfully!")
 
 
@@ -131,8 +158,11 @@ def delete_expense(expenses):
         print("⚠️ Please enter a valid number.")
         return
 
-    deleted = expenses.pop(idx)
-    save_expenses(expenses)
+    try:
+        deleted = journal.delete(idx)
+    except ConflictError:
+        print("⚠️ This expense was changed or deleted elsewhere in the meantime. Nothing was deleted.")
+        return
     print(f"🗑️ Deleted: {deleted['description']} ({deleted['category']}) - ${deleted['amount']:.2f}")
 
 
@@ -140,15 +170,19 @@ def delete_expense(expenses):
 # Main Program Loop
 # -----------------------------
 def main():
-    expenses = load_expenses()
+    load_expenses()
 
     while True:
+        # Pick up entries added meanwhile (e.g. from the web app); only
+        # re-reads what changed
+        expenses = journal.refresh()
         print("\n=== 💰 Expense Tracker ===")
         print("1️⃣  Add Expense")
         print("2️⃣  View All Expenses")
         print("3️⃣  View Total per Category")
         print("4️⃣  Edit an Expense")
         print("5️⃣  Delete an Expense")
+        print("6️⃣  View Total per Month")
         print("0️⃣  Exit")
 
         choice = input("Select an option: ").strip()
@@ -163,7 +197,10 @@ def main():
             edit_expense(expenses)
         elif choice == "5":
             delete_expense(expenses)
+        elif choice == "6":
+            total_per_month(expenses)
         elif choice == "0":
+            journal.compact()
             print("👋 Goodbye! Your expenses have been saved.")
             break
         else:
@@ -0,0 +1,510 @@
+"""Async HTTP/JSON API over the expense database (expense_core.py).
+
+Usage:
+    python api_server.py                          # expenses.db on 127.0.0.1:8765
+    python api_server.py --db ledger.db --port 9000 --workers 8
+
+Endpoints (GET unless noted):
+    /health                     status and data version
+    /summary                    income, expenses, balance
+    /categories/summary         totals per category and type
+    /monthly/summary            totals per month and type
+    /dashboard                  all of the above and the row count, in one query
+    /transactions               one page, newest first (?limit=, ?cursor= from the last page)
+    POST /transactions          add one transaction (an object) or many (a list, one SQL transaction)
+    /search?q=                  best matches for a full-text search
+    /categories                 category names (?type=Income|Expense)
+    /budgets?month=YYYY-MM      budget vs actual for a month
+    /cashflow                   running balance, net flow and rolling average
+                                (?freq=D|W|M, ?window=, ?start=, ?end=)
+    POST /batch                 {"requests": [{"method", "path", "body"}, ...]} in one round trip
+The aggregate, page and search endpoints take the dashboard's filters:
+?start=YYYY-MM-DD, ?end=, ?type= and ?category= (repeat or comma-separate).
+
+How it keeps up with many clients:
+  * one asyncio event loop parses HTTP/1.1 and keeps connections alive, so
+    a client pays for TCP setup once, not per request;
+  * database work runs on a small thread pool (run_in_executor), each
+    thread borrowing a pooled connection (db_pool.py), so a slow query
+    never blocks the loop; single POSTs go through the app's write queue
+    and are group-committed with other clients' writes;
+  * GET responses are kept as serialized bytes keyed by the request and
+    the data version (query_cache.py). A repeat GET is answered from the
+    loop without a thread hop, a query or JSON encoding; any write, here or
+    by another process (checked with two stat calls per request, see
+    expense_core.sync_external_writes), moves the version on. Responses
+    carry an ETag, and If-None-Match gets a 304.
+"""
+import argparse
+import asyncio
+import datetime
+import hashlib
+import json
+import logging
+import math
+import re
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import cashflow
+import expense_core
+from filters import TransactionFilter
+from history import DEFAULT_PAGE_SIZE
+from query_cache import data_version
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 4
+RESPONSE_CACHE_SIZE = 512
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 8 * 1024 * 1024
+MAX_PAGE_SIZE = 1000
+MAX_BATCH_REQUESTS = 100
+KEEP_ALIVE_TIMEOUT = 30
+
+TRANSACTION_TYPES = ("Income", "Expense")
+
+logger = logging.getLogger("expenses.api")
+
+
+class ApiError(Exception):
+    """A request the API refuses; becomes an error response with ``status``"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# -----------------------------
+# Request parameters
+# -----------------------------
+def _one(query, name, default=None):
+    values = query.get(name)
+    return values[-1] if values else default
+
+
+def _many(query, name):
+    """Repeated and comma-separated values: ?category=A&category=B or ?category=A,B"""
+    return tuple(item.strip() for value in query.get(name, ()) for item in value.split(",") if item.strip())
+
+
+def _date(value, name):
+    try:
+        return datetime.date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} must be a date (YYYY-MM-DD), got {value!r}")
+
+
+def _int(value, name, low, high):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} must be an integer, got {value!r}")
+    if not low <= number <= high:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} must be between {low} and {high}")
+    return number
+
+
+def parse_filter(query):
+    """TransactionFilter from ?start=&end=&type=&category=, or None if there is none"""
+    start, end = _one(query, "start"), _one(query, "end")
+    types = _many(query, "type")
+    unknown = [value for value in types if value not in TRANSACTION_TYPES]
+    if unknown:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"type must be Income or Expense, got {unknown[0]!r}")
+    transaction_filter = TransactionFilter(start=_date(start, "start") if start else None,
+                                           end=_date(end, "end") if end else None,
+                                           types=tuple(sorted(types)),
+                                           categories=tuple(sorted(_many(query, "category"))))
+    return transaction_filter if transaction_filter.active else None
+
+
+def parse_cursor(value):
+    """The ``next_cursor`` of a page ("YYYY-MM-DD,id") as history.py's (date, id)"""
+    date, _, row_id = value.partition(",")
+    return _date(date, "cursor").isoformat(), _int(row_id, "cursor id", 0, 2 ** 63 - 1)
+
+
+def parse_transaction(item):
+    """(date, category, description, amount, type) from a posted JSON object"""
+    if not isinstance(item, dict):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "a transaction must be a JSON object")
+    trans_type = item.get("type", "Expense")
+    if trans_type not in TRANSACTION_TYPES:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "type must be Income or Expense")
+    category = item.get("category")
+    if not isinstance(category, str) or not category.strip():
+        raise ApiError(HTTPStatus.BAD_REQUEST, "category is required")
+    description = item.get("description") or ""
+    if not isinstance(description, str):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "description must be a string")
+    amount = item.get("amount")
+    if isinstance(amount, bool) or not isinstance(amount, (int, float, str)):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "amount must be a number")
+    try:
+        amount = float(amount)
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"amount must be a number, got {amount!r}")
+    if not math.isfinite(amount) or amount <= 0:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "amount must be greater than 0")
+    date = _date(item.get("date", datetime.date.today().isoformat()), "date")
+    return date.isoformat(), category.strip(), description, amount, trans_type
+
+
+def _records(df):
+    """DataFrame as a list of JSON-ready dicts"""
+    return df.to_dict(orient="records")
+
+
+# -----------------------------
+# Endpoints (run on the worker threads)
+# -----------------------------
+def health(query, body, session):
+    return {"status": "ok", "database": expense_core.DB_FILE, "data_version": data_version()}
+
+
+def summary(query, body, session):
+    income, expenses, balance = expense_core.get_summary(parse_filter(query))
+    return {"income": income, "expenses": expenses, "balance": balance}
+
+
+def category_summary(query, body, session):
+    return _records(expense_core.get_category_summary(parse_filter(query)))
+
+
+def monthly_summary(query, body, session):
+    return _records(expense_core.get_monthly_summary(parse_filter(query)))
+
+
+def dashboard(query, body, session):
+    snapshot = expense_core.get_dashboard_snapshot(parse_filter(query))
+    return {"income": snapshot.total_income, "expenses": snapshot.total_expenses,
+            "balance": snapshot.balance, "transaction_count": snapshot.transaction_count,
+            "categories": _records(snapshot.category_summary), "months": _records(snapshot.monthly_summary)}
+
+
+def transactions_page(query, body, session):
+    limit = _int(_one(query, "limit", DEFAULT_PAGE_SIZE), "limit", 1, MAX_PAGE_SIZE)
+    cursor = _one(query, "cursor")
+    page, next_cursor = expense_core.get_history_page(limit, parse_cursor(cursor) if cursor else None,
+                                                      parse_filter(query))
+    return {"transactions": _records(page),
+            "next_cursor": f"{next_cursor[0]},{next_cursor[1]}" if next_cursor else None}
+
+
+def add_transactions(query, body, session):
+    if isinstance(body, list):
+        if not body:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "no transactions given")
+        rows = [parse_transaction(item) for item in body]
+        return {"ids": expense_core.add_transactions(rows)}
+    return {"id": expense_core.add_transaction(*parse_transaction(body), session=session)}
+
+
+def search(query, body, session):
+    text = _one(query, "q", "").strip()
+    if not text:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "q is required")
+    return _records(expense_core.search_history(text, parse_filter(query)))
+
+
+def categories(query, body, session):
+    trans_type = _one(query, "type")
+    if trans_type is not None and trans_type not in TRANSACTION_TYPES:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "type must be Income or Expense")
+    return _records(expense_core.get_categories(trans_type))
+
+
+_YEAR_MONTH = re.compile(r"\d{4}-\d{2}")
+
+
+def budget_report(query, body, session):
+    month = _one(query, "month", datetime.date.today().strftime("%Y-%m"))
+    try:
+        # strptime alone would take '2024-1'
+        if not _YEAR_MONTH.fullmatch(month):
+            raise ValueError(month)
+        datetime.datetime.strptime(month, "%Y-%m")
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"month must be YYYY-MM, got {month!r}")
+    return _records(expense_core.get_budget_report(month))
+
+
+def cashflow_series(query, body, session):
+    freq = _one(query, "freq", "M")
+    if freq not in cashflow.FREQUENCIES:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"freq must be one of {', '.join(cashflow.FREQUENCIES)}")
+    window = _one(query, "window")
+    start, end = _one(query, "start"), _one(query, "end")
+    return _records(expense_core.get_cashflow(freq, _int(window, "window", 1, 10000) if window else None,
+                                              _date(start, "start") if start else None,
+                                              _date(end, "end") if end else None))
+
+
+# path: {method: handler}
+ROUTES = {
+    "/health": {"GET": health},
+    "/summary": {"GET": summary},
+    "/categories/summary": {"GET": category_summary},
+    "/monthly/summary": {"GET": monthly_summary},
+    "/dashboard": {"GET": dashboard},
+    "/transactions": {"GET": transactions_page, "POST": add_transactions},
+    "/search": {"GET": search},
+    "/categories": {"GET": categories},
+    "/budgets": {"GET": budget_report},
+    "/cashflow": {"GET": cashflow_series},
+}
+
+
+def _json_bytes(payload):
+    return json.dumps(payload, default=str, separators=(",", ":")).encode("utf-8")
+
+
+def _error_payload(status, message):
+    return {"error": HTTPStatus(status).phrase, "status": int(status), "message": message}
+
+
+def handle(method, target, body, session):
+    """Run one request; returns (status, payload). Never raises"""
+    parts = urlsplit(target)
+    methods = ROUTES.get(parts.path.rstrip("/") or "/")
+    try:
+        if methods is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"no endpoint {parts.path}")
+        handler = methods.get(method)
+        if handler is None:
+            raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, f"{parts.path} allows {', '.join(methods)}")
+        payload = handler(parse_qs(parts.query), body, session)
+        return (HTTPStatus.CREATED if method == "POST" else HTTPStatus.OK), payload
+    except ApiError as error:
+        return error.status, _error_payload(error.status, error.message)
+    except Exception:
+        logger.exception("%s %s failed", method, target)
+        return HTTPStatus.INTERNAL_SERVER_ERROR, _error_payload(HTTPStatus.INTERNAL_SERVER_ERROR,
+                                                                "internal error")
+
+
+def handle_batch(body, session):
+    """Run each request of a POST /batch in order; one response per request"""
+    if not isinstance(body, dict) or not isinstance(body.get("requests"), list):
+        raise ApiError(HTTPStatus.BAD_REQUEST, 'expected {"requests": [...]}')
+    if len(body["requests"]) > MAX_BATCH_REQUESTS:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"at most {MAX_BATCH_REQUESTS} requests per batch")
+    responses = []
+    for request in body["requests"]:
+        if not isinstance(request, dict) or not isinstance(request.get("path"), str):
+            status, payload = HTTPStatus.BAD_REQUEST, _error_payload(HTTPStatus.BAD_REQUEST,
+                                                                     "each request needs a path")
+        else:
+            status, payload = handle(str(request.get("method", "GET")).upper(), request["path"],
+                                     request.get("body"), session)
+        responses.append({"status": int(status), "body": payload})
+    return responses
+
+
+# -----------------------------
+# Response cache
+# -----------------------------
+class ResponseCache:
+    """Serialized GET responses by (target, data version); least recently used go first"""
+
+    def __init__(self, maxsize=RESPONSE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+# -----------------------------
+# HTTP/1.1 server
+# -----------------------------
+class ApiServer:
+    """asyncio HTTP/1.1 server with keep-alive; database work on a thread pool"""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_WORKERS):
+        self.host = host
+        self.port = port
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+        self.cache = ResponseCache()
+        self.requests = 0
+        self.connections = 0
+        self._server = None
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, expense_core.init_database)
+        self._server = await asyncio.start_server(self._serve_connection, self.host, self.port,
+                                                  limit=MAX_HEADER_BYTES)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.executor.shutdown(wait=True)
+
+    async def _serve_connection(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    self._write(writer, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, _json_bytes(
+                        _error_payload(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "headers too large")),
+                        keep_alive=False)
+                    break
+                keep_alive = await self._serve_request(head, reader, writer)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _serve_request(self, head, reader, writer):
+        """Answer one request; returns whether the connection stays open"""
+        self.requests += 1
+        try:
+            request_line, *header_lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+            method, target, version = request_line.split(" ")
+            headers = {}
+            for line in header_lines:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            self._write(writer, HTTPStatus.BAD_REQUEST,
+                        _json_bytes(_error_payload(HTTPStatus.BAD_REQUEST, "malformed request")), keep_alive=False)
+            return False
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" and (version != "HTTP/1.0" or connection == "keep-alive")
+        if "transfer-encoding" in headers:
+            self._write(writer, HTTPStatus.LENGTH_REQUIRED, _json_bytes(
+                _error_payload(HTTPStatus.LENGTH_REQUIRED, "send the body with a Content-Length")), keep_alive=False)
+            return False
+        if length > MAX_BODY_BYTES:
+            self._write(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, _json_bytes(
+                _error_payload(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "body too large")), keep_alive=False)
+            return False
+        try:
+            raw_body = await reader.readexactly(length) if length > 0 else b""
+        except asyncio.IncompleteReadError:
+            # The client went away in the middle of the body: nobody to answer
+            return False
+        session = headers.get("x-session")
+
+        expense_core.sync_external_writes()
+        if method == "GET":
+            key = (target, data_version())
+            entry = self.cache.get(key)
+            if entry is None:
+                entry = await self._run(self._render_get, target, session)
+                if entry[0] == HTTPStatus.OK:
+                    self.cache.put(key, entry)
+            status, body, etag = entry
+            if etag is not None and headers.get("if-none-match") == etag:
+                self._write(writer, HTTPStatus.NOT_MODIFIED, b"", keep_alive, etag)
+            else:
+                self._write(writer, status, body, keep_alive, etag)
+            return keep_alive
+
+        try:
+            payload = json.loads(raw_body) if raw_body else None
+        except ValueError:
+            status, body = HTTPStatus.BAD_REQUEST, _json_bytes(
+                _error_payload(HTTPStatus.BAD_REQUEST, "body is not valid JSON"))
+        else:
+            status, body = await self._run(self._render_post, method, target, payload, session)
+        self._write(writer, status, body, keep_alive)
+        return keep_alive
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    @staticmethod
+    def _render_get(target, session):
+        status, payload = handle("GET", target, None, session)
+        body = _json_bytes(payload)
+        etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"' if status == HTTPStatus.OK else None
+        return status, body, etag
+
+    @staticmethod
+    def _render_post(method, target, payload, session):
+        if method == "POST" and urlsplit(target).path.rstrip("/") == "/batch":
+            try:
+                return HTTPStatus.OK, _json_bytes(handle_batch(payload, session))
+            except ApiError as error:
+                return error.status, _json_bytes(_error_payload(error.status, error.message))
+        status, payload = handle(method, target, payload, session)
+        return status, _json_bytes(payload)
+
+    @staticmethod
+    def _write(writer, status, body, keep_alive, etag=None):
+        status = HTTPStatus(status)
+        headers = [f"HTTP/1.1 {status.value} {status.phrase}",
+                   "Content-Type: application/json",
+                   f"Content-Length: {len(body)}",
+                   f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if etag is not None:
+            headers.append(f"ETag: {etag}")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database file (default: $EXPENSES_DB or expenses.db)")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="threads running database work")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if args.db:
+        expense_core.set_database(args.db)
+
+    async def serve():
+        server = await ApiServer(args.host, args.port, args.workers).start()
+        logger.info("Serving %s on http://%s:%d", expense_core.DB_FILE, server.host, server.port)
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Static images for the Streamlit pages, read and sized once per process.
+
+Given a PIL image, st.image() re-encodes it on every rerun. Given an image
+wider than the display width, it decodes, resizes and re-encodes it on
+every rerun. image_bytes() does that work once and returns bytes at the
+display size, which st.image() serves without further work. The result is
+cached per (path, width, file mtime), and PIL is imported only when a
+resize is actually needed.
+"""
+import functools
+import io
+import os
+
+
+def image_bytes(path, width=None):
+    """Encoded image no wider than ``width`` pixels (original bytes when it already fits)"""
+    return _load(path, width, os.stat(path).st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=16)
+def _load(path, width, mtime_ns):
+    with open(path, "rb") as file:
+        data = file.read()
+    if width is None:
+        return data
+
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(data))
+    if image.width <= width:
+        return data
+    height = max(1, round(image.height * width / image.width))
+    resized = image.resize((width, height), Image.BILINEAR)
+    out = io.BytesIO()
+    if resized.mode in ("RGBA", "LA", "P"):
+        resized.save(out, format="PNG")
+    else:
+        resized.convert("RGB").save(out, format="JPEG", quality=90)
+    return out.getvalue()
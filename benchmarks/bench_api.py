@@ -0,0 +1,230 @@
+"""Requests per second and latency of the HTTP API (api_server.py) over a local SQLite file.
+
+Usage:
+    python benchmarks/bench_api.py                        # 100,000-row ledger, 16 clients
+    python benchmarks/bench_api.py --rows 1000000 --clients 64 --requests 20000
+    python benchmarks/bench_api.py --durability group     # group-commit the single POSTs
+
+A seeded synthetic ledger (synthetic.py) is built in a temporary directory
+and the server runs in its own process, so clients and server do not share
+an interpreter. Each scenario has ``--clients`` asyncio clients sending
+``--requests`` requests between them, back to back:
+    cached GET        dashboard endpoints (summary, dashboard, categories,
+                      months, first history page) over keep-alive
+                      connections; all but the first of each come from
+                      the response cache
+    cached GET, new connection
+                      the same, opening a connection per request (what a
+                      client without keep-alive pays)
+    filtered summary  /summary for a different date range every request
+                      (never cached: an aggregate over the covering index)
+    search            /search for a different word and start date every
+                      request (never cached: an FTS5 query)
+    POST one          one transaction per request (one commit each under
+                      the default sync durability)
+    POST batch        --batch-size transactions per request (one SQL
+                      transaction); rows/s is also shown
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic  # noqa: E402
+
+CACHED_TARGETS = ["/summary", "/dashboard", "/categories/summary", "/monthly/summary", "/transactions?limit=25"]
+SEARCH_WORDS = ["lunch", "groceries", "coffee", "taxi", "fuel", "netflix", "rent", "pharmacy",
+                "books", "haircut", "shoes", "internet", "dividends", "consulting"]
+
+
+# -----------------------------
+# Client
+# -----------------------------
+class Client:
+    """Minimal HTTP/1.1 client on one asyncio connection"""
+
+    def __init__(self, host, port, keep_alive=True):
+        self.host = host
+        self.port = port
+        self.keep_alive = keep_alive
+        self._reader = self._writer = None
+
+    async def request(self, method, target, payload=None):
+        """Send one request; returns (status, body bytes)"""
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        head = (f"{method} {target} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if self.keep_alive else 'close'}\r\n\r\n")
+        self._writer.write(head.encode("latin-1") + body)
+        response_head = await self._reader.readuntil(b"\r\n\r\n")
+        status_line, *header_lines = response_head.decode("latin-1").split("\r\n")
+        length = 0
+        for line in header_lines:
+            name, _, value = line.partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        content = await self._reader.readexactly(length)
+        if not self.keep_alive:
+            await self.close()
+        return int(status_line.split(" ")[1]), content
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            await self._writer.wait_closed()
+            self._reader = self._writer = None
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run_scenario(host, port, clients, total, make_request, keep_alive=True):
+    """Run ``total`` requests over ``clients`` concurrent clients; returns (req/s, p50 ms, p99 ms, errors)"""
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def client_loop():
+        nonlocal errors
+        client = Client(host, port, keep_alive)
+        for number in counter:
+            method, target, payload = make_request(number)
+            started = time.perf_counter()
+            status, _ = await client.request(method, target, payload)
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += status >= 400
+        await client.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    return total / elapsed, percentile(latencies, 0.50), percentile(latencies, 0.99), errors
+
+
+# -----------------------------
+# Workloads
+# -----------------------------
+def cached_get(number):
+    return "GET", CACHED_TARGETS[number % len(CACHED_TARGETS)], None
+
+
+def filtered_summary(first_day):
+    def make(number):
+        start = first_day + datetime.timedelta(days=number % 3000)
+        end = start + datetime.timedelta(days=10 + number // 3000)
+        return "GET", f"/summary?start={start}&end={end}", None
+    return make
+
+
+def search_request(first_day):
+    def make(number):
+        start = first_day + datetime.timedelta(days=number // len(SEARCH_WORDS))
+        return "GET", f"/search?q={SEARCH_WORDS[number % len(SEARCH_WORDS)]}&start={start}", None
+    return make
+
+
+def _transaction(rng):
+    return {"date": str(datetime.date(2024, 12, 1) + datetime.timedelta(days=rng.randrange(31))),
+            "category": rng.choice(list(synthetic.EXPENSES)), "description": "API benchmark",
+            "amount": rng.randrange(100, 500000) / 100, "type": "Expense"}
+
+
+def post_one(rng):
+    return lambda number: ("POST", "/transactions", _transaction(rng))
+
+
+def post_batch(rng, size):
+    return lambda number: ("POST", "/transactions", [_transaction(rng) for _ in range(size)])
+
+
+# -----------------------------
+# Server process
+# -----------------------------
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(db, port, workers, durability):
+    env = dict(os.environ, WRITE_DURABILITY=durability, EXPENSES_PERF_LOG="")
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, "api_server.py"), "--db", db,
+                               "--port", str(port), "--workers", str(workers)],
+                              cwd=os.path.dirname(db), env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"API server exited: {server.stderr.read().decode()}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("API server did not start")
+
+
+async def run_all(port, args):
+    host = "127.0.0.1"
+    rng = random.Random(args.seed)
+    first_day = synthetic.DEFAULT_END - datetime.timedelta(days=3000)
+    scenarios = [
+        ("cached GET", cached_get, True, args.requests),
+        ("cached GET, new connection", cached_get, False, args.requests),
+        ("filtered summary", filtered_summary(first_day), True, args.requests),
+        ("search", search_request(first_day), True, args.requests),
+        ("POST one", post_one(rng), True, args.requests),
+        ("POST batch", post_batch(rng, args.batch_size), True, max(args.requests // 20, args.clients)),
+    ]
+    # Warm up: fill the response cache and the connections' page caches
+    await run_scenario(host, port, 1, len(CACHED_TARGETS), cached_get)
+
+    print(f"{'scenario':<30}{'requests':>10}{'req/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, make_request, keep_alive, total in scenarios:
+        rate, p50, p99, errors = await run_scenario(host, port, args.clients, total, make_request, keep_alive)
+        extra = f"   ({rate * args.batch_size:,.0f} rows/s)" if name == "POST batch" else ""
+        print(f"{name:<30}{total:>10,}{rate:>12,.0f}{p50:>10.2f}{p99:>10.2f}{errors:>8}{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000, help="transactions in the synthetic ledger")
+    parser.add_argument("--seed", type=int, default=synthetic.DEFAULT_SEED)
+    parser.add_argument("--clients", type=int, default=16, help="concurrent connections")
+    parser.add_argument("--requests", type=int, default=5000, help="requests per scenario")
+    parser.add_argument("--batch-size", type=int, default=100, help="transactions per batch POST")
+    parser.add_argument("--workers", type=int, default=4, help="the server's database threads")
+    parser.add_argument("--durability", default="sync", choices=["sync", "group", "async"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = os.path.join(directory, "expenses.db")
+        rate = synthetic.build_database(db, args.rows, args.seed)
+        print(f"{args.rows:,} transactions ({rate:,.0f} rows/s to build); {args.clients} clients, "
+              f"{args.workers} server threads, {args.durability} writes")
+        port = free_port()
+        server = start_server(db, port, args.workers, args.durability)
+        try:
+            asyncio.run(run_all(port, args))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
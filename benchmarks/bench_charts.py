@@ -0,0 +1,139 @@
+"""Benchmark chart rendering over many reruns: time per rerun and RSS growth.
+
+Usage:
+    python benchmarks/bench_charts.py                 # 1,000 reruns per mode
+    python benchmarks/bench_charts.py --reruns 200
+
+Modes (each runs in a fresh subprocess so RSS numbers are independent):
+    pyplot   the original code: plt.subplots() on every rerun, never closed
+    figure   charts.py drawing code with the PNG cache disabled
+    cached   charts.py as the apps use it (PNG cached by aggregate values)
+    native   aggregates only, as sent to the browser with CHART_BACKEND=native
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MODES = ["pyplot", "figure", "cached", "native"]
+
+
+def current_rss_kb():
+    """Resident set size of this process in KB"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        # Not Linux: fall back to the peak RSS (KB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def sample_aggregates():
+    import pandas as pd
+
+    categories = ["Food & Dining", "Transportation", "Entertainment", "Shopping",
+                  "Bills & Utilities", "Healthcare", "Education", "Other"]
+    category_summary = pd.DataFrame({
+        "category": categories + ["Salary", "Freelance"],
+        "type": ["Expense"] * len(categories) + ["Income"] * 2,
+        "total_amount": [1520.5, 640.0, 350.25, 1200.0, 830.0, 210.0, 400.0, 95.5, 36000.0, 5000.0],
+        "transaction_count": [40, 22, 9, 15, 12, 3, 4, 6, 12, 5],
+    })
+    months = [f"2024-{m:02d}" for m in range(1, 13)]
+    monthly_summary = pd.DataFrame({
+        "month": months * 2,
+        "type": ["Expense"] * 12 + ["Income"] * 12,
+        "total_amount": [400.0 + 25 * i for i in range(12)] + [3000.0 + 50 * i for i in range(12)],
+        "transaction_count": [30] * 24,
+    })
+    return category_summary, monthly_summary
+
+
+def legacy_pyplot_render(category_summary, monthly_summary):
+    """The pre-charts.py code path: pyplot figures that are never closed"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    expenses_df = category_summary[category_summary["type"] == "Expense"]
+    fig, ax = plt.subplots(figsize=(8, 6))
+    ax.pie(expenses_df["total_amount"], labels=expenses_df["category"], autopct="%1.1f%%",
+           startangle=90, pctdistance=0.85)
+    ax.add_artist(plt.Circle((0, 0), 0.70, fc="white"))
+    fig.savefig(io.BytesIO(), format="png", dpi=100)  # what st.pyplot() does
+
+    pivot_df = monthly_summary.pivot(index="month", columns="type", values="total_amount").fillna(0)
+    fig, ax = plt.subplots(figsize=(10, 6))
+    for col in pivot_df.columns:
+        ax.plot(pivot_df.index, pivot_df[col], marker="o")
+        for i, value in enumerate(pivot_df[col]):
+            ax.annotate(f"Ksh{value:,.0f}", xy=(i, value), xytext=(0, 10), textcoords="offset points")
+    plt.tight_layout()
+    fig.savefig(io.BytesIO(), format="png", dpi=100)
+
+
+def run_mode(mode, reruns):
+    import matplotlib
+    matplotlib.use("Agg")
+    import charts
+
+    category_summary, monthly_summary = sample_aggregates()
+    if mode == "figure":
+        charts._png_cache.maxsize = 0
+
+    start_rss = current_rss_kb()
+    start = time.perf_counter()
+    first_rerun = None
+    for i in range(reruns):
+        t0 = time.perf_counter()
+        if mode == "pyplot":
+            legacy_pyplot_render(category_summary, monthly_summary)
+        elif mode in ("figure", "cached"):
+            charts.category_pie_png(charts.category_chart_data(category_summary))
+            charts.monthly_trend_png(charts.monthly_chart_data(monthly_summary))
+        else:
+            charts.category_chart_data(category_summary).to_dict("records")
+            charts.monthly_chart_data(monthly_summary).to_dict("records")
+        if i == 0:
+            first_rerun = time.perf_counter() - t0
+    elapsed = time.perf_counter() - start
+
+    return {
+        "mode": mode,
+        "reruns": reruns,
+        "first_rerun_ms": first_rerun * 1000,
+        "mean_rerun_ms": elapsed / reruns * 1000,
+        "rss_growth_mb": (current_rss_kb() - start_rss) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=1000)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_mode(args.child, args.reruns)))
+        return
+
+    print(f"{'mode':<8} {'reruns':>7} {'first (ms)':>11} {'mean (ms)':>10} {'RSS growth (MB)':>16}")
+    for mode in args.modes:
+        output = subprocess.run([sys.executable, __file__, "--child", mode, "--reruns", str(args.reruns)],
+                                check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:<8} {result['reruns']:>7} {result['first_rerun_ms']:>11.1f} "
+              f"{result['mean_rerun_ms']:>10.2f} {result['rss_growth_mb']:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Benchmark the dashboard summary queries with and without the schema's indexes.
+
+Usage:
+    python benchmarks/bench_indexes.py                      # 10k, 100k, 1M rows
+    python benchmarks/bench_indexes.py --sizes 10000 5000000
+
+For every table size a fresh database is built twice: once stopped at schema
+version 1 (the original table, no indexes) and once fully migrated. The same
+queries the app runs are timed on both (best of --repeat runs).
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_pool import ConnectionPool  # noqa: E402
+from migrations import LATEST_VERSION, run_migrations  # noqa: E402
+from money import to_cents  # noqa: E402
+
+CENTS_VERSION = 6
+
+EXPENSE_CATEGORIES = ["Food & Dining", "Transportation", "Entertainment", "Shopping",
+                      "Bills & Utilities", "Healthcare", "Education", "Other"]
+INCOME_CATEGORIES = ["Salary", "Freelance", "Investment", "Gift", "Other"]
+
+QUERIES = {
+    "summary (income + expense)": [
+        "SELECT COALESCE(SUM(amount), 0) FROM transactions WHERE type = 'Income'",
+        "SELECT COALESCE(SUM(amount), 0) FROM transactions WHERE type = 'Expense'",
+    ],
+    "category summary": [
+        "SELECT category, type, SUM(amount), COUNT(*) FROM transactions "
+        "GROUP BY category, type ORDER BY type, 3 DESC",
+    ],
+    "monthly summary (v1 SQL)": [
+        "SELECT strftime('%Y-%m', date) AS month, type, SUM(amount), COUNT(*) "
+        "FROM transactions GROUP BY month, type ORDER BY month DESC",
+    ],
+    "monthly summary (v2 SQL)": [
+        "SELECT year_month AS month, type, SUM(amount), COUNT(*) "
+        "FROM transactions GROUP BY year_month, type ORDER BY month DESC",
+    ],
+    "latest 50 transactions": [
+        "SELECT id, date, category, description, amount, type, created_at "
+        "FROM transactions ORDER BY date DESC, id DESC LIMIT 50",
+    ],
+    # A 10-day filter (filters.py): not whole months, so not from the rollup
+    "10-day range aggregate": [
+        "SELECT substr(date, 1, 7), category, type, SUM(amount), COUNT(*) FROM transactions "
+        "WHERE date >= '2024-06-05' AND date <= '2024-06-14' GROUP BY substr(date, 1, 7), category, type",
+    ],
+    "10-day range, latest 50": [
+        "SELECT id, date, type, category, description, amount FROM transactions "
+        "WHERE date >= '2024-06-05' AND date <= '2024-06-14' ORDER BY date DESC, id DESC LIMIT 50",
+    ],
+}
+
+
+def generate_rows(count, seed=42):
+    """Yield synthetic (date, category, description, amount, type) tuples"""
+    rng = random.Random(seed)
+    start = datetime.date(2015, 1, 1)
+    for _ in range(count):
+        day = start + datetime.timedelta(days=rng.randrange(3650))
+        if rng.random() < 0.1:
+            yield (day, rng.choice(INCOME_CATEGORIES), "income", round(rng.uniform(100, 5000), 2), "Income")
+        else:
+            yield (day, rng.choice(EXPENSE_CATEGORIES), "expense", round(rng.uniform(1, 300), 2), "Expense")
+
+
+def build_database(path, rows, target):
+    pool = ConnectionPool(path)
+    with pool.connection() as conn:
+        run_migrations(conn, target=target)
+        if target >= CENTS_VERSION:
+            conn.executemany(
+                "INSERT INTO transactions (date, category, description, amount_cents, type) VALUES (?, ?, ?, ?, ?)",
+                ((day, category, description, to_cents(amount), trans_type)
+                 for day, category, description, amount, trans_type in generate_rows(rows)))
+        else:
+            conn.executemany(
+                "INSERT INTO transactions (date, category, description, amount, type) VALUES (?, ?, ?, ?, ?)",
+                generate_rows(rows))
+        conn.commit()
+        conn.execute("ANALYZE")
+    return pool
+
+
+def for_version(sql, version):
+    """From version 6 on, amounts are summed as stored: INTEGER cents"""
+    return sql.replace("SUM(amount)", "SUM(amount_cents)") if version >= CENTS_VERSION else sql
+
+
+def time_query(conn, statements, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for sql in statements:
+            conn.execute(sql).fetchall()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--plans", action="store_true", help="print EXPLAIN QUERY PLAN output")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}  {'query':<28} {'v1 (ms)':>10} {'v' + str(LATEST_VERSION) + ' (ms)':>10} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            results = {}
+            for target in (1, LATEST_VERSION):
+                path = os.path.join(tmp, f"bench_{size}_v{target}.db")
+                pool = build_database(path, size, target)
+                with pool.connection() as conn:
+                    for name, statements in QUERIES.items():
+                        if target == 1 and "v2 SQL" in name:
+                            continue
+                        statements = [for_version(sql, target) for sql in statements]
+                        results[(name, target)] = time_query(conn, statements, args.repeat)
+                        if args.plans:
+                            for sql in statements:
+                                plan = conn.execute("EXPLAIN QUERY PLAN " + sql).fetchall()
+                                print(f"    v{target} {name}: " + "; ".join(row[3] for row in plan))
+                pool.close_all()
+
+            for name in QUERIES:
+                old = results.get((name, 1))
+                new = results[(name, LATEST_VERSION)]
+                old_ms = f"{old * 1000:10.2f}" if old is not None else f"{'-':>10}"
+                speedup = f"{old / new:7.1f}x" if old is not None else f"{'-':>8}"
+                print(f"{size:>10}  {name:<28} {old_ms} {new * 1000:10.2f} {speedup}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Compare the memory used per transaction by three in-memory representations.
+
+Usage:
+    python benchmarks/bench_ledger_memory.py                  # 100k and 1M rows
+    python benchmarks/bench_ledger_memory.py --sizes 10000 5000000
+
+    list of dicts      what the JSON apps load (measured with tracemalloc)
+    object DataFrame   what E-App keeps in session state (memory_usage(deep=True))
+    ColumnarLedger     typed NumPy columns + dictionaries (nbytes + dictionary strings)
+
+The same synthetic rows are used for all three. Also times a category
+total over each representation.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_indexes import generate_rows  # noqa: E402
+from columnar_ledger import ColumnarLedger  # noqa: E402
+
+
+def make_records(count):
+    return [{"date": day.isoformat(), "category": category, "description": description,
+             "amount": amount, "type": trans_type}
+            for day, category, description, amount, trans_type in generate_rows(count)]
+
+
+def measure_dicts(count):
+    tracemalloc.start()
+    records = make_records(count)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    totals = {}
+    for record in records:
+        if record["type"] == "Expense":
+            totals[record["category"]] = totals.get(record["category"], 0) + record["amount"]
+    return size, time.perf_counter() - start
+
+
+def measure_dataframe(records):
+    import pandas as pd
+
+    df = pd.DataFrame(records).astype(object)
+    size = int(df.memory_usage(deep=True).sum())
+    start = time.perf_counter()
+    df[df["type"] == "Expense"].groupby("category")["amount"].sum()
+    return size, time.perf_counter() - start
+
+
+def dictionary_bytes(dictionary):
+    return sum(sys.getsizeof(value) for value in dictionary.values)
+
+
+def measure_columnar(records):
+    ledger = ColumnarLedger.from_records(records)
+    size = ledger.nbytes + sum(dictionary_bytes(d) for d in
+                               (ledger.categories, ledger.types, ledger.descriptions))
+    start = time.perf_counter()
+    ledger.totals_by_category(ledger.mask(trans_type="Expense"))
+    return size, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}  {'representation':<18}{'bytes/row':>10}{'total MB':>10}{'category total':>16}")
+    for count in args.sizes:
+        dict_size, dict_time = measure_dicts(count)
+        records = make_records(count)
+        results = [
+            ("list of dicts", dict_size, dict_time),
+            ("object DataFrame", *measure_dataframe(records)),
+            ("ColumnarLedger", *measure_columnar(records)),
+        ]
+        del records
+        for name, size, seconds in results:
+            print(f"{count:>10,}  {name:<18}{size / count:>10.1f}{size / 2**20:>10.1f}"
+                  f"{seconds * 1000:>13.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
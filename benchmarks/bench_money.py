@@ -0,0 +1,93 @@
+"""Compare float and integer-cent sums: throughput and accumulated error.
+
+Usage:
+    python benchmarks/bench_money.py                    # 10M amounts, 1M in SQLite
+    python benchmarks/bench_money.py --rows 1000000 --sqlite-rows 200000
+
+Random amounts with two decimals are summed as:
+    float64 running      one accumulator, row by row (what SQL SUM(REAL) does)
+    float64 numpy        np.sum (pairwise summation, more accurate but still inexact)
+    int64 cents          np.sum over integer cents (exact)
+and in SQLite as SUM(amount REAL) vs SUM(amount_cents INTEGER).
+
+The error column is the difference from the exact total, computed with
+Python integers.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from money import MINOR_UNITS  # noqa: E402
+
+
+def best_of(repeat, fn):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def report(name, rows, seconds, total, exact_cents):
+    error = abs(total - exact_cents / MINOR_UNITS)
+    print(f"  {name:<24}{seconds * 1000:>10.1f} ms{rows / seconds / 1e6:>10.1f} M rows/s"
+          f"{error:>16.9f}")
+
+
+def bench_numpy(rows, repeat, rng):
+    cents = rng.integers(1, 5_000_000, size=rows, dtype=np.int64)  # 0.01 .. 50,000.00
+    amounts = cents / MINOR_UNITS
+    exact = sum(cents.tolist())
+
+    print(f"NumPy, {rows:,} amounts (exact total {exact / MINOR_UNITS:,.2f})")
+    seconds, total = best_of(repeat, lambda: float(np.cumsum(amounts)[-1]))
+    report("float64 running", rows, seconds, total, exact)
+    seconds, total = best_of(repeat, lambda: float(amounts.sum()))
+    report("float64 numpy", rows, seconds, total, exact)
+    seconds, total = best_of(repeat, lambda: int(cents.sum()) / MINOR_UNITS)
+    report("int64 cents", rows, seconds, total, exact)
+
+
+def bench_sqlite(rows, repeat, rng):
+    cents = rng.integers(1, 5_000_000, size=rows, dtype=np.int64)
+    exact = sum(cents.tolist())
+
+    print(f"SQLite, {rows:,} rows")
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "money.db"))
+        conn.execute("CREATE TABLE t (amount REAL NOT NULL, amount_cents INTEGER NOT NULL)")
+        conn.executemany("INSERT INTO t VALUES (?, ?)",
+                         ((c / MINOR_UNITS, c) for c in cents.tolist()))
+        conn.commit()
+        seconds, total = best_of(repeat, lambda: conn.execute("SELECT SUM(amount) FROM t").fetchone()[0])
+        report("SUM(amount REAL)", rows, seconds, total, exact)
+        seconds, total = best_of(repeat, lambda: conn.execute("SELECT SUM(amount_cents) FROM t").fetchone()[0])
+        report("SUM(amount_cents)", rows, seconds, total / MINOR_UNITS, exact)
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--sqlite-rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"  {'method':<24}{'time':>13}{'throughput':>19}{'abs error':>16}")
+    bench_numpy(args.rows, args.repeat, rng)
+    if args.sqlite_rows:
+        bench_sqlite(args.sqlite_rows, args.repeat, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Benchmark description search: FTS5 (search.py) vs LIKE vs pandas str.contains.
+
+Usage:
+    python benchmarks/bench_search.py                   # 1M transactions
+    python benchmarks/bench_search.py --rows 100000 --repeat 20
+
+A fully migrated database is filled with synthetic transactions whose
+descriptions are drawn from a vocabulary of merchants and items. Each query
+returns the best 50 matches. Times are the median of --repeat runs.
+    fts       search.search_transactions (index lookup, bm25 ranking)
+    like      description LIKE '%word%' on every row
+    pandas    str.contains over a DataFrame already in memory
+"""
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_pool import ConnectionPool  # noqa: E402
+from filters import TransactionFilter  # noqa: E402
+from migrations import run_migrations  # noqa: E402
+import search  # noqa: E402
+
+MERCHANTS = ["Naivas", "Carrefour", "Quickmart", "Java House", "Artcaffe", "Uber", "Bolt", "Shell",
+             "Total", "Safaricom", "KPLC", "Netflix", "Jumia", "Glovo", "Chandarana", "Cleanshelf"]
+ITEMS = ["groceries", "coffee", "lunch", "dinner", "fuel", "airtime", "electricity", "rent", "taxi",
+         "books", "shoes", "medicine", "school fees", "internet", "water bill", "gift", "movie tickets"]
+CATEGORIES = ["Food & Dining", "Transportation", "Entertainment", "Shopping",
+              "Bills & Utilities", "Healthcare", "Education", "Other"]
+
+QUERIES = {
+    "one word": "coffee",
+    "two words": "coffee java",
+    "prefix (typing)": "carr",
+    "rare word": "cleanshelf medicine",
+    "category word": "healthcare",
+}
+
+
+def build_database(path, rows, seed=42):
+    rng = random.Random(seed)
+    start = datetime.date(2015, 1, 1)
+
+    def generate():
+        for i in range(rows):
+            yield (str(start + datetime.timedelta(days=rng.randrange(3650))), rng.choice(CATEGORIES),
+                   f"{rng.choice(ITEMS).title()} at {rng.choice(MERCHANTS)} #{i % 997}",
+                   rng.randrange(100, 30000), "Expense")
+
+    pool = ConnectionPool(path)
+    with pool.connection() as conn:
+        run_migrations(conn)
+        conn.executemany("INSERT INTO transactions (date, category, description, amount_cents, type) "
+                         "VALUES (?, ?, ?, ?, ?)", generate())
+        conn.commit()
+        conn.execute("ANALYZE")
+    return pool
+
+
+def median_ms(repeat, fn):
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--skip-pandas", action="store_true", help="don't load the table into pandas")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        pool = build_database(os.path.join(tmp, "search.db"), args.rows)
+        print(f"{args.rows:,} transactions built in {time.perf_counter() - started:.1f}s (index kept by triggers)")
+
+        with pool.connection() as conn:
+            frame = None
+            if not args.skip_pandas:
+                import pandas as pd
+                frame = pd.read_sql_query("SELECT id, date, category, description, amount FROM transactions", conn)
+
+            last_month = TransactionFilter(datetime.date(2024, 11, 1), datetime.date(2024, 11, 30))
+            print(f"{'query':<22}{'matches':>9}{'fts (ms)':>10}{'+filter':>9}{'like (ms)':>11}{'pandas (ms)':>13}")
+            for name, text in QUERIES.items():
+                fts_ms, _ = median_ms(args.repeat, lambda: search.search_transactions(conn, text))
+                filtered_ms, _ = median_ms(args.repeat, lambda: search.search_transactions(
+                    conn, text, transaction_filter=last_month))
+                matches = conn.execute("SELECT COUNT(*) FROM transactions_fts WHERE transactions_fts MATCH ?",
+                                       (search.match_query(text),)).fetchone()[0]
+
+                words = text.split()
+                like_sql = ("SELECT id FROM transactions WHERE "
+                            + " AND ".join("description LIKE ?" for _ in words)
+                            + " ORDER BY date DESC, id DESC LIMIT 50")
+                like_ms, _ = median_ms(max(1, args.repeat // 5), lambda: conn.execute(
+                    like_sql, [f"%{word}%" for word in words]).fetchall())
+
+                pandas_text = f"{'-':>13}"
+                if frame is not None:
+                    def pandas_search():
+                        mask = None
+                        for word in words:
+                            hit = frame["description"].str.contains(word, case=False, regex=False)
+                            mask = hit if mask is None else mask & hit
+                        return frame[mask].head(50)
+                    pandas_ms, _ = median_ms(max(1, args.repeat // 5), pandas_search)
+                    pandas_text = f"{pandas_ms:>13.1f}"
+
+                print(f"{name:<22}{matches:>9,}{fts_ms:>10.2f}{filtered_ms:>9.2f}{like_ms:>11.1f}{pandas_text}")
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
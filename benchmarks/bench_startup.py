@@ -0,0 +1,126 @@
+"""Benchmark cold start of the Streamlit entry points: import cost and first render.
+
+Usage:
+    python benchmarks/bench_startup.py                  # all three apps, best of 3
+    python benchmarks/bench_startup.py --apps E_APP1.py --repeat 5 --top 12
+
+For each app, in fresh subprocesses (so nothing is already imported):
+    imports         the script's own top-level imports on top of ``import
+                    streamlit``, measured with ``python -X importtime``; the
+                    heaviest ones are listed
+    first render    AppTest.from_file(app).run() -- executing the whole page
+                    once, as for a new browser session on a cold server
+    rerun           a second run() in the same process (warm imports)
+
+The apps run in a temporary copy of the repository with no data files, so
+every run starts from an empty database / expenses.json.
+"""
+import argparse
+import ast
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+APPS = ["E_APP1.py", "E-App.py", "Expense_App.py"]
+
+
+def copy_repo(directory):
+    """Code and images only: the apps create fresh data files"""
+    for name in os.listdir(ROOT):
+        if name.endswith((".py", ".jpg")):
+            shutil.copy(os.path.join(ROOT, name), directory)
+
+
+def top_level_imports(path):
+    """The import statements at module level of a script, as source lines"""
+    with open(path, encoding="utf-8") as file:
+        tree = ast.parse(file.read())
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def import_profile(app, directory):
+    """(total ms, [(ms, module)]) for the app's imports beyond streamlit itself"""
+    code = "import streamlit\n" + "\n".join(top_level_imports(os.path.join(directory, app)))
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=directory,
+                            check=True, capture_output=True, text=True).stderr
+
+    seen_streamlit = False
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.startswith(" ") and not name.startswith("  "):
+            # Top-level entry: its cumulative time includes everything it pulled in
+            name = name.strip()
+            if name == "streamlit":
+                seen_streamlit = True
+            elif seen_streamlit:
+                modules.append((int(cumulative) / 1000, name))
+    modules.sort(reverse=True)
+    return sum(ms for ms, _ in modules), modules
+
+
+def render_child(app):
+    """Runs in the subprocess: time the first page run and one rerun"""
+    from streamlit.testing.v1 import AppTest
+
+    sys.path.insert(0, os.getcwd())  # the copy's modules, as `streamlit run` would see them
+    start = time.perf_counter()
+    app_test = AppTest.from_file(os.path.abspath(app), default_timeout=120).run()
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    app_test.run()
+    rerun = time.perf_counter() - start
+    errors = [str(exception.value) for exception in app_test.exception]
+    return {"first_render_ms": first * 1000, "rerun_ms": rerun * 1000, "errors": errors}
+
+
+def render(app, directory):
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", app], cwd=directory,
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--apps", nargs="+", choices=APPS, default=APPS)
+    parser.add_argument("--repeat", type=int, default=3, help="fresh processes per app (best is shown)")
+    parser.add_argument("--top", type=int, default=8, help="heaviest imports to list per app")
+    parser.add_argument("--child", choices=APPS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(render_child(args.child)))
+        return
+
+    for app in args.apps:
+        imports, renders = [], []
+        for _ in range(args.repeat):
+            # A new copy each time: no database, journal or __pycache__ left from the last run
+            with tempfile.TemporaryDirectory() as directory:
+                copy_repo(directory)
+                imports.append(import_profile(app, directory))
+            with tempfile.TemporaryDirectory() as directory:
+                copy_repo(directory)
+                renders.append(render(app, directory))
+
+        import_ms, modules = min(imports)
+        first = min(result["first_render_ms"] for result in renders)
+        rerun = statistics.median(result["rerun_ms"] for result in renders)
+        print(f"{app}: imports {import_ms:.0f} ms, first render {first:.0f} ms, rerun {rerun:.0f} ms")
+        for ms, name in modules[:args.top]:
+            print(f"    {ms:>8.1f} ms  {name}")
+        for error in renders[-1]["errors"]:
+            print(f"    error: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Conformance and throughput of every storage engine (storage_engines.py).
+
+Usage:
+    python benchmarks/bench_storage.py                    # 20,000 records, every engine
+    python benchmarks/bench_storage.py --rows 200000 --engines journal sqlite memory
+
+The same seeded workload (about one record in ten is income) runs against
+each engine in a temporary directory:
+    add       the first --single records with one add() each (a user submitting the form)
+    bulk      the rest with add_many(), --batch records per call
+    reopen    close, open again and count() (a cold start; not for memory)
+    totals    summary() + category_totals() + month_totals()
+    scan      read every record back with records()
+    migrate   migrate() everything into a fresh memory engine
+Then the conformance check compares each engine's records and totals with
+exact totals computed from the workload, and the migrated copy with the
+source. Each engine runs with the durability the apps use: the JSON engines
+fsync every write, SQLite runs in WAL mode with synchronous=NORMAL.
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage_engines  # noqa: E402
+from money import from_cents, to_cents  # noqa: E402
+
+CATEGORIES = ["Food & Dining", "Transportation", "Entertainment", "Shopping",
+              "Bills & Utilities", "Healthcare", "Education", "Other"]
+INCOME_CATEGORIES = ["Salary", "Freelance", "Investment"]
+
+FILE_NAMES = {"json": "expenses.json", "journal": "expenses.json", "sqlite": "expenses.db"}
+
+
+def make_workload(rows, seed=42):
+    rng = random.Random(seed)
+    start = datetime.date(2022, 1, 1)
+    workload = []
+    for i in range(rows):
+        income = rng.random() < 0.1
+        workload.append({
+            "date": str(start + datetime.timedelta(days=rng.randrange(3 * 365))),
+            "category": rng.choice(INCOME_CATEGORIES if income else CATEGORIES),
+            "description": f"Record {i}",
+            "amount": rng.randrange(100, 500000) / 100,
+            "type": "Income" if income else "Expense",
+        })
+    return workload
+
+
+def expected_results(workload):
+    """What every engine must return for the workload, computed independently in cents"""
+    income = expenses = 0
+    categories, months = {}, {}
+    for record in workload:
+        cents = to_cents(record["amount"])
+        if record["type"] == "Income":
+            income += cents
+            continue
+        expenses += cents
+        categories[record["category"]] = categories.get(record["category"], 0) + cents
+        months[record["date"][:7]] = months.get(record["date"][:7], 0) + cents
+    return {
+        "count": len(workload),
+        "records": [dict(record) for record in workload],
+        "summary": (from_cents(income), from_cents(expenses), from_cents(income - expenses)),
+        "category_totals": {category: from_cents(cents) for category, cents in categories.items()},
+        "month_totals": [(month, from_cents(months[month])) for month in sorted(months)],
+    }
+
+
+def results_of(engine):
+    return {
+        "count": engine.count(),
+        "records": list(engine.records()),
+        "summary": tuple(engine.summary()),
+        "category_totals": dict(engine.category_totals()),
+        "month_totals": list(engine.month_totals().items()),
+    }
+
+
+def differences(actual, expected):
+    """Names of the results that differ"""
+    return [name for name in expected if actual[name] != expected[name]]
+
+
+def run(name, workload, expected, single, batch, directory):
+    spec = name
+    if name in FILE_NAMES:
+        spec = f"{name}:{os.path.join(directory, name, FILE_NAMES[name])}"
+        os.makedirs(os.path.join(directory, name))
+    timings = {}
+
+    engine = storage_engines.open_engine(spec)
+    start = time.perf_counter()
+    for record in workload[:single]:
+        engine.add(record)
+    timings["add/s"] = single / max(time.perf_counter() - start, 1e-9)
+
+    rest = workload[single:]
+    start = time.perf_counter()
+    for i in range(0, len(rest), batch):
+        engine.add_many(rest[i:i + batch])
+    timings["bulk rec/s"] = len(rest) / max(time.perf_counter() - start, 1e-9)
+
+    if engine.persistent:
+        engine.close()
+        start = time.perf_counter()
+        engine = storage_engines.open_engine(spec)
+        engine.count()
+        timings["reopen ms"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    engine.summary()
+    engine.category_totals()
+    engine.month_totals()
+    timings["totals ms"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    scanned = sum(1 for _ in engine.records())
+    timings["scan rec/s"] = scanned / max(time.perf_counter() - start, 1e-9)
+
+    copy = storage_engines.MemoryEngine()
+    start = time.perf_counter()
+    copied = storage_engines.migrate(engine, copy)
+    timings["migrate rec/s"] = copied / max(time.perf_counter() - start, 1e-9)
+
+    failed = differences(results_of(engine), expected)
+    failed += [f"migrated {item}" for item in differences(results_of(copy), expected)]
+    engine.close()
+    return timings, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--single", type=int, default=200, help="records added one at a time")
+    parser.add_argument("--batch", type=int, default=1000, help="records per add_many()")
+    parser.add_argument("--engines", nargs="+", choices=list(storage_engines.ENGINES),
+                        default=list(storage_engines.ENGINES))
+    args = parser.parse_args()
+
+    workload = make_workload(args.rows)
+    expected = expected_results(workload)
+    columns = ["add/s", "bulk rec/s", "reopen ms", "totals ms", "scan rec/s", "migrate rec/s"]
+    print(f"{args.rows:,} records ({min(args.single, args.rows):,} one at a time, the rest in batches of {args.batch:,})")
+    print(f"{'engine':<10}" + "".join(f"{column:>15}" for column in columns) + "  conformance")
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        for name in args.engines:
+            timings, failed = run(name, workload, expected, args.single, args.batch, directory)
+            cells = "".join(f"{timings[column]:>15,.1f}" if column in timings else f"{'-':>15}"
+                            for column in columns)
+            print(f"{name:<10}{cells}  {'ok' if not failed else 'FAILED: ' + ', '.join(failed)}")
+            failures += bool(failed)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Benchmark concurrent inserts through the write queue at each durability level.
+
+Usage:
+    python benchmarks/bench_write_queue.py                    # 8 writers x 200 rows
+    python benchmarks/bench_write_queue.py --writers 32 --rows 100 --synchronous NORMAL
+
+Each writer thread plays a user submitting the sidebar form ``--rows`` times.
+"submit" is how long the writers were blocked in total, and "all committed"
+includes waiting for the queue to drain. synchronous=FULL (the default here)
+fsyncs on every commit, which is where group commits pay off.
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_pool import CONNECTION_PRAGMAS, ConnectionPool  # noqa: E402
+from migrations import run_migrations  # noqa: E402
+import write_queue  # noqa: E402
+
+INSERT_SQL = ("INSERT INTO transactions (date, category, description, amount_cents, type) "
+              "VALUES (?, ?, ?, ?, ?)")
+
+
+def run(durability, writers, rows, synchronous, directory):
+    path = os.path.join(directory, f"queue_{durability}.db")
+    pool = ConnectionPool(path, pragmas={**CONNECTION_PRAGMAS, "synchronous": synchronous})
+    with pool.connection() as conn:
+        run_migrations(conn)
+    queue = write_queue.WriteQueue(write_queue.SQLiteSink(pool, INSERT_SQL), durability=durability)
+
+    def writer(number):
+        for i in range(rows):
+            queue.submit((datetime.date(2024, 1, 1 + i % 28), "Food & Dining", f"writer {number}", 100 + i,
+                          "Expense"), session=number)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    submitted = time.perf_counter() - start
+    queue.flush()
+    committed = time.perf_counter() - start
+    stats = queue.stats()
+    queue.close()
+
+    with pool.connection() as conn:
+        count = conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+    pool.close_all()
+    assert count == writers * rows, (count, writers * rows)
+    return submitted, committed, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--synchronous", default="FULL", choices=["OFF", "NORMAL", "FULL"])
+    args = parser.parse_args()
+
+    total = args.writers * args.rows
+    print(f"{total:,} rows from {args.writers} writers, synchronous={args.synchronous}")
+    print(f"  {'durability':<12}{'submit':>10}{'all committed':>15}{'commits':>9}{'rows/s':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for durability in write_queue.DURABILITY_LEVELS:
+            submitted, committed, stats = run(durability, args.writers, args.rows, args.synchronous, tmp)
+            print(f"  {durability:<12}{submitted * 1000:>8.0f}ms{committed * 1000:>13.0f}ms"
+                  f"{stats['batches']:>9}{total / committed:>10,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""Benchmark suite: the core operations on synthetic ledgers, with JSON results to compare runs.
+
+Usage:
+    python benchmarks/run_benchmarks.py                            # 10k and 100k rows
+    python benchmarks/run_benchmarks.py --sizes 10000 1000000 10000000 --data-dir ~/bench-data
+    python benchmarks/run_benchmarks.py --output after.json --compare before.json
+
+For every size, a ledger from synthetic.py (seeded, so every run and every
+machine times the same data) is written to a fresh SQLite database through
+the app's schema and triggers. With --data-dir, databases are kept and
+reused by later runs, which saves rebuilding 10M rows. Then each operation is
+timed, median of --repeat runs (heavy ones: export, JSON, fewer runs):
+
+    insert.bulk          building the ledger (rows/s; only when it was built)
+    insert.single        one INSERT + commit, as the sidebar form does
+    summary              income / expense totals        (expense_core.get_summary)
+    category_summary     totals per category and type   (expense_core.get_category_summary)
+    monthly_summary      totals per month and type      (expense_core.get_monthly_summary)
+    dashboard            every dashboard aggregate      (dashboard.load_dashboard_snapshot)
+    dashboard.30_days    the same for the last 30 days (not month-aligned: no rollup)
+    history.page_1       first page of the history      (history.get_transactions_page)
+    history.page_100     page 100 (keyset cursor of page 99)
+    search               full-text search for one word  (search.search_transactions)
+    export.csv           the whole ledger as CSV        (exporter.export_to_path)
+    cashflow.full        daily totals of every transaction (cashflow.read_daily_totals)
+    cashflow.incremental one new transaction added to the daily totals (what a refresh after an insert does)
+    cashflow.series      daily balance, net flow and rolling average from the daily totals
+    cashflow.naive       the same daily balance from every transaction in pandas (what cashflow.py avoids)
+    json.load            expenses.json with json.load   (what the JSON apps used to do)
+    json.ledger_load     expenses.json through ExpenseLedger.load (snapshot + totals)
+    json.save            the whole list rewritten, as a compaction does
+
+JSON operations run up to --json-max-rows (a 10M-row JSON list needs
+several GB of RAM). Nothing here imports Streamlit, so the suite runs
+headless (CI, a server over SSH).
+
+Results are written to --output as JSON (machine, versions, commit and one
+entry per size and operation). --compare prints each operation against an
+earlier results file and exits with status 1 if any got slower by more than
+--threshold.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import synthetic  # noqa: E402
+import cashflow  # noqa: E402
+from dashboard import load_dashboard_snapshot  # noqa: E402
+from db_pool import ConnectionPool  # noqa: E402
+from expense_core import (  # noqa: E402
+    CATEGORY_SUMMARY_SQL, INSERT_TRANSACTION_SQL, MONTHLY_SUMMARY_SQL, SUMMARY_SQL,
+)
+from expense_ledger import ExpenseLedger  # noqa: E402
+import exporter  # noqa: E402
+from filters import TransactionFilter, aggregate_source  # noqa: E402
+from history import get_transactions_page  # noqa: E402
+from search import search_transactions  # noqa: E402
+
+RESULTS_VERSION = 1
+
+SINGLE_INSERTS = 100
+
+
+def timed(runs, fn):
+    """(median ms, min ms) over ``runs`` calls"""
+    times = []
+    for _ in range(max(1, runs)):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), min(times)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# -----------------------------
+# Operations
+# -----------------------------
+def database_operations(conn, rows):
+    """name -> (function, heavy) for the operations on a built database"""
+    source, params = aggregate_source(None)
+    last_day = conn.execute("SELECT MAX(date) FROM transactions").fetchone()[0]
+    last_day = datetime.date.fromisoformat(str(last_day)[:10])
+    last_30_days = TransactionFilter(last_day - datetime.timedelta(days=29), last_day)
+
+    def summary():
+        for trans_type in ("Income", "Expense"):
+            conn.execute(SUMMARY_SQL.format(source=source), params + [trans_type]).fetchone()
+
+    # Cursor of page 100 (found once, untimed): a deep page costs the same as page 1
+    page_100_cursor = None
+    for _ in range(99):
+        _, next_cursor = get_transactions_page(conn, 25, page_100_cursor)
+        if next_cursor is None:
+            break
+        page_100_cursor = next_cursor
+
+    def export_csv():
+        with tempfile.TemporaryDirectory() as directory:
+            exporter.export_to_path(conn, os.path.join(directory, "export.csv"), "csv")
+
+    daily = cashflow.read_daily_totals(conn)
+    last_id = conn.execute("SELECT MAX(id) FROM transactions").fetchone()[0]
+
+    def cashflow_incremental():
+        # What CashflowTracker.refresh() does after one insert: read the new row, add it to its day
+        conn.execute("SELECT edits FROM ledger_edits WHERE id = 1").fetchone()
+        daily.add(cashflow.read_daily_totals(conn, last_id - 1, last_id), fill_value=0).astype('int64')
+
+    def cashflow_naive():
+        df = pd.read_sql_query("SELECT date, type, amount FROM transactions", conn)
+        df['date'] = pd.to_datetime(df['date'])
+        df['signed'] = df['amount'].where(df['type'] == 'Income', -df['amount'])
+        df.groupby('date')['signed'].sum().asfreq('D', fill_value=0).cumsum()
+
+    return {
+        "summary": (summary, False),
+        "category_summary": (lambda: conn.execute(CATEGORY_SUMMARY_SQL.format(source=source), params).fetchall(),
+                             False),
+        "monthly_summary": (lambda: conn.execute(MONTHLY_SUMMARY_SQL.format(source=source), params).fetchall(),
+                            False),
+        "dashboard": (lambda: load_dashboard_snapshot(conn), False),
+        "dashboard.30_days": (lambda: load_dashboard_snapshot(conn, last_30_days), False),
+        "history.page_1": (lambda: get_transactions_page(conn, 25), False),
+        "history.page_100": (lambda: get_transactions_page(conn, 25, page_100_cursor), False),
+        "search": (lambda: search_transactions(conn, "groceries"), False),
+        "export.csv": (export_csv, True),
+        "cashflow.full": (lambda: cashflow.read_daily_totals(conn), True),
+        "cashflow.incremental": (cashflow_incremental, False),
+        "cashflow.series": (lambda: cashflow.cashflow_series(daily, "D"), False),
+        "cashflow.naive": (cashflow_naive, True),
+    }
+
+
+def single_inserts(conn):
+    """Time SINGLE_INSERTS committed inserts, then delete them again (the database may be reused)"""
+    ids = []
+
+    def insert():
+        ids.append(conn.execute(INSERT_TRANSACTION_SQL, ("2024-12-31", "Food & Dining", "Benchmark lunch", 45000,
+                                             "Expense")).lastrowid)
+        conn.commit()
+
+    median_ms, min_ms = timed(SINGLE_INSERTS, insert)
+    conn.executemany("DELETE FROM transactions WHERE id = ?", [(row_id,) for row_id in ids])
+    conn.commit()
+    return median_ms, min_ms
+
+
+def json_operations(path, rows, seed):
+    """name -> (function, heavy) for the JSON storage of the same ledger"""
+    synthetic.write_json(path, rows, seed)
+    with open(path) as file:
+        expenses = json.load(file)
+
+    def ledger_load():
+        for suffix in (".log", ".totals"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        ExpenseLedger(path).load()
+
+    def save():
+        with open(path + ".new", "w") as file:
+            json.dump(expenses, file, indent=4)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(path + ".new", path)
+
+    def load():
+        with open(path) as file:
+            json.load(file)
+
+    return {
+        "json.load": (load, True),
+        "json.ledger_load": (ledger_load, True),
+        "json.save": (save, True),
+    }
+
+
+def run_size(rows, args, directory):
+    """Benchmark one ledger size; returns the result entries"""
+    results = []
+
+    def record(operation, median_ms, min_ms, runs, **extra):
+        entry = {"rows": rows, "operation": operation, "median_ms": round(median_ms, 4),
+                 "min_ms": round(min_ms, 4), "runs": runs, **extra}
+        results.append(entry)
+        rate = f"  {extra['rows_per_s']:,.0f} rows/s" if "rows_per_s" in extra else ""
+        print(f"  {operation:<20}{median_ms:>12.3f} ms{rate}")
+
+    db_path = os.path.join(args.data_dir or directory, f"ledger_{rows}_{args.seed}.db")
+    if args.data_dir and os.path.exists(db_path):
+        print(f"{rows:,} rows (reusing {db_path})")
+    else:
+        print(f"{rows:,} rows (building {db_path})")
+        started = time.perf_counter()
+        rate = synthetic.build_database(db_path, rows, args.seed)
+        record("insert.bulk", (time.perf_counter() - started) * 1000, (time.perf_counter() - started) * 1000, 1,
+               rows_per_s=round(rate))
+
+    pool = ConnectionPool(db_path)
+    with pool.connection() as conn:
+        median_ms, min_ms = single_inserts(conn)
+        record("insert.single", median_ms, min_ms, SINGLE_INSERTS)
+        for name, (fn, heavy) in database_operations(conn, rows).items():
+            runs = max(1, args.repeat // 3) if heavy else args.repeat
+            record(name, *timed(runs, fn), runs)
+    pool.close_all()
+
+    if rows <= args.json_max_rows:
+        json_path = os.path.join(directory, f"expenses_{rows}.json")
+        for name, (fn, heavy) in json_operations(json_path, rows, args.seed).items():
+            runs = max(1, args.repeat // 3) if heavy else args.repeat
+            record(name, *timed(runs, fn), runs)
+    return results
+
+
+# -----------------------------
+# Comparing runs
+# -----------------------------
+def compare(results, baseline, threshold, noise_ms):
+    """Print current vs baseline per (rows, operation). Returns the number of regressions"""
+    before = {(entry["rows"], entry["operation"]): entry for entry in baseline["results"]}
+    print(f"\nCompared with {baseline['meta'].get('commit') or 'baseline'} "
+          f"({baseline['meta'].get('created', '?')}):")
+    print(f"{'rows':>12}  {'operation':<20}{'before ms':>12}{'after ms':>12}{'change':>9}")
+    regressions = 0
+    for entry in results:
+        old = before.get((entry["rows"], entry["operation"]))
+        if old is None:
+            continue
+        ratio = entry["median_ms"] / old["median_ms"] if old["median_ms"] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold and entry["median_ms"] - old["median_ms"] > noise_ms:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif ratio < 1 / (1 + threshold) and old["median_ms"] - entry["median_ms"] > noise_ms:
+            flag = "  faster"
+        print(f"{entry['rows']:>12,}  {entry['operation']:<20}{old['median_ms']:>12.3f}"
+              f"{entry['median_ms']:>12.3f}{ratio - 1:>+9.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--seed", type=int, default=synthetic.DEFAULT_SEED)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--data-dir", help="keep the built databases here and reuse them")
+    parser.add_argument("--json-max-rows", type=int, default=1_000_000,
+                        help="largest size for the JSON operations")
+    parser.add_argument("--output", default="bench_results.json", help="where to write the results")
+    parser.add_argument("--compare", metavar="BASELINE", help="results file of an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="slowdown that counts as a regression (0.25 = 25%%)")
+    parser.add_argument("--noise-ms", type=float, default=0.05,
+                        help="ignore differences smaller than this")
+    args = parser.parse_args()
+    if args.data_dir:
+        os.makedirs(args.data_dir, exist_ok=True)
+
+    meta = {
+        "version": RESULTS_VERSION,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.sizes:
+            results.extend(run_size(rows, args, directory))
+
+    with open(args.output, "w") as file:
+        json.dump({"meta": meta, "results": results}, file, indent=2)
+    print(f"\nResults written to {args.output}")
+    if "streamlit" in sys.modules:
+        print("warning: streamlit was imported; the suite is meant to run without it")
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold, args.noise_ms)
+        if regressions:
+            print(f"{regressions} regression(s) over {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""Seeded synthetic ledgers for benchmarks: 10k to 10M realistic transactions.
+
+The same (rows, seed) always gives the same transactions. Their shape
+follows a household ledger rather than uniform noise:
+  * a salary on the 25th of every month plus occasional freelance,
+    investment and gift income (about 1 row in 12 is income);
+  * expenses weighted towards everyday categories (food and transport are
+    half of all rows), with log-normal amounts around a per-category median
+    (a lunch is ~450, school fees ~5,000);
+  * more spending on weekends and in December, and a little more every
+    year, so recent months are larger than old ones;
+  * descriptions drawn from per-category items and merchants, so they
+    repeat the way real ones do (what the search index and the columnar
+    ledger's dictionary encoding see).
+
+Rows are (date 'YYYY-MM-DD', category, description, amount_cents, type)
+tuples, produced in chunks so 10M rows never sit in memory at once.
+
+Usage:
+    python benchmarks/synthetic.py --rows 100000 --db expenses.db
+    python benchmarks/synthetic.py --rows 10000 --json expenses.json
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from money import from_cents  # noqa: E402
+
+DEFAULT_SEED = 42
+DEFAULT_END = datetime.date(2024, 12, 31)
+CHUNK_SIZE = 100_000
+
+# category: (share of expense rows, median amount, items, merchants)
+EXPENSES = {
+    "Food & Dining": (0.32, 450, ["Lunch", "Groceries", "Coffee", "Dinner", "Snacks"],
+                      ["Java House", "Naivas", "Carrefour", "Artcaffe", "Quickmart", "Kilimanjaro"]),
+    "Transportation": (0.18, 250, ["Matatu fare", "Taxi", "Fuel", "Parking", "Boda boda"],
+                       ["Uber", "Bolt", "Shell", "TotalEnergies", "Little Cab"]),
+    "Shopping": (0.13, 1500, ["Clothes", "Shoes", "Household items", "Electronics", "Gift"],
+                 ["Jumia", "Mr Price", "Bata", "Hotpoint", "Kilimall"]),
+    "Bills & Utilities": (0.10, 3000, ["Electricity", "Water bill", "Internet", "Airtime", "Rent"],
+                          ["KPLC", "Nairobi Water", "Safaricom", "Zuku", "Landlord"]),
+    "Entertainment": (0.09, 800, ["Movie tickets", "Streaming", "Concert", "Games", "Outing"],
+                      ["Netflix", "Showmax", "IMAX", "Westgate", "Spotify"]),
+    "Healthcare": (0.06, 1200, ["Pharmacy", "Consultation", "Lab tests", "Dental", "Insurance"],
+                   ["Goodlife", "Aga Khan", "MP Shah", "Haltons", "AAR"]),
+    "Education": (0.04, 5000, ["School fees", "Books", "Online course", "Stationery", "Exam fees"],
+                  ["Text Book Centre", "Udemy", "Coursera", "KCB", "Bookpoint"]),
+    "Other": (0.08, 600, ["Donation", "Haircut", "Repairs", "Laundry", "Miscellaneous"],
+              ["M-Pesa", "Barber", "Fundi", "Dry Cleaners", "Church"]),
+}
+
+# category: (median amount, descriptions)
+INCOME = {
+    "Freelance": (8000, ["Web design project", "Consulting", "Logo design", "Writing gig"]),
+    "Investment": (3000, ["Dividends", "Interest", "Money market"]),
+    "Gift": (2000, ["Birthday gift", "Family support"]),
+}
+SALARY = (95000, "Monthly salary")
+INCOME_SHARE = 0.08   # share of non-salary rows that are income
+AMOUNT_SPREAD = 0.7   # sigma of the log-normal amounts
+YEARLY_GROWTH = 0.15  # each year has this much more activity than the one before
+
+
+def _day_weights(start, days):
+    """Relative activity of each day: weekends, December and recent years are busier"""
+    ordinals = np.arange(days)
+    dates = np.array([start + datetime.timedelta(days=int(d)) for d in ordinals])
+    weekday = np.array([d.weekday() for d in dates])
+    month = np.array([d.month for d in dates])
+    weights = np.where(weekday >= 5, 1.5, 1.0)
+    weights *= np.where(month == 12, 1.4, 1.0)
+    weights *= (1 + YEARLY_GROWTH) ** (ordinals / 365.0)
+    return dates, weights / weights.sum()
+
+
+def _descriptions(items, merchants):
+    return [f"{item} at {merchant}" for item in items for merchant in merchants]
+
+
+def iter_chunks(rows, seed=DEFAULT_SEED, years=None, end=DEFAULT_END, chunk_size=CHUNK_SIZE):
+    """Yield lists of (date, category, description, amount_cents, type) tuples, ``rows`` in total.
+
+    The ledger covers ``years`` years up to ``end`` (by default about 30
+    transactions a week: 1 year for 1,500 rows, capped at 20 years).
+    Rows are in no particular date order, like a ledger that was edited.
+    """
+    if years is None:
+        years = int(min(max(rows / 1500, 1), 20))
+    start = end.replace(year=end.year - years) + datetime.timedelta(days=1)
+    rng = np.random.default_rng(seed)
+
+    salaries = []
+    month = start.replace(day=1)
+    while month <= end:
+        payday = month.replace(day=25)
+        if start <= payday <= end:
+            salaries.append(payday)
+        month = (month + datetime.timedelta(days=32)).replace(day=1)
+    salaries = salaries[:rows]
+
+    dates, day_weights = _day_weights(start, (end - start).days + 1)
+    expense_names = list(EXPENSES)
+    expense_share = np.array([EXPENSES[name][0] for name in expense_names])
+    expense_share /= expense_share.sum()
+    expense_descriptions = [_descriptions(*EXPENSES[name][2:]) for name in expense_names]
+    expense_medians = np.log([EXPENSES[name][1] for name in expense_names])
+    income_names = list(INCOME)
+    income_medians = np.log([INCOME[name][0] for name in income_names])
+
+    # Salaries first, in their own chunk(s), with a 5% raise every year
+    salary_rows = [(str(day), "Salary", SALARY[1],
+                    int(round(SALARY[0] * (1.05 ** (day.year - start.year)))) * 100, "Income")
+                   for day in salaries]
+    for i in range(0, len(salary_rows), chunk_size):
+        yield salary_rows[i:i + chunk_size]
+
+    remaining = rows - len(salaries)
+    while remaining > 0:
+        count = min(chunk_size, remaining)
+        remaining -= count
+        day_index = rng.choice(len(dates), size=count, p=day_weights)
+        is_income = rng.random(count) < INCOME_SHARE
+        expense_code = rng.choice(len(expense_names), size=count, p=expense_share)
+        income_code = rng.integers(len(income_names), size=count)
+        log_median = np.where(is_income, income_medians[income_code], expense_medians[expense_code])
+        amount_cents = np.maximum(np.rint(rng.lognormal(log_median, AMOUNT_SPREAD) * 100), 100).astype(np.int64)
+        pick = rng.integers(1 << 30, size=count)
+
+        chunk = []
+        for i in range(count):
+            if is_income[i]:
+                name = income_names[income_code[i]]
+                choices = INCOME[name][1]
+                trans_type = "Income"
+            else:
+                name = expense_names[expense_code[i]]
+                choices = expense_descriptions[expense_code[i]]
+                trans_type = "Expense"
+            chunk.append((str(dates[day_index[i]]), name, choices[pick[i] % len(choices)],
+                          int(amount_cents[i]), trans_type))
+        yield chunk
+
+
+def generate(rows, seed=DEFAULT_SEED, **kwargs):
+    """All rows as one list (for small ledgers)"""
+    return [row for chunk in iter_chunks(rows, seed, **kwargs) for row in chunk]
+
+
+# -----------------------------
+# Writing a ledger
+# -----------------------------
+def build_database(path, rows, seed=DEFAULT_SEED, progress=None):
+    """Create a fully migrated expenses database at ``path`` filled with ``rows`` transactions.
+
+    Rows go through the app's triggers (rollup, search index), exactly as
+    the app's own inserts do. Returns the insert rate in rows per second.
+    """
+    from db_pool import ConnectionPool
+    from migrations import run_migrations
+
+    pool = ConnectionPool(path)
+    with pool.connection() as conn:
+        run_migrations(conn)
+        started = time.perf_counter()
+        written = 0
+        for chunk in iter_chunks(rows, seed):
+            conn.executemany("INSERT INTO transactions (date, category, description, amount_cents, type) "
+                             "VALUES (?, ?, ?, ?, ?)", chunk)
+            conn.commit()
+            written += len(chunk)
+            if progress is not None:
+                progress(written)
+        elapsed = time.perf_counter() - started
+        conn.execute("ANALYZE")
+    pool.close_all()
+    return written / max(elapsed, 1e-9)
+
+
+def write_json(path, rows, seed=DEFAULT_SEED):
+    """Write an expenses.json (the JSON apps' format: expenses only, no type) with up to ``rows`` expenses"""
+    expenses = [{"date": date, "category": category, "description": description, "amount": from_cents(cents)}
+                for chunk in iter_chunks(rows, seed)
+                for date, category, description, cents, trans_type in chunk if trans_type == "Expense"]
+    with open(path, "w") as file:
+        json.dump(expenses, file, indent=4)
+    return len(expenses)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--db", help="create (or add to) this SQLite database")
+    parser.add_argument("--json", help="write this expenses.json")
+    args = parser.parse_args()
+    if not args.db and not args.json:
+        parser.error("give --db and/or --json")
+
+    if args.db:
+        rate = build_database(args.db, args.rows, args.seed,
+                              progress=lambda done: print(f"\r{done:,} rows", end="", flush=True))
+        print(f"\r{args.rows:,} transactions written to {args.db} ({rate:,.0f} rows/s)")
+    if args.json:
+        written = write_json(args.json, args.rows, args.seed)
+        print(f"{written:,} expenses written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
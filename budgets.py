@@ -0,0 +1,165 @@
+"""Monthly spending limits per category, checked against actual spending.
+
+Limits live in the ``budgets`` table: one row per (category, year_month),
+in integer cents since migration 9. Actual spending is not re-summed from
+the transactions. The rollup table (migrations 4 and 6) already holds each
+(month, category, type) total and is kept up to date by triggers on every
+insert, edit and delete. So:
+  * budget vs actual for a month is one join of that month's budgets with
+    that month's rollup rows (primary-key lookups);
+  * an overspend check after an insert is two primary-key lookups, however
+    many transactions there are (check_overspend);
+  * roll_forward() copies every category's latest limit into the following
+    months that have none, for all categories, in one INSERT ... SELECT.
+"""
+import datetime
+from dataclasses import dataclass
+
+import pandas as pd
+
+from money import from_cents, to_cents
+
+
+def month_key(value):
+    """date / datetime / 'YYYY-MM' / 'YYYY-MM-DD' -> 'YYYY-MM'"""
+    if isinstance(value, datetime.date):
+        return value.strftime("%Y-%m")
+    return str(value)[:7]
+
+
+@dataclass
+class BudgetAlert:
+    """A category's spending for a month has gone past its limit"""
+    category: str
+    year_month: str
+    limit: float
+    spent: float
+
+    @property
+    def over_by(self):
+        return self.spent - self.limit
+
+
+# -----------------------------
+# CRUD
+# -----------------------------
+def set_budget(conn, category, year_month, limit):
+    """Create or change the limit of ``category`` for a month"""
+    conn.execute('''
+        INSERT INTO budgets (category, year_month, limit_cents)
+        VALUES (?, ?, ?)
+        ON CONFLICT (category, year_month) DO UPDATE SET limit_cents = excluded.limit_cents
+    ''', (category, month_key(year_month), to_cents(limit)))
+    conn.commit()
+
+
+def get_budget(conn, category, year_month):
+    """Limit of ``category`` for a month, or None if it has none"""
+    row = conn.execute("SELECT limit_cents FROM budgets WHERE category = ? AND year_month = ?",
+                       (category, month_key(year_month))).fetchone()
+    return from_cents(row[0]) if row else None
+
+
+def delete_budget(conn, category, year_month):
+    """Remove a limit; returns True if there was one"""
+    cursor = conn.execute("DELETE FROM budgets WHERE category = ? AND year_month = ?",
+                          (category, month_key(year_month)))
+    conn.commit()
+    return cursor.rowcount > 0
+
+
+def list_budgets(conn, year_month=None):
+    """Budgets (category, year_month, limit), newest month first"""
+    query = "SELECT category, year_month, limit_cents FROM budgets"
+    params = ()
+    if year_month is not None:
+        query += " WHERE year_month = ?"
+        params = (month_key(year_month),)
+    rows = conn.execute(query + " ORDER BY year_month DESC, category", params).fetchall()
+    budgets = pd.DataFrame([tuple(row) for row in rows], columns=['category', 'year_month', 'limit_cents'])
+    budgets['limit'] = budgets.pop('limit_cents') / 100
+    return budgets
+
+
+# -----------------------------
+# Budget vs actual
+# -----------------------------
+def budget_vs_actual(conn, year_month):
+    """Each budgeted category of a month with its spending so far.
+
+    Columns: category, limit, spent, remaining, used (fraction of the limit),
+    over (bool). Most used first.
+    """
+    rows = conn.execute('''
+        SELECT b.category, b.limit_cents, COALESCE(r.total_cents, 0) as spent_cents
+        FROM budgets b
+        LEFT JOIN transaction_rollup r
+          ON r.year_month = b.year_month AND r.category = b.category AND r.type = 'Expense'
+        WHERE b.year_month = ?
+    ''', (month_key(year_month),)).fetchall()
+    report = pd.DataFrame([tuple(row) for row in rows], columns=['category', 'limit_cents', 'spent_cents'])
+    limit_cents = report.pop('limit_cents')
+    spent_cents = report.pop('spent_cents')
+    report['limit'] = limit_cents / 100
+    report['spent'] = spent_cents / 100
+    report['remaining'] = (limit_cents - spent_cents) / 100
+    report['used'] = (spent_cents / limit_cents.where(limit_cents > 0)).fillna(0.0)
+    report['over'] = spent_cents > limit_cents
+    return report.sort_values('used', ascending=False, ignore_index=True)
+
+
+def check_overspend(conn, category, day, pending_cents=0):
+    """BudgetAlert if ``category`` is over its limit for the month of ``day``, else None.
+
+    O(1): one lookup in budgets and one in the rollup. ``pending_cents`` is
+    spending not committed yet (e.g. a row still in the write queue).
+    """
+    row = conn.execute('''
+        SELECT b.limit_cents, COALESCE(r.total_cents, 0) as spent_cents
+        FROM budgets b
+        LEFT JOIN transaction_rollup r
+          ON r.year_month = b.year_month AND r.category = b.category AND r.type = 'Expense'
+        WHERE b.category = ? AND b.year_month = ?
+    ''', (category, month_key(day))).fetchone()
+    if row is None:
+        return None
+    spent_cents = row[1] + pending_cents
+    if spent_cents <= row[0]:
+        return None
+    return BudgetAlert(category, month_key(day), from_cents(row[0]), from_cents(spent_cents))
+
+
+# -----------------------------
+# Roll forward
+# -----------------------------
+def roll_forward(conn, through=None):
+    """Give every month up to ``through`` (default: this month) the latest earlier limit.
+
+    For each category with a budget, every month after its first budgeted
+    month that has no limit of its own gets the most recent earlier one.
+    Existing limits are never changed. Returns the number of budgets created.
+    """
+    through = month_key(through or datetime.date.today())
+    # cursor.rowcount is -1 for a statement starting with WITH
+    changes_before = conn.total_changes
+    conn.execute('''
+        WITH RECURSIVE months(year_month) AS (
+            SELECT MIN(year_month) FROM budgets
+            UNION ALL
+            SELECT strftime('%Y-%m', year_month || '-01', '+1 month') FROM months WHERE year_month < ?
+        ),
+        carried AS (
+            SELECT c.category, m.year_month,
+                   (SELECT b.limit_cents FROM budgets b
+                    WHERE b.category = c.category AND b.year_month < m.year_month
+                    ORDER BY b.year_month DESC LIMIT 1) as limit_cents
+            FROM (SELECT DISTINCT category FROM budgets) c
+            CROSS JOIN months m
+        )
+        INSERT INTO budgets (category, year_month, limit_cents)
+        SELECT category, year_month, limit_cents FROM carried
+        WHERE limit_cents IS NOT NULL
+        ON CONFLICT (category, year_month) DO NOTHING
+    ''', (through,))
+    conn.commit()
+    return conn.total_changes - changes_before
@@ -0,0 +1,195 @@
+"""Running balance and cash flow over time, updated incrementally.
+
+The ledger is reduced to one row per day holding that day's income and
+expense cents (the "daily totals"). Every series is computed from those
+few thousand rows with vectorized numpy operations. The transactions
+themselves are not read again:
+  * net flow = income - expenses, and the running balance = cumsum(net);
+  * the weekly and monthly series first sum the days into their periods;
+  * the rolling average of the net flow over the last ``window`` periods
+    is a difference of two points of that same cumulative sum. Days
+    without transactions count as zero, so the balance carries over them.
+
+A CashflowTracker holds the daily totals of one database and the id of
+the last transaction they include. refresh() brings them up to date:
+  * ids only grow (AUTOINCREMENT), so the rows added since the last
+    refresh are those with ``id > last_id``. That is a primary-key range
+    read; its rows are aggregated by date and added to their days
+    (back-dated rows too). Adding today's transaction to a 10M-row
+    ledger reads one row;
+  * edits and deletes are counted by triggers in ``ledger_edits``
+    (migrations.py, version 10). If that count moved, or on the first
+    refresh, the daily totals are rebuilt with one GROUP BY date over
+    the covering (date, type, category, amount_cents) index.
+The edit count and the highest id are read before the rows. An edit or
+insert committed in between is then picked up by the next refresh, not lost.
+"""
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from money import MINOR_UNITS
+
+
+# frequency: (label, default rolling window in periods, period unit)
+FREQUENCIES = {
+    "D": ("Daily", 30, "days"),
+    "W": ("Weekly", 4, "weeks"),
+    "M": ("Monthly", 3, "months"),
+}
+
+SERIES_COLUMNS = ['period', 'income', 'expenses', 'net', 'balance', 'net_avg']
+DAILY_COLUMNS = ['income_cents', 'expense_cents']
+
+DAILY_TOTALS = '''
+    SELECT date,
+           SUM(CASE WHEN type = 'Income' THEN amount_cents ELSE 0 END) as income_cents,
+           SUM(CASE WHEN type = 'Expense' THEN amount_cents ELSE 0 END) as expense_cents
+    FROM {source}
+    WHERE {id_range}
+    GROUP BY date
+'''
+# New rows: a rowid range. NOT INDEXED keeps it one: with ANALYZE statistics
+# SQLite would rather skip-scan the (date, id) index to avoid sorting for the
+# GROUP BY, which costs ~12 ms on 1M rows even for a single new row.
+# Everything: the unary + keeps SQLite off the rowid range, so it scans the
+# covering date index in date order instead (no table reads, no sort; ~2.5x faster)
+NEW_ROWS = DAILY_TOTALS.format(source="transactions NOT INDEXED", id_range="id > ? AND id <= ?")
+ALL_ROWS = DAILY_TOTALS.format(source="transactions", id_range="+id > ? AND +id <= ?")
+
+
+def _empty_daily():
+    return pd.DataFrame({column: pd.Series(dtype='int64') for column in DAILY_COLUMNS},
+                        index=pd.DatetimeIndex([], name='date'))
+
+
+def read_daily_totals(conn, after_id=0, through_id=None):
+    """Income and expense cents per day of the transactions with after_id < id <= through_id"""
+    if through_id is None:
+        through_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM transactions").fetchone()[0]
+    rows = conn.execute(ALL_ROWS if after_id == 0 else NEW_ROWS, (after_id, through_id)).fetchall()
+    if not rows:
+        return _empty_daily()
+    daily = pd.DataFrame([tuple(row) for row in rows], columns=['date'] + DAILY_COLUMNS)
+    daily['date'] = pd.to_datetime(daily['date'])
+    return daily.set_index('date').astype('int64').sort_index()
+
+
+class CashflowTracker:
+    """Daily totals of one database, kept current by refresh()"""
+
+    def __init__(self):
+        self.daily = _empty_daily()
+        self.last_id = 0
+        self.edits = None
+        self.full_refreshes = 0
+        self.incremental_refreshes = 0
+        self.last_refresh_ms = None
+        self.last_refresh_days = 0
+        self._lock = threading.Lock()
+
+    def refresh(self, conn):
+        """Bring the daily totals up to date; returns "full", "incremental" or "unchanged" """
+        with self._lock:
+            started = time.perf_counter()
+            # Read the edit count and the highest id before the rows
+            # (see the module docstring)
+            edits = conn.execute("SELECT edits FROM ledger_edits WHERE id = 1").fetchone()[0]
+            through_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM transactions").fetchone()[0]
+            if edits != self.edits or through_id < self.last_id:
+                self.daily = read_daily_totals(conn, 0, through_id)
+                self.full_refreshes += 1
+                self.last_refresh_days = len(self.daily)
+                kind = "full"
+            elif through_id > self.last_id:
+                added = read_daily_totals(conn, self.last_id, through_id)
+                self.daily = self.daily.add(added, fill_value=0).astype('int64')
+                self.incremental_refreshes += 1
+                self.last_refresh_days = len(added)
+                kind = "incremental"
+            else:
+                return "unchanged"
+            self.edits, self.last_id = edits, through_id
+            self.last_refresh_ms = (time.perf_counter() - started) * 1000
+            return kind
+
+    def series(self, freq="D", window=None, start=None, end=None):
+        """Cash-flow series from the current daily totals (see cashflow_series)"""
+        return cashflow_series(self.daily, freq, window, start, end)
+
+    def stats(self):
+        return {"days": len(self.daily), "last_id": self.last_id, "full": self.full_refreshes,
+                "incremental": self.incremental_refreshes, "last_refresh_ms": self.last_refresh_ms,
+                "last_refresh_days": self.last_refresh_days}
+
+
+# -----------------------------
+# Daily totals -> series
+# -----------------------------
+def _rolling_mean(cumulative, window):
+    """Mean of the last ``window`` values at each point (fewer at the start), from their cumulative sum"""
+    sums = cumulative.astype('float64')
+    sums[window:] -= cumulative[:-window]
+    return sums / np.minimum(np.arange(1, len(sums) + 1), window)
+
+
+def cashflow_series(daily, freq="D", window=None, start=None, end=None):
+    """Income, expenses, net flow, running balance and rolling average net per period.
+
+    ``freq`` is "D", "W" or "M"; ``window`` the number of periods averaged
+    (default: 30 days, 4 weeks, 3 months). Periods run from the first day
+    with a transaction to the last, without gaps. ``start`` / ``end`` only
+    trim the result: the balance still includes everything before
+    ``start``. Columns: SERIES_COLUMNS, amounts in major units, ``period``
+    is the first day of each period.
+    """
+    if freq not in FREQUENCIES:
+        raise ValueError(f"freq must be one of {', '.join(FREQUENCIES)}, got {freq!r}")
+    window = window or FREQUENCIES[freq][1]
+    if daily.empty:
+        return pd.DataFrame(columns=SERIES_COLUMNS)
+
+    if freq == "D":
+        totals = daily.reindex(pd.date_range(daily.index[0], daily.index[-1], freq="D"), fill_value=0)
+        periods = totals.index
+    else:
+        totals = daily.groupby(daily.index.to_period(freq)).sum()
+        totals = totals.reindex(pd.period_range(totals.index[0], totals.index[-1], freq=freq), fill_value=0)
+        periods = totals.index.start_time
+
+    income = totals['income_cents'].to_numpy()
+    expenses = totals['expense_cents'].to_numpy()
+    net = income - expenses
+    balance = np.cumsum(net)
+    series = pd.DataFrame({
+        'period': periods.date,
+        'income': income / MINOR_UNITS,
+        'expenses': expenses / MINOR_UNITS,
+        'net': net / MINOR_UNITS,
+        'balance': balance / MINOR_UNITS,
+        'net_avg': _rolling_mean(balance, window) / MINOR_UNITS,
+    })
+
+    if start is not None or end is not None:
+        first = pd.Timestamp(start).to_period(freq).start_time if start is not None else periods[0]
+        last = pd.Timestamp(end) if end is not None else periods[-1]
+        series = series[(periods >= first) & (periods <= last)].reset_index(drop=True)
+    return series
+
+
+# -----------------------------
+# One tracker per database
+# -----------------------------
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+
+def get_tracker(db_file):
+    """The shared CashflowTracker of a database file"""
+    with _trackers_lock:
+        tracker = _trackers.get(db_file)
+        if tracker is None:
+            tracker = _trackers[db_file] = CashflowTracker()
+        return tracker
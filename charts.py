@@ -0,0 +1,244 @@
+"""Chart rendering shared by the Streamlit front-ends.
+
+Charts are drawn with matplotlib's object API (``Figure``), not pyplot.
+pyplot keeps every figure in a global registry until ``plt.close()``, so a
+figure built on each rerun was never freed. A ``Figure`` is freed as soon
+as it goes out of scope. Each chart is saved to PNG bytes, and the bytes
+are cached by the aggregate values that produced them. An unchanged chart
+is drawn once per process, not once per rerun.
+
+Set ``CHART_BACKEND=native`` to skip matplotlib entirely: the apps then
+send only the aggregated rows to the browser and let Vega-Lite draw them
+(see ``*_chart_data`` and ``category_donut_spec`` below).
+"""
+import io
+import os
+
+import pandas as pd
+
+from query_cache import QueryCache
+
+
+CHART_BACKEND = os.environ.get("CHART_BACKEND", "matplotlib").lower()
+
+CUSTOM_COLORS = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEAA7',
+                 '#DDA0DD', '#98D8C8', '#F7DC6F', '#BB8FCE', '#85C1E9']
+EXPENSE_COLOR = '#FF6B6B'
+INCOME_COLOR = '#51CF66'
+
+# Value labels above this many months turn into unreadable clutter (and one
+# annotate() call per point is the slowest part of the trend chart)
+MAX_ANNOTATED_MONTHS = 24
+
+_png_cache = QueryCache(maxsize=32)
+
+
+def use_native_charts():
+    """True when charts should be drawn by the browser instead of matplotlib"""
+    return CHART_BACKEND == "native"
+
+
+def chart_cache_stats():
+    return _png_cache.stats()
+
+
+def _figure_to_png(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=100)
+    return buffer.getvalue()
+
+
+# -----------------------------
+# Aggregates -> chart data
+# -----------------------------
+def category_chart_data(category_summary, trans_type='Expense'):
+    """Expense totals per category (category, total_amount), largest first"""
+    if category_summary.empty:
+        return category_summary[['category', 'total_amount']]
+    data = category_summary[category_summary['type'] == trans_type]
+    return (data.groupby('category', as_index=False)['total_amount'].sum()
+            .sort_values('total_amount', ascending=False, ignore_index=True))
+
+
+def monthly_chart_data(monthly_summary):
+    """Month x type table of totals (index: month ascending, columns: Expense/Income)"""
+    if monthly_summary.empty:
+        return pd.DataFrame()
+    return (monthly_summary.pivot_table(index='month', columns='type', values='total_amount',
+                                        aggfunc='sum', fill_value=0)
+            .sort_index())
+
+
+def monthly_chart_colors(monthly_data):
+    """Line colors matching the columns of monthly_chart_data()"""
+    return [INCOME_COLOR if col == 'Income' else EXPENSE_COLOR for col in monthly_data.columns]
+
+
+def balance_chart_data(cashflow_series):
+    """Running balance and rolling average net flow per period (index: period ascending)"""
+    if cashflow_series.empty:
+        return pd.DataFrame()
+    return (cashflow_series.set_index('period')[['balance', 'net_avg']]
+            .rename(columns={'balance': 'Balance', 'net_avg': 'Net (rolling avg)'}))
+
+
+# -----------------------------
+# matplotlib renderers (PNG bytes, cached by input values)
+# -----------------------------
+def category_pie_png(category_data, title='Expenses by Category', currency='Ksh.'):
+    """Donut chart of totals per category as PNG bytes, or None when there is nothing to draw"""
+    if category_data.empty:
+        return None
+    # Session-state frames can hold amounts as object dtype
+    category_data = category_data.assign(total_amount=category_data['total_amount'].astype(float))
+    if category_data['total_amount'].sum() == 0:
+        return None
+
+    key = ('pie', title, currency,
+           tuple(category_data['category']), tuple(category_data['total_amount'].round(2)))
+    return _png_cache.get_or_compute(key, lambda: _draw_category_pie(category_data, title, currency))
+
+
+def _draw_category_pie(category_data, title, currency):
+    from matplotlib.figure import Figure
+    from matplotlib.patches import Circle
+
+    total = category_data['total_amount'].sum()
+    fig = Figure(figsize=(8, 6))
+    ax = fig.subplots()
+
+    # Colors repeat instead of silently dropping categories past the tenth
+    colors = [CUSTOM_COLORS[i % len(CUSTOM_COLORS)] for i in range(len(category_data))]
+
+    wedges, texts, autotexts = ax.pie(
+        category_data['total_amount'],
+        labels=category_data['category'],
+        autopct=lambda p: f'{p:.1f}%\n({currency} {(p / 100) * total:.0f})',
+        startangle=90,
+        colors=colors,
+        pctdistance=0.85
+    )
+
+    # Draw a circle in the center to make it a donut chart
+    ax.add_artist(Circle((0, 0), 0.70, fc='white'))
+
+    for autotext in autotexts:
+        autotext.set_color('black')
+        autotext.set_fontweight('bold')
+        autotext.set_fontsize(9)
+
+    ax.set_title(title, fontweight='bold', pad=20)
+    return _figure_to_png(fig)
+
+
+def monthly_trend_png(monthly_data, currency='Ksh'):
+    """Line chart of monthly income vs expenses as PNG bytes, or None when there is nothing to draw"""
+    if monthly_data.empty:
+        return None
+    monthly_data = monthly_data.astype(float)
+
+    key = ('trend', currency, tuple(monthly_data.index),
+           tuple(tuple(monthly_data[col].round(2)) for col in monthly_data.columns),
+           tuple(monthly_data.columns))
+    return _png_cache.get_or_compute(key, lambda: _draw_monthly_trend(monthly_data, currency))
+
+
+def _draw_monthly_trend(monthly_data, currency):
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    months = list(monthly_data.index)
+    positions = range(len(months))
+
+    styles = {
+        'Expense': dict(marker='o', label='Expenses', color=EXPENSE_COLOR, offset=10),
+        'Income': dict(marker='s', label='Income', color=INCOME_COLOR, offset=-15),
+    }
+    for col, style in styles.items():
+        if col not in monthly_data.columns or monthly_data[col].sum() <= 0:
+            continue
+        values = monthly_data[col].to_numpy()
+        ax.plot(positions, values, marker=style['marker'], label=style['label'],
+                color=style['color'], linewidth=2, markersize=8)
+
+        if len(months) <= MAX_ANNOTATED_MONTHS:
+            # Add value labels on points
+            for i, value in enumerate(values):
+                if value > 0:
+                    ax.annotate(f'{currency}{value:,.0f}',
+                                xy=(i, value),
+                                xytext=(0, style['offset']),
+                                textcoords="offset points",
+                                ha='center',
+                                fontsize=8,
+                                color=style['color'],
+                                fontweight='bold')
+
+    ax.set_xticks(list(positions))
+    ax.set_xticklabels(months)
+    ax.set_title('Monthly Income vs Expenses', fontweight='bold')
+    ax.set_xlabel('Month')
+    ax.set_ylabel(f'Amount ({currency})')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    ax.tick_params(axis='x', rotation=45)
+    fig.tight_layout()
+    return _figure_to_png(fig)
+
+
+def balance_png(balance_data, title='Balance Over Time', currency='Ksh'):
+    """Running balance line with the rolling average net flow as PNG bytes, or None when there is nothing to draw"""
+    if balance_data.empty:
+        return None
+    balance_data = balance_data.astype(float)
+
+    key = ('balance', title, currency, tuple(balance_data.index),
+           tuple(tuple(balance_data[col].round(2)) for col in balance_data.columns))
+    return _png_cache.get_or_compute(key, lambda: _draw_balance(balance_data, title, currency))
+
+
+def _draw_balance(balance_data, title, currency):
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(12, 5))
+    ax = fig.subplots()
+    periods = pd.to_datetime(pd.Series(balance_data.index)).to_numpy()
+    balance = balance_data['Balance'].to_numpy()
+
+    ax.plot(periods, balance, color='#45B7D1', linewidth=2, label='Balance')
+    ax.fill_between(periods, balance, 0, where=balance >= 0, color=INCOME_COLOR, alpha=0.15, interpolate=True)
+    ax.fill_between(periods, balance, 0, where=balance < 0, color=EXPENSE_COLOR, alpha=0.15, interpolate=True)
+    ax.set_ylabel(f'Balance ({currency})')
+
+    # The net flow is a different scale from the cumulative balance
+    net_ax = ax.twinx()
+    net_ax.plot(periods, balance_data['Net (rolling avg)'].to_numpy(), color='#BB8FCE', linewidth=1.2,
+                linestyle='--', label='Net flow (rolling avg)')
+    net_ax.axhline(0, color='#BB8FCE', linewidth=0.6, alpha=0.5)
+    net_ax.set_ylabel(f'Net flow ({currency})')
+
+    lines = ax.get_legend_handles_labels()
+    net_lines = net_ax.get_legend_handles_labels()
+    ax.legend(lines[0] + net_lines[0], lines[1] + net_lines[1], loc='upper left')
+    ax.set_title(title, fontweight='bold')
+    ax.grid(True, alpha=0.3)
+    fig.autofmt_xdate()
+    fig.tight_layout()
+    return _figure_to_png(fig)
+
+
+# -----------------------------
+# Native (Vega-Lite) backend
+# -----------------------------
+def category_donut_spec(title='Expenses by Category'):
+    """Vega-Lite spec for the category donut; pair with category_chart_data()"""
+    return {
+        "title": title,
+        "mark": {"type": "arc", "innerRadius": 70, "tooltip": True},
+        "encoding": {
+            "theta": {"field": "total_amount", "type": "quantitative"},
+            "color": {"field": "category", "type": "nominal",
+                      "scale": {"range": CUSTOM_COLORS}},
+        },
+    }
@@ -0,0 +1,271 @@
+"""Compact columnar in-memory ledger backed by typed NumPy arrays.
+
+A list of dicts, or an object-dtype DataFrame, stores each transaction as
+several Python objects (a dict, a date, a float and three strings), which
+adds up to hundreds of bytes per row. ColumnarLedger stores one row as:
+
+    id           int64   8 bytes
+    day          int32   4 bytes   days since 1970-01-01
+    amount       int64   8 bytes   minor units (cents)
+    category     int16   2 bytes   code into ``categories``
+    type         int8    1 byte    code into ``types``
+    description  int32   4 bytes   code into ``descriptions`` (repeated text is stored once)
+
+Arrays grow by doubling, so appends are amortized O(1). Filters, sums and
+group-bys run as whole-array NumPy operations. Sums stay in int64, so they
+are exact. ``columns()`` and ``to_pandas()`` return views of the live
+arrays and do not copy them.
+"""
+import datetime
+
+import numpy as np
+
+from money import MINOR_UNITS, to_cents, to_cents_array
+
+
+EPOCH = datetime.date(1970, 1, 1)
+EPOCH_ORDINAL = EPOCH.toordinal()
+
+_COLUMNS = {
+    "id": np.int64,
+    "day": np.int32,
+    "amount": np.int64,
+    "category": np.int16,
+    "type": np.int8,
+    "description": np.int32,
+}
+
+
+def to_day(value):
+    """date / datetime / 'YYYY-MM-DD' -> days since 1970-01-01"""
+    if isinstance(value, str):
+        value = datetime.date.fromisoformat(value[:10])
+    elif isinstance(value, datetime.datetime):
+        value = value.date()
+    return value.toordinal() - EPOCH_ORDINAL
+
+
+def from_day(day):
+    return datetime.date.fromordinal(int(day) + EPOCH_ORDINAL)
+
+
+class Dictionary:
+    """String <-> small integer code mapping for dictionary-encoded columns"""
+
+    def __init__(self, values=()):
+        self.values = []
+        self.codes = {}
+        for value in values:
+            self.encode(value)
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def encode_many(self, values, dtype):
+        return np.fromiter((self.encode(v) for v in values), dtype=dtype)
+
+    def lookup(self, value):
+        """Code of an existing value, or -1"""
+        return self.codes.get(value, -1)
+
+    def __len__(self):
+        return len(self.values)
+
+
+class ColumnarLedger:
+    """Append-friendly columnar store of transactions"""
+
+    def __init__(self, capacity=1024):
+        self._capacity = max(int(capacity), 16)
+        self._size = 0
+        self._next_id = 1
+        self._data = {name: np.zeros(self._capacity, dtype=dtype) for name, dtype in _COLUMNS.items()}
+        self.categories = Dictionary()
+        self.types = Dictionary(["Expense", "Income"])
+        self.descriptions = Dictionary()
+
+    # -----------------------------
+    # Building
+    # -----------------------------
+    def __len__(self):
+        return self._size
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        if needed <= self._capacity:
+            return
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        for name, array in self._data.items():
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:self._size] = array[:self._size]
+            self._data[name] = grown
+        self._capacity = capacity
+
+    def append(self, date, category, description, amount, trans_type):
+        """Add one transaction; returns its id"""
+        self._reserve(1)
+        i = self._size
+        row_id = self._next_id
+        self._data["id"][i] = row_id
+        self._data["day"][i] = to_day(date)
+        self._data["amount"][i] = to_cents(amount)
+        self._data["category"][i] = self.categories.encode(category)
+        self._data["type"][i] = self.types.encode(trans_type)
+        self._data["description"][i] = self.descriptions.encode(description)
+        self._size += 1
+        self._next_id += 1
+        return row_id
+
+    def extend(self, dates, categories, descriptions, amounts, types):
+        """Add many transactions at once (sequences of equal length); returns their ids"""
+        count = len(amounts)
+        self._reserve(count)
+        start, end = self._size, self._size + count
+        ids = np.arange(self._next_id, self._next_id + count, dtype=np.int64)
+
+        self._data["id"][start:end] = ids
+        self._data["day"][start:end] = np.fromiter((to_day(d) for d in dates), dtype=np.int32, count=count)
+        self._data["amount"][start:end] = to_cents_array(amounts)
+        self._data["category"][start:end] = self.categories.encode_many(categories, np.int16)
+        self._data["type"][start:end] = self.types.encode_many(types, np.int8)
+        self._data["description"][start:end] = self.descriptions.encode_many(descriptions, np.int32)
+        self._size = end
+        self._next_id += count
+        return ids
+
+    @classmethod
+    def from_records(cls, records):
+        """Build from dicts with date/category/description/amount/type keys"""
+        records = list(records)
+        ledger = cls(capacity=len(records))
+        if records:
+            ledger.extend([r["date"] for r in records], [r["category"] for r in records],
+                          [r.get("description", "") for r in records], [r["amount"] for r in records],
+                          [r.get("type", "Expense") for r in records])
+        return ledger
+
+    def delete(self, ids):
+        """Remove every row whose id is in ``ids`` in one pass; returns the number removed"""
+        keep = ~np.isin(self._data["id"][:self._size], np.asarray(list(ids), dtype=np.int64))
+        kept = int(keep.sum())
+        removed = self._size - kept
+        if removed:
+            for name, array in self._data.items():
+                array[:kept] = array[:self._size][keep]
+            self._size = kept
+        return removed
+
+    def clear(self):
+        self._size = 0
+
+    # -----------------------------
+    # Zero-copy access
+    # -----------------------------
+    def column(self, name):
+        """View of one column (no copy; do not keep it across appends)"""
+        return self._data[name][:self._size]
+
+    def columns(self):
+        return {name: self.column(name) for name in _COLUMNS}
+
+    @property
+    def nbytes(self):
+        """Bytes used by the live part of the typed columns"""
+        return sum(self.column(name).nbytes for name in _COLUMNS)
+
+    # -----------------------------
+    # Vectorized queries
+    # -----------------------------
+    def mask(self, start=None, end=None, trans_type=None, categories=None):
+        """Boolean row mask for a date range (inclusive), type and set of categories"""
+        mask = np.ones(self._size, dtype=bool)
+        if start is not None:
+            mask &= self.column("day") >= to_day(start)
+        if end is not None:
+            mask &= self.column("day") <= to_day(end)
+        if trans_type is not None:
+            mask &= self.column("type") == self.types.lookup(trans_type)
+        if categories is not None:
+            codes = [self.categories.lookup(c) for c in categories]
+            mask &= np.isin(self.column("category"), codes)
+        return mask
+
+    def total_minor(self, mask=None):
+        """Exact sum of amounts (minor units)"""
+        amounts = self.column("amount")
+        return int(amounts[mask].sum() if mask is not None else amounts.sum())
+
+    def total(self, mask=None):
+        return self.total_minor(mask) / MINOR_UNITS
+
+    def _group_sum(self, codes, groups, mask):
+        amounts = self.column("amount")
+        if mask is not None:
+            codes, amounts = codes[mask], amounts[mask]
+        totals = np.zeros(groups, dtype=np.int64)
+        counts = np.bincount(codes, minlength=groups) if len(codes) else np.zeros(groups, dtype=np.int64)
+        np.add.at(totals, codes, amounts)  # int64 accumulation: exact
+        return totals, counts
+
+    def totals_by_category(self, mask=None):
+        """{category: total} for categories with at least one row"""
+        codes = self.column("category").astype(np.intp)
+        totals, counts = self._group_sum(codes, len(self.categories), mask)
+        return {self.categories.values[i]: totals[i] / MINOR_UNITS for i in np.flatnonzero(counts)}
+
+    def month_codes(self):
+        """Months since 1970-01 for every row"""
+        return self.column("day").astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+    def totals_by_month(self, mask=None):
+        """{'YYYY-MM': total} sorted by month"""
+        months = self.month_codes()
+        if not len(months):
+            return {}
+        unique, inverse = np.unique(months, return_inverse=True)
+        totals, counts = self._group_sum(inverse, len(unique), mask)
+        labels = unique.astype("datetime64[M]").astype(str)
+        return {labels[i]: totals[i] / MINOR_UNITS for i in np.flatnonzero(counts)}
+
+    # -----------------------------
+    # Conversion
+    # -----------------------------
+    def to_pandas(self):
+        """DataFrame over the ledger's arrays.
+
+        id, day and amount_minor share memory with the ledger; the text
+        columns are categoricals built on the existing codes. ``date`` is
+        derived from ``day`` (datetime64 needs a wider type, so it is a copy).
+        """
+        import pandas as pd
+
+        data = self.columns()
+        return pd.DataFrame({
+            "id": data["id"],
+            "day": data["day"],
+            "date": data["day"].astype("datetime64[D]").astype("datetime64[s]"),
+            "amount_minor": data["amount"],
+            "category": pd.Categorical.from_codes(data["category"], self.categories.values),
+            "type": pd.Categorical.from_codes(data["type"], self.types.values),
+            "description": pd.Categorical.from_codes(data["description"], self.descriptions.values),
+        }, copy=False)
+
+    def to_records(self, mask=None):
+        """Rows as dicts with Python values (for display and JSON)"""
+        data = self.columns()
+        index = np.flatnonzero(mask) if mask is not None else range(self._size)
+        return [{
+            "id": int(data["id"][i]),
+            "date": from_day(data["day"][i]),
+            "category": self.categories.values[data["category"][i]],
+            "description": self.descriptions.values[data["description"][i]],
+            "amount": data["amount"][i] / MINOR_UNITS,
+            "type": self.types.values[data["type"][i]],
+        } for i in index]
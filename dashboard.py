@@ -0,0 +1,88 @@
+"""Dashboard snapshot: every aggregate the main page needs, from one query.
+
+Rendering the dashboard used to run get_summary (two queries),
+get_category_summary, get_monthly_summary and get_all_transactions (twice).
+Each of those is a pass over the transactions table. Here the
+(month, category, type) rollup table is read once. It has at most
+months x categories x 2 rows, and every widget aggregate is derived from it
+in memory. Totals are summed as int64 cents and converted to amounts once,
+at the end.
+
+With a TransactionFilter the same groups are read only for the filtered
+range (see filters.aggregate_source).
+"""
+from dataclasses import dataclass
+
+import pandas as pd
+
+from filters import aggregate_source
+from money import MINOR_UNITS, from_cents
+
+
+SNAPSHOT_QUERY = '''
+    SELECT
+        year_month as month,
+        category,
+        type,
+        total_cents,
+        transaction_count
+    FROM {source}
+'''
+
+GROUP_COLUMNS = ['month', 'category', 'type', 'total_cents', 'transaction_count']
+
+
+@dataclass
+class DashboardSnapshot:
+    """Aggregates for one dashboard render"""
+    total_income: float
+    total_expenses: float
+    balance: float
+    transaction_count: int
+    category_summary: pd.DataFrame  # category, type, total_amount, transaction_count
+    monthly_summary: pd.DataFrame   # month, type, total_amount, transaction_count
+
+    @property
+    def empty(self):
+        return self.transaction_count == 0
+
+
+def _in_amounts(summary):
+    """Replace the exact total_cents column with a total_amount column in major units"""
+    total_amount = summary.pop('total_cents') / MINOR_UNITS
+    summary.insert(len(summary.columns) - 1, 'total_amount', total_amount)
+    return summary
+
+
+def build_snapshot(groups):
+    """Derive every dashboard aggregate from the (month, category, type) groups"""
+    groups = groups.astype({'total_cents': 'int64', 'transaction_count': 'int64'})
+    totals = groups.groupby('type')['total_cents'].sum()
+    income_cents = int(totals.get('Income', 0))
+    expense_cents = int(totals.get('Expense', 0))
+
+    category_summary = _in_amounts(
+        groups.groupby(['category', 'type'], as_index=False)[['total_cents', 'transaction_count']].sum()
+        .sort_values(['type', 'total_cents'], ascending=[True, False], ignore_index=True)
+    )
+    monthly_summary = _in_amounts(
+        groups.groupby(['month', 'type'], as_index=False)[['total_cents', 'transaction_count']].sum()
+        .sort_values('month', ascending=False, ignore_index=True)
+    )
+
+    return DashboardSnapshot(
+        total_income=from_cents(income_cents),
+        total_expenses=from_cents(expense_cents),
+        balance=from_cents(income_cents - expense_cents),
+        transaction_count=int(groups['transaction_count'].sum()),
+        category_summary=category_summary,
+        monthly_summary=monthly_summary,
+    )
+
+
+def load_dashboard_snapshot(conn, transaction_filter=None):
+    """Read the (filtered) rollup groups once and build the snapshot from them"""
+    source, params = aggregate_source(transaction_filter)
+    rows = conn.execute(SNAPSHOT_QUERY.format(source=source), params).fetchall()
+    groups = pd.DataFrame([tuple(row) for row in rows], columns=GROUP_COLUMNS)
+    return build_snapshot(groups)
@@ -0,0 +1,184 @@
+import sqlite3
+import datetime
+import threading
+from contextlib import contextmanager
+
+
+# --- FIX: Register adapters and converters for date & datetime ---
+
+# Convert Python date → SQLite text
+sqlite3.register_adapter(datetime.date, lambda d: d.isoformat())
+sqlite3.register_adapter(datetime.datetime, lambda dt: dt.isoformat(" "))
+
+# Convert SQLite text → Python date/datetime
+sqlite3.register_converter("DATE", lambda s: datetime.date.fromisoformat(s.decode()))
+sqlite3.register_converter("TIMESTAMP", lambda s: datetime.datetime.fromisoformat(s.decode()))
+
+
+# Pragmas applied once to every new connection.
+# WAL lets readers keep going while another session writes, and
+# synchronous=NORMAL is the recommended (still crash-safe) setting for WAL.
+CONNECTION_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "foreign_keys": "ON",
+    "temp_store": "MEMORY",
+    "cache_size": -16000,      # ~16 MB page cache per connection
+    "mmap_size": 134217728,    # 128 MB memory-mapped I/O
+    "busy_timeout": 5000,      # wait up to 5s for a writer instead of failing
+}
+
+
+class ConnectionPool:
+    """Keeps SQLite connections open and hands them out one caller at a time.
+
+    Streamlit runs every session (and often every rerun) on its own thread, so
+    a connection is checked out for the duration of a ``with`` block and put
+    back on the idle list afterwards instead of being closed. Connections are
+    created with ``check_same_thread=False`` so an idle one can be reused by
+    whichever thread asks next; a connection is never used by two threads at
+    the same time.
+    """
+
+    def __init__(self, db_file, max_idle=8, pragmas=None, trace=None):
+        self.db_file = db_file
+        self.max_idle = max_idle
+        self.pragmas = dict(CONNECTION_PRAGMAS if pragmas is None else pragmas)
+        self.trace = trace
+        self._idle = []
+        self._lock = threading.Lock()
+        self._stats = {
+            "created": 0,
+            "reused": 0,
+            "closed": 0,
+            "checked_out": 0,
+            "peak_checked_out": 0,
+        }
+
+    def _connect(self):
+        """Open a new connection with the tuned pragmas applied"""
+        conn = sqlite3.connect(self.db_file,
+                               detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+                               check_same_thread=False
+                               )
+        conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        if self.trace is not None:
+            # Called with the text of every statement run (e.g. perf.trace_statement)
+            conn.set_trace_callback(self.trace)
+        return conn
+
+    def acquire(self):
+        """Take an idle connection, or open a new one if none is free"""
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+            if conn is not None:
+                self._stats["reused"] += 1
+            else:
+                self._stats["created"] += 1
+            self._stats["checked_out"] += 1
+            self._stats["peak_checked_out"] = max(self._stats["peak_checked_out"],
+                                                  self._stats["checked_out"])
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._lock:
+                    self._stats["created"] -= 1
+                    self._stats["checked_out"] -= 1
+                raise
+        return conn
+
+    def release(self, conn):
+        """Return a connection to the idle list (or close it if the list is full)"""
+        # Never hand out a connection with a half-finished transaction
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            self._stats["checked_out"] -= 1
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+            self._stats["closed"] += 1
+        conn.close()
+
+    def discard(self, conn):
+        """Close a connection that should not go back into the pool"""
+        with self._lock:
+            self._stats["checked_out"] -= 1
+            self._stats["closed"] += 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks a connection out of the pool"""
+        conn = self.acquire()
+        try:
+            yield conn
+        except (sqlite3.IntegrityError, sqlite3.OperationalError):
+            # The statement failed (a constraint, "database is locked"), not
+            # the connection: keep it, unless even the rollback fails
+            try:
+                self.release(conn)
+            except sqlite3.Error:
+                self.discard(conn)
+            raise
+        except sqlite3.DatabaseError:
+            # The connection may be in a bad state (e.g. corrupted file, closed db)
+            self.discard(conn)
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def close_all(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._stats["closed"] += len(idle)
+        for conn in idle:
+            conn.close()
+
+    def stats(self):
+        """Return a snapshot of the pool counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["idle"] = len(self._idle)
+        stats["db_file"] = self.db_file
+        stats["max_idle"] = self.max_idle
+        return stats
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_file, **kwargs):
+    """Return the shared pool for a database file, creating it on first use"""
+    with _pools_lock:
+        pool = _pools.get(db_file)
+        if pool is None:
+            pool = ConnectionPool(db_file, **kwargs)
+            _pools[db_file] = pool
+        return pool
+
+
+def pool_stats():
+    """Return the stats of every pool opened in this process"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.stats() for pool in pools]
+
+
+def close_all_pools():
+    """Close all idle connections of every pool (e.g. before deleting a db file)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_all()
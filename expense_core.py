@@ -0,0 +1,554 @@
+"""Data access for the SQLite expense tracker, importable without Streamlit.
+
+Every read and write E_APP1.py performs lives here: E_APP1 is the
+Streamlit page on top, and api_server.py serves the same functions over
+HTTP. Conventions:
+  * connections come from the shared pool of DB_FILE (db_pool.py);
+  * reads are ``@cached`` on their arguments and the data version
+    (query_cache.py), and every write calls bump_data_version();
+  * functions are ``@perf.timed``, so they show as spans in the page's
+    Performance panel (and cost nothing outside a Streamlit rerun);
+  * ``session`` identifies a writer to the write queue (a browser session,
+    an API client) for read-your-writes; None is fine for single writers.
+
+DB_FILE defaults to expenses.db, or $EXPENSES_DB; set_database() points
+the module at another file.
+"""
+import datetime
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+from db_pool import get_pool
+from money import from_cents, to_cents
+from migrations import run_migrations
+import budgets
+from dashboard import load_dashboard_snapshot
+from filters import aggregate_source, filter_conditions, where_clause
+from rollup import check_rollup, rebuild_rollup
+from query_cache import cached, bump_data_version, data_version
+import cashflow
+import charts
+import perf
+import write_queue
+from history import DEFAULT_PAGE_SIZE, get_transactions_page
+from search import search_transactions
+
+
+# Database configuration
+DB_FILE = os.environ.get("EXPENSES_DB", "expenses.db")
+
+# sync (default) / group / async -- see write_queue.py
+WRITE_DURABILITY = write_queue.durability_from_env()
+
+INSERT_TRANSACTION_SQL = '''
+    INSERT INTO transactions (date, category, description, amount_cents, type)
+    VALUES (?, ?, ?, ?, ?)
+'''
+# Summary statements; {source} is the rollup table or the filtered
+# transactions (filters.aggregate_source)
+SUMMARY_SQL = "SELECT COALESCE(SUM(total_cents), 0) as total FROM {source} WHERE type = ?"
+CATEGORY_SUMMARY_SQL = '''
+    SELECT
+        category,
+        type,
+        SUM(total_cents) / 100.0 as total_amount,
+        SUM(transaction_count) as transaction_count
+    FROM {source}
+    GROUP BY category, type
+    ORDER BY type, SUM(total_cents) DESC
+'''
+MONTHLY_SUMMARY_SQL = '''
+    SELECT
+        year_month as month,
+        type,
+        SUM(total_cents) / 100.0 as total_amount,
+        SUM(transaction_count) as transaction_count
+    FROM {source}
+    GROUP BY year_month, type
+    ORDER BY month DESC
+'''
+INITIAL_CATEGORIES = {
+    "Expense": ["Food & Dining", "Transportation", "Entertainment", "Shopping",
+                "Bills & Utilities", "Healthcare", "Education", "Other"],
+    "Income": ["Salary", "Freelance", "Investment", "Gift", "Other"]
+}
+
+
+def set_database(db_file):
+    """Use another database file from now on (e.g. the API server's --db)"""
+    global DB_FILE, _seen_files
+    DB_FILE = db_file
+    _seen_files = None
+    bump_data_version()
+
+
+def get_app_pool():
+    """The app's connection pool (every statement is counted by perf.py)"""
+    return get_pool(DB_FILE, trace=perf.trace_statement)
+
+
+@contextmanager
+def get_db_connection():
+    """Context manager for database connections (pooled, kept open between reruns)"""
+    with get_app_pool().connection() as conn:
+        yield conn
+
+
+@perf.timed
+def init_database():
+    """Initialize the database: apply pending schema migrations and seed defaults"""
+    with get_db_connection() as conn:
+        changes_before = conn.total_changes
+        applied = run_migrations(conn)
+        cursor = conn.cursor()
+
+        # Insert default categories if not exists
+        for trans_type, categories in INITIAL_CATEGORIES.items():
+            for category in categories:
+                cursor.execute('''
+                    INSERT OR IGNORE INTO categories (name, type) 
+                    VALUES (?, ?)
+                ''', (category, trans_type))
+
+        # Set default currency
+        cursor.execute('''
+            INSERT OR IGNORE INTO settings (key, value) 
+            VALUES ('currency', 'KSH')
+        ''')
+
+        if applied or conn.total_changes != changes_before:
+            conn.commit()
+            bump_data_version()
+        else:
+            # Nothing new: committing would still append a WAL frame, which
+            # sync_external_writes() would take for another process's write
+            conn.rollback()
+
+
+def get_write_queue():
+    """Shared write queue for new transactions (group commits on a worker thread)"""
+    return write_queue.get_write_queue(
+        ("transactions", DB_FILE),
+        lambda: write_queue.SQLiteSink(get_app_pool(), INSERT_TRANSACTION_SQL),
+        durability=WRITE_DURABILITY,
+        on_commit=bump_data_version,
+    )
+
+
+def take_write_failures(session=None):
+    """Queued writes of the session that failed since the last call"""
+    return get_write_queue().take_failures(session)
+
+
+# -----------------------------
+# Writes by other processes
+# -----------------------------
+_seen_files = None
+_seen_lock = threading.Lock()
+
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def sync_external_writes():
+    """Invalidate cached reads if another process changed DB_FILE since the last call.
+
+    bump_data_version() only reaches this process, but the Streamlit page
+    and the API server are separate processes writing the same file. A
+    commit always changes the database or its WAL file, so comparing their
+    size and mtime (two stat calls) before serving reads catches every
+    outside write. This process's own writes cause one extra, harmless
+    invalidation. Returns True if the cache was invalidated.
+    """
+    global _seen_files
+    signature = (_file_signature(DB_FILE), _file_signature(f"{DB_FILE}-wal"))
+    with _seen_lock:
+        if signature == _seen_files:
+            return False
+        first_look, _seen_files = _seen_files is None, signature
+    if first_look:
+        return False
+    bump_data_version()
+    return True
+
+
+@perf.timed
+def submit_transaction(date, category, description, amount, trans_type, session=None):
+    """Queue a new transaction for the write queue; returns its WriteTicket (done unless writes are async)"""
+    return get_write_queue().submit((date, category, description, to_cents(amount), trans_type),
+                                    session=session)
+
+
+def add_transaction(date, category, description, amount, trans_type, session=None):
+    """Add a new transaction to the database; returns its id (None while an async write is queued)"""
+    return submit_transaction(date, category, description, amount, trans_type, session).result
+
+
+@perf.timed
+def add_transactions(rows):
+    """Insert (date, category, description, amount, type) rows in one transaction; returns their ids"""
+    with get_db_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            ids = [conn.execute(INSERT_TRANSACTION_SQL, (date, category, description, to_cents(amount),
+                                                         trans_type)).lastrowid
+                   for date, category, description, amount, trans_type in rows]
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    bump_data_version()
+    return ids
+
+
+@perf.timed
+def pending_transactions(session=None, transaction_filter=None):
+    """The session's (matching) transactions still waiting in the write queue, as a DataFrame"""
+    rows = get_write_queue().pending(session)
+    if transaction_filter is not None:
+        rows = [row for row in rows if transaction_filter.matches(row[0], row[4], row[1])]
+    df = pd.DataFrame(rows, columns=['date', 'category', 'description', 'amount_cents', 'type'])
+    df['amount'] = df.pop('amount_cents') / 100
+    return df
+
+
+@perf.timed
+@cached
+def get_all_transactions(transaction_filter=None):
+    """Get all (matching) transactions from database"""
+    conditions, params = filter_conditions(transaction_filter)
+    with get_db_connection() as conn:
+        query = f'''
+            SELECT id, date, category, description, amount, type, created_at
+            FROM transactions
+            {where_clause(conditions)}
+            ORDER BY date DESC, id DESC
+        '''
+        df = pd.read_sql_query(query, conn, params=params)
+
+        # Convert date columns to datetime
+        if not df.empty:
+            df['date'] = pd.to_datetime(df['date'])
+            df['created_at'] = pd.to_datetime(df['created_at'])
+
+        return df
+
+
+@perf.timed
+def delete_transaction(transaction_id):
+    """Delete a transaction by ID"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM transactions WHERE id = ?', (transaction_id,))
+        conn.commit()
+        bump_data_version()
+        return cursor.rowcount > 0
+
+
+@perf.timed
+def update_transaction(transaction_id, date, category, description, amount, trans_type):
+    """Update an existing transaction"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE transactions 
+            SET date = ?, category = ?, description = ?, amount_cents = ?, type = ?
+            WHERE id = ?
+        ''', (date, category, description, to_cents(amount), trans_type, transaction_id))
+        conn.commit()
+        bump_data_version()
+        return cursor.rowcount > 0
+
+
+@perf.timed
+@cached
+def get_categories(trans_type=None):
+    """Get categories from database"""
+    with get_db_connection() as conn:
+        if trans_type:
+            query = "SELECT name FROM categories WHERE type = ? ORDER BY name"
+            categories = pd.read_sql_query(query, conn, params=(trans_type,))
+        else:
+            query = "SELECT name, type FROM categories ORDER BY type, name"
+            categories = pd.read_sql_query(query, conn)
+        return categories
+
+
+@perf.timed
+def add_category(name, trans_type, color=None, icon=None):
+    """Add a new category"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute('''
+                INSERT INTO categories (name, type, color, icon)
+                VALUES (?, ?, ?, ?)
+            ''', (name, trans_type, color, icon))
+            conn.commit()
+            bump_data_version()
+            return True
+        except sqlite3.IntegrityError:
+            return False  # Category already exists
+
+
+@perf.timed
+def delete_category(name):
+    """Delete a category"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM categories WHERE name = ?', (name,))
+        conn.commit()
+        bump_data_version()
+        return cursor.rowcount > 0
+
+
+@perf.timed
+def set_budget(category, year_month, limit):
+    """Set the monthly limit of an expense category (see budgets.py)"""
+    with get_db_connection() as conn:
+        budgets.set_budget(conn, category, year_month, limit)
+    bump_data_version()
+
+
+@perf.timed
+def delete_budget(category, year_month):
+    """Remove a monthly limit"""
+    with get_db_connection() as conn:
+        deleted = budgets.delete_budget(conn, category, year_month)
+    bump_data_version()
+    return deleted
+
+
+@perf.timed
+def roll_budgets_forward(through=None):
+    """Carry every category's latest limit into the months after it; returns the number created"""
+    with get_db_connection() as conn:
+        created = budgets.roll_forward(conn, through)
+    if created:
+        bump_data_version()
+    return created
+
+
+@perf.timed
+@cached
+def get_budget_report(year_month):
+    """Budget vs actual for a month (limits joined with the rollup's spending)"""
+    with get_db_connection() as conn:
+        return budgets.budget_vs_actual(conn, year_month)
+
+
+@perf.timed
+def overspend_alert(category, date, ticket=None):
+    """BudgetAlert if the category is now over its limit for that month (two key lookups).
+
+    ``ticket`` is the WriteTicket of the expense just submitted: while it
+    is still queued its amount is not in the totals yet and is counted in.
+    """
+    with get_db_connection() as conn:
+        pending_cents = ticket.record[3] if ticket is not None and not ticket.done else 0
+        alert = budgets.check_overspend(conn, category, date, pending_cents)
+        if pending_cents and ticket.done:
+            # Committed while we were reading: the totals may already include it
+            alert = budgets.check_overspend(conn, category, date)
+        return alert
+
+
+@perf.timed
+@cached
+def get_summary(transaction_filter=None):
+    """Calculate summary statistics from the rollup table (or the filtered transactions)"""
+    source, params = aggregate_source(transaction_filter)
+    with get_db_connection() as conn:
+        # Get total income (integer cents: exact)
+        income_result = conn.execute(SUMMARY_SQL.format(source=source), params + ['Income']).fetchone()
+        income_cents = income_result['total']
+
+        # Get total expenses
+        expense_result = conn.execute(SUMMARY_SQL.format(source=source), params + ['Expense']).fetchone()
+        expense_cents = expense_result['total']
+
+        balance_cents = income_cents - expense_cents
+
+        return from_cents(income_cents), from_cents(expense_cents), from_cents(balance_cents)
+
+
+@perf.timed
+@cached
+def get_category_summary(transaction_filter=None):
+    """Get summary by category (from the rollup table, or the filtered transactions)"""
+    source, params = aggregate_source(transaction_filter)
+    with get_db_connection() as conn:
+        return pd.read_sql_query(CATEGORY_SUMMARY_SQL.format(source=source), conn, params=params)
+
+
+@perf.timed
+@cached
+def get_monthly_summary(transaction_filter=None):
+    """Get monthly summary (from the rollup table, or the filtered transactions)"""
+    source, params = aggregate_source(transaction_filter)
+    with get_db_connection() as conn:
+        return pd.read_sql_query(MONTHLY_SUMMARY_SQL.format(source=source), conn, params=params)
+
+
+@perf.timed
+@cached
+def get_history_page(page_size=DEFAULT_PAGE_SIZE, cursor=None, transaction_filter=None):
+    """Get one page of the transaction history (see history.get_transactions_page)"""
+    with get_db_connection() as conn:
+        return get_transactions_page(conn, page_size, cursor, transaction_filter)
+
+
+@perf.timed
+def import_statement(uploaded_file, unsigned_type=None, progress=None):
+    """Bulk-import a CSV/OFX/QIF statement; returns the importer's final progress report.
+
+    ``unsigned_type`` None means signed amounts (negative = expense).
+    """
+    import importer
+
+    with get_db_connection() as conn:
+        report = importer.import_file(conn, uploaded_file, unsigned_type=unsigned_type or importer.SIGNED,
+                                      progress=progress)
+    if report.inserted:
+        bump_data_version()
+    return report
+
+
+@perf.timed
+@cached
+def search_history(text, transaction_filter=None):
+    """Best matches for a search over descriptions and categories (FTS5, see search.py)"""
+    with get_db_connection() as conn:
+        return search_transactions(conn, text, transaction_filter=transaction_filter)
+
+
+@perf.timed
+@cached
+def get_dashboard_snapshot(transaction_filter=None):
+    """Get totals, category and monthly aggregates and the row count in one query"""
+    with get_db_connection() as conn:
+        return load_dashboard_snapshot(conn, transaction_filter)
+
+
+@perf.timed
+def export_to_csv(transaction_filter=None):
+    """Export all (matching) transactions to a CSV string (small ledgers; the UI uses prepare_export)"""
+    import exporter
+
+    with get_db_connection() as conn:
+        csv_data = exporter.export_to_string(conn, transaction_filter=transaction_filter)
+    return csv_data if csv_data.count('\n') > 1 else None
+
+
+@perf.timed
+def prepare_export(fmt="csv", transaction_filter=None):
+    """Stream the (matching) transactions to an export file for the current data version; returns (path, rows)"""
+    import exporter
+
+    with get_db_connection() as conn:
+        return exporter.export_cache.build(conn, fmt, data_version(), transaction_filter=transaction_filter)
+
+
+@perf.timed
+@cached
+def plot_expenses_by_category(category_summary=None, transaction_filter=None):
+    """Render the expenses-by-category donut chart (PNG bytes, or None if there is no data)"""
+    if category_summary is None:
+        category_summary = get_dashboard_snapshot(transaction_filter).category_summary
+    return charts.category_pie_png(charts.category_chart_data(category_summary))
+
+
+@perf.timed
+@cached
+def plot_monthly_trend(monthly_summary=None, transaction_filter=None):
+    """Render the monthly income vs expenses chart (PNG bytes, or None if there is no data)"""
+    if monthly_summary is None:
+        monthly_summary = get_dashboard_snapshot(transaction_filter).monthly_summary
+    return charts.monthly_trend_png(charts.monthly_chart_data(monthly_summary))
+
+
+@perf.timed
+@cached
+def get_cashflow(freq="M", window=None, start=None, end=None):
+    """Running balance, net flow and rolling average per day, week or month (see cashflow.py).
+
+    Brings the database's daily totals up to date first: only transactions
+    added since the last call are read, unless some were edited or deleted.
+    """
+    tracker = cashflow.get_tracker(DB_FILE)
+    with get_db_connection() as conn:
+        tracker.refresh(conn)
+    return tracker.series(freq, window, start, end)
+
+
+def cashflow_stats():
+    """Refresh counters of the database's cash-flow tracker"""
+    return cashflow.get_tracker(DB_FILE).stats()
+
+
+@perf.timed
+@cached
+def plot_balance(freq="M", start=None, end=None):
+    """Render the balance-over-time chart (PNG bytes, or None if there is no data)"""
+    label = cashflow.FREQUENCIES[freq][0]
+    return charts.balance_png(charts.balance_chart_data(get_cashflow(freq, None, start, end)),
+                              title=f'{label} Balance Over Time')
+
+
+@perf.timed
+def add_sample_data():
+    """Add sample data for demonstration"""
+    sample_data = [
+        (datetime.date(2024, 1, 15), 'Salary', 'Monthly Salary', 3000, 'Income'),
+        (datetime.date(2024, 1, 16), 'Food & Dining', 'Groceries', 150, 'Expense'),
+        (datetime.date(2024, 1, 17), 'Transportation', 'Gas', 60, 'Expense'),
+        (datetime.date(2024, 1, 18), 'Entertainment', 'Movie', 35, 'Expense'),
+        (datetime.date(2024, 1, 20), 'Freelance', 'Web Design', 500, 'Income'),
+        (datetime.date(2024, 2, 1), 'Bills & Utilities', 'Electricity', 80, 'Expense'),
+        (datetime.date(2024, 2, 5), 'Salary', 'Monthly Salary', 3000, 'Income'),
+        (datetime.date(2024, 2, 10), 'Food & Dining', 'Restaurant', 75, 'Expense'),
+        (datetime.date(2024, 2, 15), 'Shopping', 'Clothes', 120, 'Expense'),
+    ]
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany('''
+            INSERT INTO transactions (date, category, description, amount_cents, type)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(date, category, description, to_cents(amount), trans_type)
+              for date, category, description, amount, trans_type in sample_data])
+        conn.commit()
+        bump_data_version()
+
+
+@perf.timed
+def clear_transactions():
+    """Delete every transaction"""
+    with get_db_connection() as conn:
+        conn.execute("DELETE FROM transactions")
+        conn.commit()
+    bump_data_version()
+
+
+@perf.timed
+def check_summary_totals():
+    """Compare the rollup with the transactions and rebuild it if they differ.
+
+    Returns (number of out-of-date totals, rows rebuilt).
+    """
+    with get_db_connection() as conn:
+        mismatches = check_rollup(conn)
+        if not mismatches:
+            return 0, 0
+        rows = rebuild_rollup(conn)
+    bump_data_version()
+    return len(mismatches), rows
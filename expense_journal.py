@@ -0,0 +1,358 @@
+"""Append-only journal storage for the JSON expense trackers.
+
+``expenses.json`` stays a plain JSON list of expenses (the snapshot). Changes
+made after the snapshot was written are appended to ``expenses.json.log``,
+one JSON object per line:
+
+    {"op": "base", "snapshot_sha1": "..."}        first line: which snapshot this log extends
+    {"op": "add", "expense": {...}}
+    {"op": "edit", "index": 3, "expense": {...}}
+    {"op": "delete", "index": 0}
+
+Adding, editing or deleting an expense writes one short line (plus an fsync)
+instead of rewriting the whole file. Loading reads the snapshot and replays
+the log. When the log grows past ``compact_every`` operations, the current
+list is written to a temporary file and atomically renamed over the
+snapshot, then a fresh log is started.
+
+Several writers (browser sessions, the CLI, other processes) can share the
+files:
+  * every write takes an exclusive lock on ``expenses.json.lock`` and first
+    catches up with whatever the others appended, so nobody's entries are
+    overwritten;
+  * catching up is cheap. A changed snapshot (size, mtime or inode), meaning
+    someone compacted, forces a full reload. If only the log grew, just the
+    new lines are read and applied. If nothing changed, nothing is parsed;
+  * edits and deletes name the expense the caller saw. If another writer
+    moved it, the op is re-pointed at its new position, and if it was
+    changed or deleted a ConflictError is raised instead of touching the
+    wrong row.
+
+Crash safety:
+  * a torn last log line (crash mid-append) is ignored and cut off;
+  * the log header holds the SHA-1 of the snapshot it extends, so if a crash
+    happens after a compaction replaced the snapshot but before the log was
+    reset, the stale log is recognized and not applied twice.
+"""
+import hashlib
+import json
+import os
+import threading
+
+from file_lock import FileLock
+
+
+DEFAULT_COMPACT_EVERY = 1000
+
+
+class ConflictError(Exception):
+    """The expense to edit/delete was changed or removed by another writer"""
+
+
+def _fsync_directory(path):
+    """Make a rename durable (no-op where directories can't be opened, e.g. Windows)"""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _atomic_write(path, data):
+    """Write bytes to path via a temporary file + fsync + rename"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+    _fsync_directory(path)
+
+
+def _file_id(path):
+    """(inode, size, mtime) of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def apply_op(expenses, op):
+    """Apply one journal operation to a list of expenses (in place)"""
+    kind = op.get("op")
+    if kind == "add":
+        expenses.append(op["expense"])
+    elif kind == "edit":
+        expenses[op["index"]] = op["expense"]
+    elif kind == "delete":
+        expenses.pop(op["index"])
+    elif kind != "base":
+        raise ValueError(f"unknown journal operation {kind!r}")
+
+
+class ExpenseJournal:
+    """Snapshot + append-only log storage for a list of expense dicts.
+
+    ``lock`` guards the in-memory state. Hold it while reading ``expenses``
+    (or totals) if other threads share this object.
+    """
+
+    def __init__(self, snapshot_path, log_path=None, compact_every=DEFAULT_COMPACT_EVERY, fsync=True):
+        self.snapshot_path = snapshot_path
+        self.log_path = log_path or f"{snapshot_path}.log"
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.expenses = []
+        self.log_ops = 0          # operations in the current log
+        self.lock = threading.RLock()
+        self._file_lock = FileLock(f"{snapshot_path}.lock")
+        self._snapshot_sha1 = None
+        self._snapshot_id = None  # _file_id of the snapshot we loaded
+        self._log_seen = None     # _file_id of the log when we last read or wrote it
+        self._log_valid = False   # that log extends our snapshot (False: none, or a stale one)
+        self._log_valid_size = 0  # byte length of the log up to the last complete line
+        self.stats = {"full_loads": 0, "tail_reads": 0, "unchanged": 0}
+
+    # -----------------------------
+    # Loading
+    # -----------------------------
+    def _read_snapshot(self):
+        self._snapshot_id = _file_id(self.snapshot_path)
+        try:
+            with open(self.snapshot_path, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            data = b""
+        self._snapshot_sha1 = hashlib.sha1(data).hexdigest()
+        return json.loads(data) if data.strip() else []
+
+    def _apply(self, op):
+        """Apply one operation to the in-memory list (subclasses hook in here)"""
+        apply_op(self.expenses, op)
+
+    def _reset(self, expenses):
+        """Replace the in-memory list with a freshly read snapshot"""
+        self.expenses = expenses
+
+    def _replay_log(self, offset=0):
+        """Apply the log from byte ``offset`` (0 = from the header). Returns the number of operations applied"""
+        if offset == 0:
+            self._log_valid_size = 0
+            self._log_valid = False
+            self._log_seen = None
+        try:
+            file = open(self.log_path, "rb")
+        except FileNotFoundError:
+            return 0
+
+        applied = 0
+        with file:
+            stat = os.fstat(file.fileno())
+            self._log_seen = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            file.seek(offset)
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break  # torn write at the end of the log (or one still in progress)
+                try:
+                    op = json.loads(line)
+                except ValueError:
+                    break
+                if offset == 0:
+                    if op.get("op") != "base" or op.get("snapshot_sha1") != self._snapshot_sha1:
+                        # Log belongs to an older snapshot that already contains its changes
+                        return 0
+                    self._log_valid = True
+                else:
+                    self._apply(op)
+                    applied += 1
+                offset += len(line)
+                self._log_valid_size = offset
+        return applied
+
+    def _full_load(self):
+        self._reset(self._read_snapshot())
+        self.log_ops = self._replay_log()
+        self.stats["full_loads"] += 1
+
+    def _catch_up(self):
+        """Pick up changes other writers made since we last looked. Returns True if anything changed"""
+        if self._snapshot_sha1 is None or _file_id(self.snapshot_path) != self._snapshot_id:
+            self._full_load()
+            return True
+
+        log_id = _file_id(self.log_path)
+        if log_id == self._log_seen:
+            self.stats["unchanged"] += 1
+            return False
+        if (log_id is None or self._log_seen is None or not self._log_valid
+                or log_id[0] != self._log_seen[0] or log_id[1] < self._log_valid_size):
+            # Log removed, started, replaced or cut: someone compacted
+            self._full_load()
+            return True
+
+        # Only the log grew: read just the new lines
+        self.log_ops += self._replay_log(self._log_valid_size)
+        self.stats["tail_reads"] += 1
+        return True
+
+    def load(self):
+        """Read the snapshot and replay the log. Returns the list of expenses"""
+        with self.lock, self._file_lock:
+            self._full_load()
+            if self.log_ops >= self.compact_every:
+                self._compact()
+            return self.expenses
+
+    def refresh(self):
+        """Bring in other writers' changes (cheap if there are none). Returns the list of expenses"""
+        with self.lock:
+            self._catch_up()
+            return self.expenses
+
+    # -----------------------------
+    # Mutations: O(1) I/O each
+    # -----------------------------
+    def _append(self, build_ops):
+        """Under the file lock: catch up, build the operations, log them (one write + fsync) and apply them"""
+        with self.lock, self._file_lock:
+            self._catch_up()
+            ops = build_ops()
+            if not ops:
+                return
+
+            lines = []
+            if self._log_valid_size == 0:
+                # New log: start it with the header naming the snapshot it extends
+                lines.append({"op": "base", "snapshot_sha1": self._snapshot_sha1})
+            lines.extend(ops)
+            data = "".join(json.dumps(line) + "\n" for line in lines).encode("utf-8")
+
+            mode = "r+b" if self._log_valid_size and os.path.exists(self.log_path) else "wb"
+            with open(self.log_path, mode) as file:
+                # Drop a torn trailing line left by an earlier crash before appending
+                file.seek(self._log_valid_size)
+                file.truncate()
+                file.write(data)
+                file.flush()
+                if self.fsync:
+                    os.fsync(file.fileno())
+                stat = os.fstat(file.fileno())
+            self._log_seen = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            self._log_valid = True
+            self._log_valid_size += len(data)
+
+            for op in ops:
+                self._apply(op)
+            self.log_ops += len(ops)
+            if self.log_ops >= self.compact_every:
+                self._compact()
+
+    def _locate(self, index, expected):
+        """Current index of ``expected`` (the expense the caller saw at ``index``)"""
+        if 0 <= index < len(self.expenses) and self.expenses[index] == expected:
+            return index
+        try:
+            return self.expenses.index(expected)
+        except ValueError:
+            raise ConflictError("the expense was changed or deleted by someone else") from None
+
+    def add(self, expense):
+        self._append(lambda: [{"op": "add", "expense": expense}])
+
+    def add_many(self, expenses):
+        """Add several expenses with a single log write"""
+        self._append(lambda: [{"op": "add", "expense": expense} for expense in expenses])
+
+    def edit(self, index, expense):
+        with self.lock:
+            if not 0 <= index < len(self.expenses):
+                raise IndexError(index)
+            expected = self.expenses[index]
+            self._append(lambda: [{"op": "edit", "index": self._locate(index, expected), "expense": expense}])
+
+    def delete(self, index):
+        """Delete and return the expense at index"""
+        with self.lock:
+            if not 0 <= index < len(self.expenses):
+                raise IndexError(index)
+            expected = self.expenses[index]
+            self._append(lambda: [{"op": "delete", "index": self._locate(index, expected)}])
+            return expected
+
+    def delete_many(self, indexes):
+        """Delete the expenses at several indexes with a single log write; returns the number deleted.
+
+        Indexes out of range, and expenses another writer changed or deleted
+        in the meantime, are skipped.
+        """
+        with self.lock:
+            expected = [(index, self.expenses[index]) for index in {int(index) for index in indexes}
+                        if 0 <= index < len(self.expenses)]
+            located = set()
+
+            def build_ops():
+                located.clear()
+                for index, expense in expected:
+                    try:
+                        located.add(self._locate(index, expense))
+                    except ConflictError:
+                        pass
+                # Highest index first, so each delete leaves the others in place
+                return [{"op": "delete", "index": index} for index in sorted(located, reverse=True)]
+
+            self._append(build_ops)
+            return len(located)
+
+    # -----------------------------
+    # Compaction
+    # -----------------------------
+    def _compact(self):
+        """Fold the log into a new snapshot (atomic rename) and start an empty log. File lock held"""
+        data = json.dumps(self.expenses, indent=4).encode("utf-8")
+        _atomic_write(self.snapshot_path, data)
+        self._snapshot_sha1 = hashlib.sha1(data).hexdigest()
+        self._snapshot_id = _file_id(self.snapshot_path)
+        # A crash right here leaves the old log behind; its header names the
+        # old snapshot, so load() will skip it.
+        try:
+            os.remove(self.log_path)
+        except FileNotFoundError:
+            pass
+        self._log_seen = None
+        self._log_valid = False
+        self._log_valid_size = 0
+        self.log_ops = 0
+
+    def compact(self):
+        """Fold the log into the snapshot now"""
+        with self.lock, self._file_lock:
+            self._catch_up()
+            self._compact()
+
+
+_journals = {}
+_journals_lock = threading.Lock()
+
+
+def get_shared(journal_class, snapshot_path, **kwargs):
+    """One loaded journal per file for the whole process, shared by every session.
+
+    Streamlit re-executes the page on every rerun; keeping the journal here
+    means a rerun only pays for refresh() (a couple of stat calls) instead
+    of re-parsing the files.
+    """
+    key = (journal_class, os.path.abspath(snapshot_path))
+    with _journals_lock:
+        journal = _journals.get(key)
+        if journal is None:
+            journal = journal_class(snapshot_path, **kwargs)
+            journal.load()
+            _journals[key] = journal
+    journal.refresh()
+    return journal
@@ -0,0 +1,131 @@
+"""Expense journal with running per-category and per-month totals.
+
+ExpenseLedger extends ExpenseJournal and keeps totals up to date as each
+operation is applied: add and delete adjust one category and one month,
+and edit removes the old values and adds the new ones. Reading a total is
+a dict lookup, no matter how many expenses there are. Totals are kept as
+integer cents (see money.py), so adding and removing the same expense
+thousands of times never leaves a stray 0.0000001 behind. Expenses
+without a ``type`` are expenses; income records (from the SQLite tracker,
+via storage_engines.py) only count towards ``income``.
+
+The totals are saved next to the data in ``expenses.json.totals`` whenever
+the journal compacts. The sidecar records the SHA-1 of the snapshot it
+matches. On load it is used only if that hash still matches, and the log is
+then replayed on top of it. Otherwise the totals are recomputed once.
+"""
+import json
+
+from expense_journal import ExpenseJournal, _atomic_write
+from money import from_cents, to_cents
+
+
+class ExpenseLedger(ExpenseJournal):
+    """ExpenseJournal + incrementally maintained totals"""
+
+    def __init__(self, snapshot_path, totals_path=None, **kwargs):
+        super().__init__(snapshot_path, **kwargs)
+        self.totals_path = totals_path or f"{snapshot_path}.totals"
+        self.category_cents = {}
+        self.month_cents = {}
+        self.total_cents = 0
+        self.income_cents = 0
+        # Number of expenses behind each key, so emptied keys can be dropped
+        self.category_counts = {}
+        self.month_counts = {}
+
+    # -----------------------------
+    # Totals in major units (what the apps display)
+    # -----------------------------
+    @property
+    def category_totals(self):
+        return {category: from_cents(cents) for category, cents in self.category_cents.items()}
+
+    @property
+    def month_totals(self):
+        return {month: from_cents(cents) for month, cents in self.month_cents.items()}
+
+    @property
+    def total(self):
+        return from_cents(self.total_cents)
+
+    @property
+    def income(self):
+        return from_cents(self.income_cents)
+
+    # -----------------------------
+    # Incremental bookkeeping
+    # -----------------------------
+    @staticmethod
+    def _bump(totals, counts, key, amount, sign):
+        count = counts.get(key, 0) + sign
+        if count <= 0:
+            # Last expense for this key is gone
+            totals.pop(key, None)
+            counts.pop(key, None)
+        else:
+            totals[key] = totals.get(key, 0) + amount
+            counts[key] = count
+
+    def _count(self, expense, sign):
+        cents = sign * to_cents(expense["amount"])
+        if expense.get("type", "Expense") == "Income":
+            self.income_cents += cents
+            return
+        self.total_cents += cents
+        self._bump(self.category_cents, self.category_counts, expense["category"], cents, sign)
+        self._bump(self.month_cents, self.month_counts, str(expense["date"])[:7], cents, sign)
+
+    def _apply(self, op):
+        kind = op.get("op")
+        if kind == "add":
+            self._count(op["expense"], 1)
+        elif kind == "edit":
+            self._count(self.expenses[op["index"]], -1)
+            self._count(op["expense"], 1)
+        elif kind == "delete":
+            self._count(self.expenses[op["index"]], -1)
+        super()._apply(op)
+
+    def _recompute(self):
+        self.category_cents, self.month_cents, self.total_cents, self.income_cents = {}, {}, 0, 0
+        self.category_counts, self.month_counts = {}, {}
+        for expense in self.expenses:
+            self._count(expense, 1)
+
+    # -----------------------------
+    # Persistence of the totals
+    # -----------------------------
+    def _reset(self, expenses):
+        super()._reset(expenses)
+        try:
+            with open(self.totals_path, "r") as file:
+                saved = json.load(file)
+        except (FileNotFoundError, ValueError):
+            saved = None
+
+        # Sidecars from before the switch to cents (no "total_cents") or from
+        # before income was counted separately (no "income_cents") are recomputed
+        if (saved and saved.get("snapshot_sha1") == self._snapshot_sha1
+                and "total_cents" in saved and "income_cents" in saved):
+            self.category_cents = saved["category_cents"]
+            self.month_cents = saved["month_cents"]
+            self.category_counts = saved["category_counts"]
+            self.month_counts = saved["month_counts"]
+            self.total_cents = saved["total_cents"]
+            self.income_cents = saved["income_cents"]
+        else:
+            self._recompute()
+
+    def _compact(self):
+        super()._compact()
+        data = json.dumps({
+            "snapshot_sha1": self._snapshot_sha1,
+            "category_cents": self.category_cents,
+            "month_cents": self.month_cents,
+            "category_counts": self.category_counts,
+            "month_counts": self.month_counts,
+            "total_cents": self.total_cents,
+            "income_cents": self.income_cents,
+        }, indent=4).encode("utf-8")
+        _atomic_write(self.totals_path, data)
@@ -0,0 +1,191 @@
+"""Streaming export of the transactions table to CSV, gzip CSV or Parquet.
+
+Rows are read from an SQLite cursor ``chunk_size`` at a time and written
+straight to a file. No DataFrame or full CSV string is ever built, so peak
+memory is one chunk whatever the ledger size. Finished files are kept per
+(format, filter, data version) by ExportCache. Clicking download again, or
+another session exporting the same unchanged rows, reuses the file. A
+TransactionFilter restricts the export in SQL (see filters.py).
+
+Parquet needs the optional ``pyarrow`` package; see available_formats().
+"""
+import csv
+import gzip
+import importlib.util
+import io
+import os
+import tempfile
+import threading
+import time
+
+from filters import filter_conditions, where_clause
+
+
+DEFAULT_CHUNK_SIZE = 10000
+# How long a replaced export file is kept for download buttons still pointing at it
+RETIRED_GRACE_SECONDS = 15 * 60
+
+EXPORT_COLUMNS = ['id', 'date', 'category', 'description', 'amount', 'type', 'created_at']
+
+# Dates come back as the stored ISO text (no per-row date parsing/formatting)
+EXPORT_QUERY = '''
+    SELECT id, CAST(date AS TEXT) as date, category, description, amount, type,
+           CAST(created_at AS TEXT) as created_at
+    FROM transactions
+    {where}
+    ORDER BY transactions.date DESC, transactions.id DESC
+'''
+
+FORMATS = {
+    # format: (file extension, mime type)
+    "csv": (".csv", "text/csv"),
+    "csv.gz": (".csv.gz", "application/gzip"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+
+
+def available_formats():
+    """Export formats usable in this environment"""
+    formats = ["csv", "csv.gz"]
+    # find_spec() locates pyarrow without importing it (that happens on the first parquet export)
+    if importlib.util.find_spec("pyarrow") is not None:
+        formats.append("parquet")
+    return formats
+
+
+def iter_export_chunks(conn, chunk_size=DEFAULT_CHUNK_SIZE, transaction_filter=None):
+    """Yield lists of row tuples from a cursor, chunk_size rows at a time"""
+    conditions, params = filter_conditions(transaction_filter)
+    cursor = conn.cursor()
+    cursor.execute(EXPORT_QUERY.format(where=where_clause(conditions)), params)
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield [tuple(row) for row in rows]
+    finally:
+        cursor.close()
+
+
+def write_csv(conn, text_stream, chunk_size=DEFAULT_CHUNK_SIZE, transaction_filter=None):
+    """Write the (filtered) transactions as CSV to a text stream. Returns the row count"""
+    writer = csv.writer(text_stream, lineterminator='\n')
+    writer.writerow(EXPORT_COLUMNS)
+    count = 0
+    for rows in iter_export_chunks(conn, chunk_size, transaction_filter):
+        writer.writerows(rows)
+        count += len(rows)
+    return count
+
+
+def write_parquet(conn, path, chunk_size=DEFAULT_CHUNK_SIZE, transaction_filter=None):
+    """Write the (filtered) transactions to a Parquet file, one row group per chunk. Returns the row count"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('id', pa.int64()), ('date', pa.string()), ('category', pa.string()),
+        ('description', pa.string()), ('amount', pa.float64()), ('type', pa.string()),
+        ('created_at', pa.string()),
+    ])
+    count = 0
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        for rows in iter_export_chunks(conn, chunk_size, transaction_filter):
+            columns = list(zip(*rows))
+            writer.write_table(pa.table([pa.array(col, type=schema.field(i).type)
+                                         for i, col in enumerate(columns)], schema=schema))
+            count += len(rows)
+    return count
+
+
+def export_to_path(conn, path, fmt="csv", chunk_size=DEFAULT_CHUNK_SIZE, transaction_filter=None):
+    """Export the (filtered) transactions to ``path`` in the given format. Returns the row count"""
+    if fmt == "csv":
+        with open(path, "w", newline="", encoding="utf-8") as out:
+            return write_csv(conn, out, chunk_size, transaction_filter)
+    if fmt == "csv.gz":
+        with gzip.open(path, "wt", newline="", encoding="utf-8", compresslevel=6) as out:
+            return write_csv(conn, out, chunk_size, transaction_filter)
+    if fmt == "parquet":
+        return write_parquet(conn, path, chunk_size, transaction_filter)
+    raise ValueError(f"unsupported export format {fmt!r}")
+
+
+def export_to_string(conn, chunk_size=DEFAULT_CHUNK_SIZE, transaction_filter=None):
+    """Whole CSV as one string -- only for small ledgers and tests"""
+    out = io.StringIO()
+    write_csv(conn, out, chunk_size, transaction_filter)
+    return out.getvalue()
+
+
+class ExportCache:
+    """Keeps the latest export file per (format, filter), rebuilt only when the data version changes.
+
+    A replaced file is removed by a later build once it is ``grace_seconds``
+    old, not straight away: a download button rendered in another session
+    may still point at it.
+    """
+
+    def __init__(self, directory=None, grace_seconds=RETIRED_GRACE_SECONDS):
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "expense_exports")
+        self.grace_seconds = grace_seconds
+        self._files = {}  # (fmt, filter) -> (data_version, path, row_count)
+        self._retired = []  # (replaced at, path): other sessions may still offer them for download
+        self._lock = threading.Lock()
+
+    def get(self, fmt, data_version, transaction_filter=None):
+        """Return (path, row_count) if an export for this version exists, else None"""
+        with self._lock:
+            entry = self._files.get((fmt, transaction_filter))
+        if entry and entry[0] == data_version and os.path.exists(entry[1]):
+            return entry[1], entry[2]
+        return None
+
+    def build(self, conn, fmt, data_version, chunk_size=DEFAULT_CHUNK_SIZE, transaction_filter=None):
+        """Export to a new file for this version (reusing an existing one). Returns (path, row_count)"""
+        cached = self.get(fmt, data_version, transaction_filter)
+        if cached:
+            return cached
+
+        os.makedirs(self.directory, exist_ok=True)
+        extension = FORMATS[fmt][0]
+        name = f"expenses_{os.getpid()}_v{data_version}"
+        if transaction_filter is not None and transaction_filter.active:
+            name += f"_{transaction_filter.key()}"
+        path = os.path.join(self.directory, name + extension)
+        # A partial file of its own: two sessions building the same export
+        # must not write into one file. Whichever finishes last replaces
+        # ``path`` with an identical copy.
+        fd, partial = tempfile.mkstemp(prefix=name, suffix=extension + ".partial", dir=self.directory)
+        os.close(fd)
+        try:
+            row_count = export_to_path(conn, partial, fmt, chunk_size, transaction_filter)
+            os.replace(partial, path)
+        except BaseException:
+            try:
+                os.remove(partial)
+            except OSError:
+                pass
+            raise
+
+        now = time.monotonic()
+        with self._lock:
+            old = self._files.get((fmt, transaction_filter))
+            self._files[(fmt, transaction_filter)] = (data_version, path, row_count)
+            if old and old[1] != path:
+                self._retired.append((now, old[1]))
+            expired = [old_path for retired_at, old_path in self._retired if now - retired_at >= self.grace_seconds]
+            self._retired = [(retired_at, old_path) for retired_at, old_path in self._retired
+                             if now - retired_at < self.grace_seconds]
+        for old_path in expired:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+        return path, row_count
+
+
+# Shared by every session of the app (Streamlit re-executes the page script,
+# but imported modules persist)
+export_cache = ExportCache()
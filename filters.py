@@ -0,0 +1,139 @@
+"""Date-range, type and category filters pushed down into SQL.
+
+A TransactionFilter becomes parameterized predicates that every query
+(dashboard aggregates, history pages, exports) adds to its WHERE clause, so
+SQLite only reads the matching rows:
+  * a date range is a range scan on an index that starts with ``date``;
+  * aggregates over whole months (start on the 1st, end on a month's last
+    day, or no dates at all) are read from the (month, category, type)
+    rollup table instead of the transactions;
+  * any other range is aggregated from the transactions through the
+    covering (date, type, category, amount_cents) index (migration 7), so
+    "the last 10 days" of a 10-year ledger reads 10 days of index entries.
+
+Filters are frozen dataclasses: hashable, so they are part of the query
+cache key, and equal filters share cached results.
+"""
+import calendar
+import datetime
+import hashlib
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class TransactionFilter:
+    """Which transactions to show. None / empty means no restriction"""
+    start: datetime.date = None  # inclusive
+    end: datetime.date = None    # inclusive
+    types: tuple = ()
+    categories: tuple = ()
+
+    @property
+    def active(self):
+        return bool(self.start or self.end or self.types or self.categories)
+
+    @property
+    def month_aligned(self):
+        """True if the date range covers whole months (so the rollup can answer it)"""
+        if self.start is not None and self.start.day != 1:
+            return False
+        if self.end is not None and self.end.day != calendar.monthrange(self.end.year, self.end.month)[1]:
+            return False
+        return True
+
+    def conditions(self, rollup=False):
+        """(SQL conditions, parameters) for the transactions table, or for the rollup if ``rollup``"""
+        conditions, params = [], []
+        if rollup:
+            if self.start is not None:
+                conditions.append("year_month >= ?")
+                params.append(self.start.strftime("%Y-%m"))
+            if self.end is not None:
+                conditions.append("year_month <= ?")
+                params.append(self.end.strftime("%Y-%m"))
+        else:
+            if self.start is not None:
+                conditions.append("date >= ?")
+                params.append(self.start.isoformat())
+            if self.end is not None:
+                conditions.append("date <= ?")
+                params.append(self.end.isoformat())
+        if self.types:
+            conditions.append(f"type IN ({', '.join('?' * len(self.types))})")
+            params.extend(self.types)
+        if self.categories:
+            conditions.append(f"category IN ({', '.join('?' * len(self.categories))})")
+            params.extend(self.categories)
+        return conditions, params
+
+    def matches(self, date, trans_type, category):
+        """The same test in Python, for rows not in the database yet (e.g. queued writes)"""
+        return ((self.start is None or date >= self.start) and (self.end is None or date <= self.end)
+                and (not self.types or trans_type in self.types)
+                and (not self.categories or category in self.categories))
+
+    def key(self):
+        """Short stable id (e.g. for export file names)"""
+        return hashlib.sha1(repr(self).encode("utf-8")).hexdigest()[:10]
+
+
+def where_clause(conditions):
+    """``WHERE a AND b`` (empty string when there are no conditions)"""
+    return f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+
+def filter_conditions(transaction_filter, rollup=False):
+    """conditions() of a filter that may be None"""
+    if transaction_filter is None:
+        return [], []
+    return transaction_filter.conditions(rollup)
+
+
+def aggregate_source(transaction_filter=None):
+    """A relation with the rollup's columns, restricted to the filter. Returns (sql, params).
+
+    The rollup table itself when the filter covers whole months, otherwise
+    the same aggregate computed from the matching transactions.
+    """
+    if transaction_filter is None or transaction_filter.month_aligned:
+        conditions, params = filter_conditions(transaction_filter, rollup=True)
+        return f"(SELECT * FROM transaction_rollup {where_clause(conditions)})", params
+
+    conditions, params = transaction_filter.conditions()
+    # substr(date, ...) rather than the virtual year_month column, so the
+    # covering index on (date, type, category, amount_cents) answers it alone
+    return f'''(
+        SELECT substr(date, 1, 7) as year_month, category, type,
+               SUM(amount_cents) as total_cents, COUNT(*) as transaction_count
+        FROM transactions
+        {where_clause(conditions)}
+        GROUP BY substr(date, 1, 7), category, type
+    )''', params
+
+
+# -----------------------------
+# Date range presets for the UI
+# -----------------------------
+PERIODS = ["All time", "This month", "Last month", "Last 3 months", "This year", "Last 30 days", "Custom"]
+
+
+def period_range(period, today=None):
+    """(start, end) for a preset in PERIODS; (None, None) for all time and custom"""
+    today = today or datetime.date.today()
+    month_start = today.replace(day=1)
+    month_end = today.replace(day=calendar.monthrange(today.year, today.month)[1])
+    if period == "This month":
+        return month_start, month_end
+    if period == "Last month":
+        end = month_start - datetime.timedelta(days=1)
+        return end.replace(day=1), end
+    if period == "Last 3 months":
+        start = month_start
+        for _ in range(2):
+            start = (start - datetime.timedelta(days=1)).replace(day=1)
+        return start, month_end
+    if period == "This year":
+        return today.replace(month=1, day=1), today.replace(month=12, day=31)
+    if period == "Last 30 days":
+        return today - datetime.timedelta(days=29), today
+    return None, None
@@ -0,0 +1,391 @@
+"""Streaming bulk import of bank statements (CSV, OFX/QFX, QIF) into SQLite.
+
+The file is read as a text stream and parsed one record at a time. Records
+are normalized (dates, signed amounts, categories checked against the
+``categories`` table) and inserted ``batch_size`` rows per transaction with
+``executemany``. At most one batch is held in memory, whatever the file size.
+
+Each imported row gets a content hash. It is stored in
+``transactions.import_hash``, which has a UNIQUE index, so importing the same
+statement twice adds nothing. Identical rows within one file (two coffees on
+the same day) get an occurrence number in their hash and are both kept. The
+number is counted per date, so memory stays bounded for date-ordered
+statements.
+
+Usage from the command line:
+    python importer.py statement.csv --db expenses.db
+"""
+import argparse
+import csv
+import datetime
+import hashlib
+import io
+import os
+import re
+import time
+from dataclasses import dataclass, field
+
+from money import format_cents, to_cents
+
+
+DEFAULT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 20
+
+FORMATS = ("csv", "ofx", "qif")
+EXTENSION_FORMATS = {".csv": "csv", ".txt": "csv", ".ofx": "ofx", ".qfx": "ofx", ".qif": "qif"}
+
+# How rows without an explicit Income/Expense type are classified
+SIGNED = "signed"  # negative amount = Expense, positive = Income
+
+DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y", "%d.%m.%Y",
+                "%m/%d/%y", "%d/%m/%y", "%Y%m%d")
+
+# CSV header aliases (lower-cased) -> field
+CSV_COLUMNS = {
+    "date": ("date", "transaction date", "posted date", "posting date", "value date", "booking date"),
+    "description": ("description", "details", "narrative", "memo", "payee", "name", "particulars"),
+    "amount": ("amount", "value", "transaction amount", "amount (ksh)"),
+    "debit": ("debit", "withdrawal", "withdrawals", "paid out", "money out"),
+    "credit": ("credit", "deposit", "deposits", "paid in", "money in"),
+    "category": ("category", "categories"),
+    "type": ("type", "transaction type", "dr/cr"),
+}
+
+TYPE_ALIASES = {
+    "income": "Income", "credit": "Income", "cr": "Income", "deposit": "Income",
+    "expense": "Expense", "debit": "Expense", "dr": "Expense", "withdrawal": "Expense",
+    "payment": "Expense",
+}
+
+_AMOUNT_JUNK = re.compile(r"[^\d.\-+]")
+
+
+class ImportRowError(ValueError):
+    """A record that cannot be turned into a transaction"""
+
+
+@dataclass
+class ImportProgress:
+    """Running counters, passed to the progress callback after every batch"""
+    rows_read: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    recategorized: int = 0
+    bytes_read: int = 0
+    total_bytes: int = 0
+    elapsed: float = 0.0
+    errors: list = field(default_factory=list)
+    error: str = None  # why nothing could be read (e.g. a CSV header without the needed columns)
+
+    @property
+    def rows_per_sec(self):
+        return self.rows_read / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def fraction_done(self):
+        if not self.total_bytes:
+            return 0.0
+        return min(self.bytes_read / self.total_bytes, 1.0)
+
+
+# -----------------------------
+# Field normalization
+# -----------------------------
+def parse_date(value):
+    value = value.strip()
+    if not value:
+        raise ImportRowError("missing date")
+    try:
+        return datetime.date.fromisoformat(value[:10])
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ImportRowError(f"unrecognized date {value!r}")
+
+
+def parse_amount(value):
+    """Parse '1,234.50', 'KSH -12', '(45.00)' style amounts into signed int cents"""
+    text = value.strip()
+    if not text:
+        raise ImportRowError("missing amount")
+    negative = text.startswith("(") and text.endswith(")")
+    cleaned = _AMOUNT_JUNK.sub("", text)
+    try:
+        amount = to_cents(cleaned)
+    except ValueError:
+        raise ImportRowError(f"invalid amount {value!r}") from None
+    return -abs(amount) if negative else amount
+
+
+class CategoryNormalizer:
+    """Maps free-text categories onto the ``categories`` table (case-insensitive)"""
+
+    def __init__(self, conn, fallback="Other"):
+        self.fallback = fallback
+        self.known = {}
+        for row in conn.execute("SELECT name, type FROM categories"):
+            self.known[(row[1], row[0].strip().lower())] = row[0]
+
+    def normalize(self, category, trans_type):
+        """Return (category, recategorized?)"""
+        name = self.known.get((trans_type, (category or "").strip().lower()))
+        if name is not None:
+            return name, False
+        return self.known.get((trans_type, self.fallback.lower()), self.fallback), True
+
+
+# -----------------------------
+# Parsers: each yields (line_number, raw dict) with str values
+# -----------------------------
+def _match_columns(fieldnames):
+    lookup = {name.strip().lower(): name for name in fieldnames or [] if name}
+    columns = {}
+    for field_name, aliases in CSV_COLUMNS.items():
+        for alias in aliases:
+            if alias in lookup:
+                columns[field_name] = lookup[alias]
+                break
+    if "date" not in columns or not ({"amount", "debit", "credit"} & columns.keys()):
+        raise ImportRowError(f"CSV header needs a date and an amount (or debit/credit) column, got {fieldnames}")
+    return columns
+
+
+def iter_csv_records(stream):
+    reader = csv.DictReader(stream)
+    columns = _match_columns(reader.fieldnames)
+    for row in reader:
+        # Debit/credit cells are parsed with the rest of the record (normalize_record)
+        yield reader.line_num, {name: (row.get(column) or "") for name, column in columns.items()}
+
+
+def _iter_sgml_tags(stream, chunk_size=65536):
+    """Yield (TAG, text) pairs from OFX SGML/XML without reading the whole file"""
+    pending = ""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        pending += chunk
+        parts = pending.split("<")
+        pending = parts.pop()  # may be an incomplete tag
+        for part in parts:
+            if part:
+                tag, _, text = part.partition(">")
+                yield tag.strip().upper(), text.strip()
+    if pending:
+        tag, _, text = pending.partition(">")
+        yield tag.strip().upper(), text.strip()
+
+
+def iter_ofx_records(stream):
+    record = None
+    count = 0
+    for tag, text in _iter_sgml_tags(stream):
+        if tag == "STMTTRN":
+            record = {}
+        elif tag == "/STMTTRN" and record is not None:
+            count += 1
+            name, memo = record.pop("NAME", ""), record.pop("MEMO", "")
+            yield count, {
+                "date": record.get("DTPOSTED", "")[:8],
+                "amount": record.get("TRNAMT", ""),
+                "description": name if not memo or memo == name else f"{name} - {memo}".strip(" -"),
+                "fitid": record.get("FITID", ""),
+                "type": "",
+                "category": "",
+            }
+            record = None
+        elif record is not None and not tag.startswith("/"):
+            record[tag] = text
+
+
+def iter_qif_records(stream):
+    record = {}
+    for line_number, line in enumerate(stream, 1):
+        line = line.rstrip("\r\n")
+        if not line or line.startswith("!"):
+            continue
+        code, value = line[0], line[1:].strip()
+        if code == "^":
+            if record:
+                yield line_number, {
+                    "date": record.get("D", "").replace("'", "/"),
+                    "amount": record.get("T", record.get("U", "")),
+                    "description": record.get("P", "") or record.get("M", ""),
+                    "category": record.get("L", "").split(":")[0],
+                    "type": "",
+                }
+            record = {}
+        else:
+            record[code] = value
+
+
+PARSERS = {"csv": iter_csv_records, "ofx": iter_ofx_records, "qif": iter_qif_records}
+
+
+def detect_format(filename):
+    return EXTENSION_FORMATS.get(os.path.splitext(filename or "")[1].lower(), "csv")
+
+
+# -----------------------------
+# Import pipeline
+# -----------------------------
+def normalize_record(record, categories, unsigned_type=SIGNED):
+    """Turn a raw record into (row tuple without hash, recategorized?); the amount is in cents"""
+    date = parse_date(record.get("date", ""))
+    if not record.get("amount", "").strip() and ("credit" in record or "debit" in record):
+        amount = abs(parse_amount(record.get("credit") or "0")) - abs(parse_amount(record.get("debit") or "0"))
+    else:
+        amount = parse_amount(record.get("amount", ""))
+
+    trans_type = TYPE_ALIASES.get(record.get("type", "").strip().lower())
+    if trans_type is None:
+        if unsigned_type == SIGNED:
+            trans_type = "Expense" if amount < 0 else "Income"
+        else:
+            trans_type = unsigned_type
+    amount = abs(amount)
+    if amount == 0:
+        raise ImportRowError("zero amount")
+
+    category, recategorized = categories.normalize(record.get("category", ""), trans_type)
+    description = " ".join(record.get("description", "").split()) or category
+    return (date, category, description, amount, trans_type), recategorized
+
+
+def content_hash(row, occurrence, fitid=""):
+    """Stable identity of an imported row (bank FITID when the format has one)"""
+    date, category, description, amount, trans_type = row
+    if fitid:
+        key = f"fitid|{fitid}"
+    else:
+        key = f"{date.isoformat()}|{trans_type}|{format_cents(amount)}|{description.lower()}|{occurrence}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def _insert_batch(conn, batch):
+    """Insert one batch in a single transaction. Returns the number of new rows"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # rowcount counts rows inserted by the statement itself -- not rollup
+        # trigger writes, and not rows skipped as duplicates
+        cursor = conn.executemany('''
+            INSERT OR IGNORE INTO transactions (date, category, description, amount_cents, type, import_hash)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', batch)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return cursor.rowcount
+
+
+def import_stream(conn, stream, fmt="csv", batch_size=DEFAULT_BATCH_SIZE, unsigned_type=SIGNED,
+                  progress=None, total_bytes=0, byte_counter=None):
+    """Import transactions from a text stream. Returns the final ImportProgress"""
+    if fmt not in PARSERS:
+        raise ValueError(f"unsupported format {fmt!r}; expected one of {FORMATS}")
+
+    categories = CategoryNormalizer(conn)
+    report = ImportProgress(total_bytes=total_bytes)
+    start = time.perf_counter()
+    batch = []
+    seen_today, current_date = {}, None
+
+    def flush():
+        if batch:
+            inserted = _insert_batch(conn, batch)
+            report.inserted += inserted
+            report.duplicates += len(batch) - inserted
+            batch.clear()
+        report.elapsed = time.perf_counter() - start
+        if byte_counter is not None:
+            report.bytes_read = byte_counter()
+        if progress is not None:
+            progress(report)
+
+    try:
+        for line_number, record in PARSERS[fmt](stream):
+            report.rows_read += 1
+            try:
+                row, recategorized = normalize_record(record, categories, unsigned_type)
+            except ImportRowError as exc:
+                report.invalid += 1
+                if len(report.errors) < MAX_REPORTED_ERRORS:
+                    report.errors.append(f"record {line_number}: {exc}")
+                continue
+            report.recategorized += recategorized
+
+            # Occurrence number of identical rows, counted per date
+            if row[0] != current_date:
+                seen_today, current_date = {}, row[0]
+            identity = (row[1], row[2], row[3], row[4])
+            occurrence = seen_today.get(identity, 0)
+            seen_today[identity] = occurrence + 1
+
+            batch.append(row + (content_hash(row, occurrence, record.get("fitid", "")),))
+            if len(batch) >= batch_size:
+                flush()
+    except ImportRowError as exc:
+        # Records are checked one by one above; what reaches here is about the
+        # whole file (a CSV header without a date or amount column)
+        report.error = str(exc)
+
+    flush()
+    return report
+
+
+def import_file(conn, binary_file, filename=None, fmt=None, encoding="utf-8-sig", **kwargs):
+    """Import from a binary file object (an open file or a Streamlit UploadedFile)"""
+    fmt = fmt or detect_format(filename or getattr(binary_file, "name", ""))
+    try:
+        total_bytes = os.fstat(binary_file.fileno()).st_size
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        total_bytes = getattr(binary_file, "size", 0) or 0
+
+    text = io.TextIOWrapper(binary_file, encoding=encoding, errors="replace", newline="")
+    try:
+        return import_stream(conn, text, fmt=fmt, total_bytes=total_bytes,
+                             byte_counter=binary_file.tell, **kwargs)
+    finally:
+        # Don't let the wrapper close the caller's file
+        text.detach()
+
+
+def main():
+    from db_pool import get_pool
+    from migrations import run_migrations
+
+    parser = argparse.ArgumentParser(description="Import a bank statement into the expense tracker database")
+    parser.add_argument("path")
+    parser.add_argument("--db", default="expenses.db")
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--unsigned-type", choices=[SIGNED, "Expense", "Income"], default=SIGNED,
+                        help="type for rows without a type column (default: by sign)")
+    args = parser.parse_args()
+
+    def show(report):
+        print(f"\r{report.rows_read:,} rows  {report.inserted:,} new  {report.duplicates:,} duplicate  "
+              f"{report.invalid:,} invalid  {report.rows_per_sec:,.0f} rows/s  {report.fraction_done:.0%}",
+              end="", flush=True)
+
+    with get_pool(args.db).connection() as conn:
+        run_migrations(conn)
+        with open(args.path, "rb") as binary_file:
+            report = import_file(conn, binary_file, fmt=args.format, batch_size=args.batch_size,
+                                 unsigned_type=args.unsigned_type, progress=show)
+    print()
+    if report.error:
+        print(f"  {report.error}")
+    for error in report.errors:
+        print(f"  {error}")
+
+
+if __name__ == "__main__":
+    main()
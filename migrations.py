@@ -0,0 +1,464 @@
+"""Versioned schema migrations for the expense tracker database.
+
+The schema version is kept in SQLite's ``PRAGMA user_version``. Each entry in
+``MIGRATIONS`` upgrades the database by exactly one version and runs inside
+its own transaction, so an existing ``expenses.db`` is upgraded in place the
+next time the app starts, and a failed step leaves the file at the previous
+version.
+"""
+import sqlite3
+
+from money import to_cents
+
+
+def _register_to_cents(conn):
+    """Make money.to_cents available to SQL, so migrated amounts are rounded like every other write"""
+    # SQL round(amount * 100) would round the binary product: 1.005 * 100 is
+    # 100.4999..., so 1.005 became 100 cents where to_cents gives 101
+    conn.create_function("to_cents", 1, to_cents, deterministic=True)
+
+
+def _create_base_schema(conn):
+    """Version 1: the original tables (no-op for databases created before migrations)"""
+    # Create transactions table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date DATE NOT NULL,
+            category TEXT NOT NULL,
+            description TEXT NOT NULL,
+            amount REAL NOT NULL,
+            type TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Create categories table for user customization
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            type TEXT NOT NULL,
+            color TEXT,
+            icon TEXT
+        )
+    ''')
+
+    # Create budgets table for future extension
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS budgets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category TEXT NOT NULL,
+            monthly_limit REAL NOT NULL,
+            year_month TEXT NOT NULL,
+            UNIQUE(category, year_month)
+        )
+    ''')
+
+    # Create user settings table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS settings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            key TEXT NOT NULL UNIQUE,
+            value TEXT NOT NULL
+        )
+    ''')
+
+
+def _add_summary_indexes(conn):
+    """Version 2: year_month column and covering indexes for the summary queries"""
+    # Dates are stored as ISO text, so the month is simply the first 7 characters.
+    # A generated column can be added to an existing table with ALTER TABLE and
+    # its values are stored in the index below, so grouping by month no longer
+    # has to evaluate strftime() for every row.
+    conn.execute('''
+        ALTER TABLE transactions
+        ADD COLUMN year_month TEXT GENERATED ALWAYS AS (substr(date, 1, 7)) VIRTUAL
+    ''')
+
+    # get_summary: WHERE type = ? -> SUM(amount)
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_type_date
+        ON transactions (type, date, amount)
+    ''')
+    # get_category_summary: GROUP BY category, type
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_category_type
+        ON transactions (category, type, amount)
+    ''')
+    # get_monthly_summary: GROUP BY year_month, type
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_month_type
+        ON transactions (year_month, type, amount)
+    ''')
+    # get_all_transactions: ORDER BY date DESC, created_at DESC
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_date_created
+        ON transactions (date, created_at)
+    ''')
+
+
+def _add_history_keyset_index(conn):
+    """Version 3: (date, id) index for keyset pagination of the history view"""
+    # id grows with created_at, so (date, id) gives the same newest-first order
+    # and is unique, which a keyset cursor needs. It replaces (date, created_at).
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_date_id
+        ON transactions (date, id)
+    ''')
+    conn.execute("DROP INDEX IF EXISTS idx_transactions_date_created")
+
+
+def _add_transaction_rollup(conn):
+    """Version 4: per (month, category, type) totals kept in sync by triggers"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS transaction_rollup (
+            year_month TEXT NOT NULL,
+            category TEXT NOT NULL,
+            type TEXT NOT NULL,
+            total_amount REAL NOT NULL DEFAULT 0,
+            transaction_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (year_month, category, type)
+        ) WITHOUT ROWID
+    ''')
+
+    # Triggers (rather than application code) so that every writer -- the
+    # sidebar form, sample data, bulk imports, "Clear All Data" -- keeps the
+    # rollup in sync, inside the same transaction as the change itself.
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_insert
+        AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO transaction_rollup (year_month, category, type, total_amount, transaction_count)
+            VALUES (substr(NEW.date, 1, 7), NEW.category, NEW.type, NEW.amount, 1)
+            ON CONFLICT (year_month, category, type) DO UPDATE SET
+                total_amount = total_amount + excluded.total_amount,
+                transaction_count = transaction_count + 1;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_delete
+        AFTER DELETE ON transactions
+        BEGIN
+            UPDATE transaction_rollup
+            SET total_amount = total_amount - OLD.amount,
+                transaction_count = transaction_count - 1
+            WHERE year_month = substr(OLD.date, 1, 7) AND category = OLD.category AND type = OLD.type;
+
+            DELETE FROM transaction_rollup
+            WHERE year_month = substr(OLD.date, 1, 7) AND category = OLD.category AND type = OLD.type
+              AND transaction_count <= 0;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_update
+        AFTER UPDATE OF date, category, amount, type ON transactions
+        BEGIN
+            UPDATE transaction_rollup
+            SET total_amount = total_amount - OLD.amount,
+                transaction_count = transaction_count - 1
+            WHERE year_month = substr(OLD.date, 1, 7) AND category = OLD.category AND type = OLD.type;
+
+            DELETE FROM transaction_rollup
+            WHERE year_month = substr(OLD.date, 1, 7) AND category = OLD.category AND type = OLD.type
+              AND transaction_count <= 0;
+
+            INSERT INTO transaction_rollup (year_month, category, type, total_amount, transaction_count)
+            VALUES (substr(NEW.date, 1, 7), NEW.category, NEW.type, NEW.amount, 1)
+            ON CONFLICT (year_month, category, type) DO UPDATE SET
+                total_amount = total_amount + excluded.total_amount,
+                transaction_count = transaction_count + 1;
+        END
+    ''')
+
+    # Backfill from the existing rows
+    conn.execute('''
+        INSERT INTO transaction_rollup (year_month, category, type, total_amount, transaction_count)
+        SELECT substr(date, 1, 7), category, type, SUM(amount), COUNT(*)
+        FROM transactions
+        GROUP BY substr(date, 1, 7), category, type
+    ''')
+
+
+def _add_import_hash(conn):
+    """Version 5: content hash of imported rows, used to skip re-imported statements"""
+    # NULL for rows entered by hand; UNIQUE ignores NULLs so those never collide
+    conn.execute("ALTER TABLE transactions ADD COLUMN import_hash TEXT")
+    conn.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_import_hash
+        ON transactions (import_hash)
+    ''')
+
+
+def _create_rollup_triggers(conn):
+    """Triggers keeping transaction_rollup in sync (cents, schema version 6)"""
+    conn.execute('''
+        CREATE TRIGGER trg_transactions_rollup_insert
+        AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO transaction_rollup (year_month, category, type, total_cents, transaction_count)
+            VALUES (substr(NEW.date, 1, 7), NEW.category, NEW.type, NEW.amount_cents, 1)
+            ON CONFLICT (year_month, category, type) DO UPDATE SET
+                total_cents = total_cents + excluded.total_cents,
+                transaction_count = transaction_count + 1;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER trg_transactions_rollup_delete
+        AFTER DELETE ON transactions
+        BEGIN
+            UPDATE transaction_rollup
+            SET total_cents = total_cents - OLD.amount_cents,
+                transaction_count = transaction_count - 1
+            WHERE year_month = substr(OLD.date, 1, 7) AND category = OLD.category AND type = OLD.type;
+
+            DELETE FROM transaction_rollup
+            WHERE year_month = substr(OLD.date, 1, 7) AND category = OLD.category AND type = OLD.type
+              AND transaction_count <= 0;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER trg_transactions_rollup_update
+        AFTER UPDATE OF date, category, amount_cents, type ON transactions
+        BEGIN
+            UPDATE transaction_rollup
+            SET total_cents = total_cents - OLD.amount_cents,
+                transaction_count = transaction_count - 1
+            WHERE year_month = substr(OLD.date, 1, 7) AND category = OLD.category AND type = OLD.type;
+
+            DELETE FROM transaction_rollup
+            WHERE year_month = substr(OLD.date, 1, 7) AND category = OLD.category AND type = OLD.type
+              AND transaction_count <= 0;
+
+            INSERT INTO transaction_rollup (year_month, category, type, total_cents, transaction_count)
+            VALUES (substr(NEW.date, 1, 7), NEW.category, NEW.type, NEW.amount_cents, 1)
+            ON CONFLICT (year_month, category, type) DO UPDATE SET
+                total_cents = total_cents + excluded.total_cents,
+                transaction_count = transaction_count + 1;
+        END
+    ''')
+
+
+def _store_amounts_as_cents(conn):
+    """Version 6: amounts as INTEGER cents; ``amount`` becomes a generated column"""
+    # SQLite cannot change a column's type in place, so the table is rebuilt.
+    # ``amount`` stays readable (amount_cents / 100.0) so SELECTs, exports and
+    # the history view keep working; every writer sets amount_cents.
+    conn.execute('''
+        CREATE TABLE transactions_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date DATE NOT NULL,
+            category TEXT NOT NULL,
+            description TEXT NOT NULL,
+            amount_cents INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            import_hash TEXT,
+            year_month TEXT GENERATED ALWAYS AS (substr(date, 1, 7)) VIRTUAL,
+            amount REAL GENERATED ALWAYS AS (amount_cents / 100.0) VIRTUAL
+        )
+    ''')
+    _register_to_cents(conn)
+    conn.execute('''
+        INSERT INTO transactions_new (id, date, category, description, amount_cents, type, created_at, import_hash)
+        SELECT id, date, category, description, to_cents(amount), type, created_at, import_hash
+        FROM transactions
+    ''')
+    # Dropping the table also drops its indexes and rollup triggers
+    conn.execute("DROP TABLE transactions")
+    conn.execute("ALTER TABLE transactions_new RENAME TO transactions")
+
+    conn.execute("CREATE INDEX idx_transactions_type_date ON transactions (type, date, amount_cents)")
+    conn.execute("CREATE INDEX idx_transactions_category_type ON transactions (category, type, amount_cents)")
+    conn.execute("CREATE INDEX idx_transactions_month_type ON transactions (year_month, type, amount_cents)")
+    conn.execute("CREATE INDEX idx_transactions_date_id ON transactions (date, id)")
+    conn.execute("CREATE UNIQUE INDEX idx_transactions_import_hash ON transactions (import_hash)")
+
+    # Rollup totals in cents as well
+    conn.execute("DROP TABLE transaction_rollup")
+    conn.execute('''
+        CREATE TABLE transaction_rollup (
+            year_month TEXT NOT NULL,
+            category TEXT NOT NULL,
+            type TEXT NOT NULL,
+            total_cents INTEGER NOT NULL DEFAULT 0,
+            transaction_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (year_month, category, type)
+        ) WITHOUT ROWID
+    ''')
+    _create_rollup_triggers(conn)
+    conn.execute('''
+        INSERT INTO transaction_rollup (year_month, category, type, total_cents, transaction_count)
+        SELECT year_month, category, type, SUM(amount_cents), COUNT(*)
+        FROM transactions
+        GROUP BY year_month, category, type
+    ''')
+
+
+def _add_date_covering_index(conn):
+    """Version 7: covering index for date-filtered aggregates (see filters.py)"""
+    # A date range that does not cover whole months cannot use the rollup.
+    # With (date, type, category, amount_cents) the range is one index scan
+    # and no table rows are read.
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_date_cover
+        ON transactions (date, type, category, amount_cents)
+    ''')
+
+
+def _add_description_search(conn):
+    """Version 8: FTS5 index over description and category (see search.py)"""
+    # External content: the index stores only the tokens, the text stays in
+    # ``transactions``. Prefix indexes make "as you type" queries of up to 6
+    # letters a single lookup; a longer prefix merges the lists of every word
+    # it matches.
+    try:
+        conn.execute('''
+            CREATE VIRTUAL TABLE transactions_fts USING fts5(
+                description, category,
+                content='transactions', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='2 3 4 5 6'
+            )
+        ''')
+    except sqlite3.OperationalError as exc:
+        if "fts5" not in str(exc):
+            raise
+        return  # SQLite built without FTS5: search.py falls back to LIKE
+    # bm25 with a description match worth twice a category match
+    conn.execute("INSERT INTO transactions_fts (transactions_fts, rank) VALUES ('rank', 'bm25(2.0, 1.0)')")
+
+    conn.execute('''
+        CREATE TRIGGER trg_transactions_fts_insert
+        AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (rowid, description, category)
+            VALUES (new.id, new.description, new.category);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER trg_transactions_fts_delete
+        AFTER DELETE ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (transactions_fts, rowid, description, category)
+            VALUES ('delete', old.id, old.description, old.category);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER trg_transactions_fts_update
+        AFTER UPDATE OF description, category ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (transactions_fts, rowid, description, category)
+            VALUES ('delete', old.id, old.description, old.category);
+            INSERT INTO transactions_fts (rowid, description, category)
+            VALUES (new.id, new.description, new.category);
+        END
+    ''')
+    conn.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+
+
+def _store_budgets_as_cents(conn):
+    """Version 9: budget limits as INTEGER cents, like transaction amounts (see budgets.py)"""
+    conn.execute('''
+        CREATE TABLE budgets_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category TEXT NOT NULL,
+            limit_cents INTEGER NOT NULL,
+            year_month TEXT NOT NULL,
+            monthly_limit REAL GENERATED ALWAYS AS (limit_cents / 100.0) VIRTUAL,
+            UNIQUE(category, year_month)
+        )
+    ''')
+    _register_to_cents(conn)
+    conn.execute('''
+        INSERT INTO budgets_new (id, category, limit_cents, year_month)
+        SELECT id, category, to_cents(monthly_limit), year_month
+        FROM budgets
+    ''')
+    conn.execute("DROP TABLE budgets")
+    conn.execute("ALTER TABLE budgets_new RENAME TO budgets")
+
+
+def _add_ledger_edit_counter(conn):
+    """Version 10: count of edited and deleted transactions (see cashflow.py)"""
+    # Inserts only ever add rows with a higher id (AUTOINCREMENT), so anything
+    # derived from the rows up to an id can be extended with the rows after
+    # it, unless a row it already includes changed. This one-row counter
+    # tells readers whether that happened since they last looked.
+    conn.execute('''
+        CREATE TABLE ledger_edits (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            edits INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute("INSERT INTO ledger_edits (id, edits) VALUES (1, 0)")
+    conn.execute('''
+        CREATE TRIGGER trg_transactions_edits_delete
+        AFTER DELETE ON transactions
+        BEGIN
+            UPDATE ledger_edits SET edits = edits + 1 WHERE id = 1;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER trg_transactions_edits_update
+        AFTER UPDATE OF date, amount_cents, type ON transactions
+        BEGIN
+            UPDATE ledger_edits SET edits = edits + 1 WHERE id = 1;
+        END
+    ''')
+
+
+# (version, description, function) -- append only, never edit a released step
+MIGRATIONS = [
+    (1, "base schema", _create_base_schema),
+    (2, "summary indexes and year_month column", _add_summary_indexes),
+    (3, "history keyset index", _add_history_keyset_index),
+    (4, "transaction rollup table", _add_transaction_rollup),
+    (5, "import dedupe hash", _add_import_hash),
+    (6, "amounts stored as integer cents", _store_amounts_as_cents),
+    (7, "covering index for date-range filters", _add_date_covering_index),
+    (8, "full-text search on descriptions", _add_description_search),
+    (9, "budget limits stored as integer cents", _store_budgets_as_cents),
+    (10, "ledger edit counter", _add_ledger_edit_counter),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    """Return the schema version stored in the database file"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def run_migrations(conn, target=None):
+    """Upgrade the database to ``target`` (default: latest). Returns the versions applied"""
+    target = LATEST_VERSION if target is None else target
+    applied = []
+
+    # Fast path for every rerun after the first: nothing to do, no write lock
+    if get_schema_version(conn) >= target:
+        return applied
+
+    for version, description, migrate in MIGRATIONS:
+        if version > target:
+            break
+
+        # BEGIN IMMEDIATE takes the write lock, so two sessions starting at the
+        # same time cannot both apply the same step.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if get_schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            migrate(conn)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+
+    if applied:
+        # Refresh the planner statistics for the new indexes
+        conn.execute("PRAGMA optimize")
+    return applied
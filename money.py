@@ -0,0 +1,76 @@
+"""Money as integer minor units (cents).
+
+Amounts are stored and summed as whole cents, so totals are exact however
+many rows are added together. A float such as 0.1 cannot be represented
+exactly and SUM over millions of REAL values drifts. Conversion to and
+from user-facing values goes through Decimal and rounds half up (12.345 ->
+1235 cents), the way amounts are usually rounded on receipts.
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+
+MINOR_UNITS = 100
+_CENT = Decimal("0.01")
+
+# to_cents_array(): fractional cents within this of .5 count as a possible
+# tie, and amounts from _FAST_LIMIT up are converted one by one (below it the
+# float error of x * 100 is under 1e-6 cents)
+_TIE_TOLERANCE = 1e-6
+_FAST_LIMIT = 1e9
+
+
+def to_decimal(value):
+    """int / float / str / Decimal -> Decimal rounded to the cent"""
+    if isinstance(value, float):
+        # repr() gives the shortest string that round-trips, so 0.1 -> "0.1"
+        # (float() first: NumPy 2 floats repr as "np.float64(0.1)")
+        value = repr(float(value))
+    try:
+        return Decimal(value).quantize(_CENT, rounding=ROUND_HALF_UP)
+    except (InvalidOperation, TypeError):
+        raise ValueError(f"invalid amount {value!r}") from None
+
+
+def to_cents(value):
+    """Amount in major units -> int cents"""
+    return int(to_decimal(value) * MINOR_UNITS)
+
+
+def from_cents(cents):
+    """int cents -> float in major units (for display, charts and JSON)"""
+    return int(cents) / MINOR_UNITS
+
+
+def cents_to_decimal(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def format_cents(cents):
+    """int cents -> '1234.50' (exact, no float formatting)"""
+    return str(cents_to_decimal(cents))
+
+
+def to_cents_array(values):
+    """Vectorized float amounts -> int64 cents, rounded exactly like to_cents().
+
+    to_cents() rounds the shortest decimal form of each float half up
+    (1.005 -> 101, 0.125 -> 13). ``x * 100`` in binary can land just below
+    the tie (1.005 * 100 == 100.49999999999999), so np.rint() alone would
+    round those down, and ties it does see go to even. Values whose
+    fractional cents are nowhere near .5 round the same either way, so
+    only near-ties (and amounts too large for float cents to be reliable)
+    go through to_cents() one by one.
+    """
+    # Imported here: the JSON apps and the CLI only need the scalar helpers
+    import numpy as np
+
+    amounts = np.asarray(values, dtype=np.float64)
+    scaled = amounts * MINOR_UNITS
+    cents = np.rint(scaled)
+    exact = (np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) > _TIE_TOLERANCE) & (np.abs(amounts) < _FAST_LIMIT)
+    result = np.empty(amounts.shape, dtype=np.int64)
+    result[exact] = cents[exact]
+    slow = np.flatnonzero(~exact)
+    if slow.size:
+        result[slow] = [to_cents(value) for value in amounts[slow]]
+    return result
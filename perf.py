@@ -0,0 +1,353 @@
+"""Per-rerun instrumentation: timing spans, SQL statement counts, optional profilers.
+
+Each Streamlit rerun of a page runs inside ``rerun()``, which makes a
+RerunProfile the current profile of that thread (Streamlit runs every
+session's script on its own thread). While it is active:
+  * ``section(name)`` starts a top-level span that lasts until the next
+    section (the page's render phases: sidebar, charts, history, ...);
+  * ``span(name)`` / ``@timed`` time a block or a function (DB calls)
+    inside the current section; spans nest;
+  * ``trace_statement`` (installed as the SQLite trace callback of every
+    pooled connection, see db_pool.py) counts each statement against the
+    open spans. Statements run by other threads (the write queue) are not
+    counted. SQLite reports each trigger program of a write as another run
+    of the writing statement; its internal statements ("-- ...") are skipped;
+  * optionally, cProfile profiles the rerun's thread, and tracemalloc
+    records the peak memory and the top allocation sites (tracemalloc is
+    process-wide, so other sessions' allocations during the rerun count too).
+    Concurrent reruns share one tracemalloc session: it is stopped when the
+    last of them finishes, and only if a rerun started it.
+
+With no active profile, span() and trace_statement() return at once, so
+instrumented code costs next to nothing outside a rerun.
+
+Finished reruns are kept in a small in-memory history (``recent()``) for
+the Performance panel and are written as one JSON object per line to the
+``expenses.perf`` logger. ``enable_log(path)`` attaches a rotating file
+handler to it.
+"""
+import contextlib
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+
+
+LOG_ENV = "EXPENSES_PERF_LOG"
+DEFAULT_LOG_FILE = "perf_log.jsonl"
+HISTORY_SIZE = 100
+TOP_STATEMENTS = 10
+TOP_FUNCTIONS = 25
+TOP_ALLOCATIONS = 10
+
+logger = logging.getLogger("expenses.perf")
+
+_local = threading.local()
+_history = deque(maxlen=HISTORY_SIZE)
+_history_lock = threading.Lock()
+_log_lock = threading.Lock()
+_log_handler = None
+
+# Reruns currently using tracemalloc, and whether one of them started it
+_memory_lock = threading.Lock()
+_memory_users = 0
+_memory_started = False
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class Span:
+    """One timed block. ``start_ms`` is relative to the start of the rerun"""
+    __slots__ = ("name", "depth", "start_ms", "ms", "queries")
+
+    def __init__(self, name, depth, start_ms):
+        self.name = name
+        self.depth = depth
+        self.start_ms = start_ms
+        self.ms = None
+        self.queries = 0
+
+    def as_dict(self):
+        return {"name": self.name, "depth": self.depth, "start_ms": round(self.start_ms, 3),
+                "ms": round(self.ms, 3) if self.ms is not None else None, "queries": self.queries}
+
+
+class RerunProfile:
+    """Spans, statement counts and profiler output of one rerun"""
+
+    def __init__(self, script, session=None, cprofile=False, memory=False):
+        self.script = script
+        self.session = session
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.spans = []
+        self._stack = []
+        self._section = None
+        self.queries = 0
+        self.statements = Counter()
+        self.interrupted = False
+        self.total_ms = None
+        self.functions = None    # cProfile: top functions by cumulative time
+        self.memory = None       # tracemalloc: peak and top allocation sites
+        self._profiler = None
+        self._memory_before = None
+        if cprofile:
+            self._start_cprofile()
+        if memory:
+            self._start_tracemalloc()
+
+    def _elapsed_ms(self):
+        return (time.perf_counter() - self._t0) * 1000
+
+    # -----------------------------
+    # Spans
+    # -----------------------------
+    def open(self, name):
+        span = Span(name, len(self._stack), self._elapsed_ms())
+        self.spans.append(span)
+        self._stack.append(span)
+        return span
+
+    def close(self, span):
+        """End ``span`` and any span still open inside it (no-op if it already ended)"""
+        if span not in self._stack:
+            return
+        now = self._elapsed_ms()
+        while True:
+            top = self._stack.pop()
+            top.ms = now - top.start_ms
+            if top is span:
+                break
+
+    def section(self, name):
+        """End the current section (and anything open in it) and start a new one"""
+        if self._section is not None and self._section.ms is None:
+            self.close(self._section)
+        self._section = self.open(name)
+
+    def record_statement(self, sql):
+        self.queries += 1
+        for span in self._stack:
+            span.queries += 1
+        self.statements[_WHITESPACE.sub(" ", sql).strip()[:160]] += 1
+
+    # -----------------------------
+    # Profilers
+    # -----------------------------
+    def _start_cprofile(self):
+        import cProfile
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active (e.g. a concurrent rerun on 3.12+)
+            return
+        self._profiler = profiler
+
+    def _stop_cprofile(self):
+        import pstats
+
+        self._profiler.disable()
+        stats = pstats.Stats(self._profiler).stats
+        top = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+        self.functions = [{
+            "function": f"{os.path.basename(filename)}:{line}({name})",
+            "calls": calls,
+            "own_ms": round(own * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3),
+        } for (filename, line, name), (_, calls, own, cumulative, _) in top]
+        self._profiler = None
+
+    def _start_tracemalloc(self):
+        global _memory_users, _memory_started
+        import tracemalloc
+
+        with _memory_lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _memory_started = True
+            _memory_users += 1
+            tracemalloc.reset_peak()
+        self._memory_before = tracemalloc.take_snapshot()
+
+    def _stop_tracemalloc(self):
+        global _memory_users, _memory_started
+        import tracemalloc
+
+        try:
+            # Something outside perf.py may have stopped it: no memory figures then
+            if tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                after = tracemalloc.take_snapshot()
+                growth = after.compare_to(self._memory_before, "lineno")[:TOP_ALLOCATIONS]
+                self.memory = {
+                    "current_kb": round(current / 1024, 1),
+                    "peak_kb": round(peak / 1024, 1),
+                    "top": [{"where": str(diff.traceback[0]), "size_kb": round(diff.size_diff / 1024, 1),
+                             "count": diff.count_diff} for diff in growth],
+                }
+        finally:
+            self._memory_before = None
+            with _memory_lock:
+                _memory_users -= 1
+                if _memory_users == 0 and _memory_started:
+                    if tracemalloc.is_tracing():
+                        tracemalloc.stop()
+                    _memory_started = False
+
+    # -----------------------------
+    # Result
+    # -----------------------------
+    def finish(self, interrupted=False):
+        while self._stack:
+            self.close(self._stack[-1])
+        self.total_ms = self._elapsed_ms()
+        self.interrupted = interrupted
+        if self._profiler is not None:
+            self._stop_cprofile()
+        if self._memory_before is not None:
+            self._stop_tracemalloc()
+
+    def as_dict(self):
+        return {
+            "event": "rerun",
+            "script": self.script,
+            "session": self.session,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+            "total_ms": round(self.total_ms if self.total_ms is not None else self._elapsed_ms(), 3),
+            "interrupted": self.interrupted,
+            "queries": self.queries,
+            "spans": [span.as_dict() for span in self.spans],
+            "statements": [{"sql": sql, "count": count}
+                           for sql, count in self.statements.most_common(TOP_STATEMENTS)],
+            "functions": self.functions,
+            "memory": self.memory,
+        }
+
+
+# -----------------------------
+# Current thread's profile
+# -----------------------------
+def current():
+    """The active RerunProfile of this thread, or None"""
+    return getattr(_local, "profile", None)
+
+
+@contextlib.contextmanager
+def rerun(script, session=None, cprofile=False, memory=False):
+    """Profile one rerun of ``script``; logs and keeps the result when the block ends.
+
+    A rerun cut short (st.rerun(), st.stop(), an error) is still recorded,
+    marked ``interrupted``.
+    """
+    profile = RerunProfile(script, session, cprofile, memory)
+    _local.profile = profile
+    interrupted = True
+    try:
+        yield profile
+        interrupted = False
+    finally:
+        _local.profile = None
+        profile.finish(interrupted)
+        _record(profile.as_dict())
+
+
+def section(name):
+    """Start a top-level render section of the current rerun"""
+    profile = current()
+    if profile is not None:
+        profile.section(name)
+
+
+@contextlib.contextmanager
+def span(name):
+    """Time a block inside the current rerun (no-op outside one)"""
+    profile = current()
+    if profile is None:
+        yield
+        return
+    opened = profile.open(name)
+    try:
+        yield
+    finally:
+        profile.close(opened)
+
+
+def timed(func=None, name=None):
+    """Decorator: run the function in a span named after it"""
+    if func is None:
+        return functools.partial(timed, name=name)
+    span_name = name or func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if current() is None:
+            return func(*args, **kwargs)
+        with span(span_name):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def trace_statement(sql):
+    """SQLite trace callback: count a statement against this thread's rerun"""
+    profile = getattr(_local, "profile", None)
+    if profile is not None and not sql.startswith("--"):
+        profile.record_statement(sql)
+
+
+# -----------------------------
+# History and log
+# -----------------------------
+def _record(result):
+    with _history_lock:
+        _history.append(result)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps(result, default=str))
+
+
+def recent(session=None, limit=HISTORY_SIZE):
+    """Finished reruns, oldest first (only ``session``'s if given)"""
+    with _history_lock:
+        results = list(_history)
+    if session is not None:
+        results = [result for result in results if result["session"] == session]
+    return results[-limit:]
+
+
+def log_path():
+    """File the reruns are logged to, or None"""
+    return _log_handler.baseFilename if _log_handler is not None else None
+
+
+def enable_log(path=None, max_bytes=10 * 1024 * 1024, backup_count=3):
+    """Write every finished rerun as a JSON line to ``path`` (default: $EXPENSES_PERF_LOG or perf_log.jsonl).
+
+    An empty path disables the file log. Safe to call on every rerun: the
+    handler is added once per process.
+    """
+    global _log_handler
+    if path is None:
+        path = os.environ.get(LOG_ENV, DEFAULT_LOG_FILE)
+    if not path:
+        return None
+    path = os.path.abspath(path)
+    with _log_lock:
+        if _log_handler is not None and _log_handler.baseFilename == path:
+            return path
+        if _log_handler is not None:
+            logger.removeHandler(_log_handler)
+            _log_handler.close()
+        _log_handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                                            encoding="utf-8")
+        _log_handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(_log_handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return path
@@ -0,0 +1,118 @@
+"""In-process query cache keyed by a data-version counter.
+
+Every function that writes to the database calls bump_data_version(). Cached
+reads include the current version in their key, so a write makes every
+older entry unreachable at once (they age out of the LRU). No per-query
+invalidation rules are needed, and unchanged data is never queried twice.
+
+Cached values are shared between reruns and sessions. Callers must treat
+returned DataFrames and figures as read-only (``.copy()`` before mutating).
+"""
+import functools
+import threading
+from collections import OrderedDict
+
+
+DEFAULT_MAXSIZE = 64
+
+_version_lock = threading.Lock()
+_data_version = 0
+
+
+def data_version():
+    """Return the current data version"""
+    return _data_version
+
+
+def bump_data_version():
+    """Mark all cached reads as stale. Call after every committed write"""
+    global _data_version
+    with _version_lock:
+        _data_version += 1
+        return _data_version
+
+
+class QueryCache:
+    """Thread-safe LRU cache with hit/miss counters"""
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "uncacheable": 0}
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, computing and storing it on a miss"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return self._entries[key]
+            self._stats["misses"] += 1
+
+        # Compute outside the lock so one slow query doesn't block other sessions
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+        return value
+
+    def record_uncacheable(self):
+        with self._lock:
+            self._stats["uncacheable"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return a snapshot of the cache counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        stats["maxsize"] = self.maxsize
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["data_version"] = _data_version
+        return stats
+
+
+_default_cache = QueryCache()
+
+
+def cached(func=None, cache=None):
+    """Decorator: memoize a read function on (name, arguments, data version).
+
+    Calls with unhashable arguments (e.g. a DataFrame) skip the cache.
+    """
+    if func is None:
+        return functools.partial(cached, cache=cache)
+
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        target = cache or _default_cache
+        key = (name, args, tuple(sorted(kwargs.items())), _data_version)
+        try:
+            hash(key)
+        except TypeError:
+            target.record_uncacheable()
+            return func(*args, **kwargs)
+        return target.get_or_compute(key, lambda: func(*args, **kwargs))
+
+    return wrapper
+
+
+def cache_stats():
+    """Return the counters of the shared cache"""
+    return _default_cache.stats()
+
+
+def clear_cache():
+    """Drop every entry of the shared cache"""
+    _default_cache.clear()
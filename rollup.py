@@ -0,0 +1,61 @@
+"""Consistency checks for the ``transaction_rollup`` table.
+
+The rollup holds SUM(amount_cents) and COUNT(*) per (year_month, category,
+type) and is maintained by triggers on ``transactions`` (see migrations.py,
+versions 4 and 6). Charts and metrics read it instead of aggregating every
+transaction. check_rollup() compares it with a fresh aggregate and
+rebuild_rollup() recomputes it from scratch.
+"""
+
+
+FRESH_AGGREGATE = '''
+    SELECT substr(date, 1, 7) as year_month, category, type,
+           SUM(amount_cents) as total_cents, COUNT(*) as transaction_count
+    FROM transactions
+    GROUP BY substr(date, 1, 7), category, type
+'''
+
+
+def check_rollup(conn):
+    """Compare the rollup with the transactions table. Returns a list of mismatches"""
+    query = f'''
+        WITH fresh AS ({FRESH_AGGREGATE})
+        SELECT f.year_month, f.category, f.type,
+               f.total_cents as expected_cents, f.transaction_count as expected_count,
+               r.total_cents as actual_cents, r.transaction_count as actual_count
+        FROM fresh f
+        LEFT JOIN transaction_rollup r
+          ON r.year_month = f.year_month AND r.category = f.category AND r.type = f.type
+        UNION ALL
+        SELECT r.year_month, r.category, r.type,
+               NULL, NULL,
+               r.total_cents, r.transaction_count
+        FROM transaction_rollup r
+        WHERE NOT EXISTS (
+            SELECT 1 FROM fresh f
+            WHERE f.year_month = r.year_month AND f.category = r.category AND f.type = r.type
+        )
+    '''
+    mismatches = []
+    for row in conn.execute(query):
+        # Integer cents: totals must match exactly
+        if (row['expected_count'] or 0) != (row['actual_count'] or 0) \
+                or (row['expected_cents'] or 0) != (row['actual_cents'] or 0):
+            mismatches.append(dict(row))
+    return mismatches
+
+
+def rebuild_rollup(conn):
+    """Recompute the rollup from the transactions table. Returns the number of rollup rows"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM transaction_rollup")
+        conn.execute(f'''
+            INSERT INTO transaction_rollup (year_month, category, type, total_cents, transaction_count)
+            {FRESH_AGGREGATE}
+        ''')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return conn.execute("SELECT COUNT(*) FROM transaction_rollup").fetchone()[0]
@@ -0,0 +1,99 @@
+"""Full-text search over transaction descriptions and categories.
+
+``transactions_fts`` (migration 8) is an FTS5 index over ``description``
+and ``category``, kept in sync by triggers. A search is one index lookup per
+word, however many transactions there are, instead of a LIKE '%...%' scan
+of every row:
+  * every word the user typed must match as a word prefix, so "gro nai"
+    finds "Groceries at Naivas" while it is being typed;
+  * results are ranked by bm25, a description hit counting twice as much
+    as a category hit, and then newest first. Only the RANK_WINDOW most
+    recently added matches are ranked, which keeps a search for a very
+    common word as cheap as one for a rare word;
+  * a TransactionFilter (filters.py) restricts the results the same way it
+    restricts the rest of the page.
+
+Databases whose SQLite has no FTS5 fall back to a LIKE scan.
+"""
+import re
+
+import pandas as pd
+
+from filters import filter_conditions, where_clause
+
+
+DEFAULT_LIMIT = 50
+RANK_WINDOW = 500  # most recently added matches that are ranked
+
+RESULT_COLUMNS = ['id', 'date', 'type', 'category', 'description', 'amount']
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def match_query(text):
+    """User input -> FTS5 MATCH expression (None if there is nothing to search for).
+
+    Each word is quoted, so FTS5 operators and punctuation in the input are
+    taken literally, and matches as a prefix.
+    """
+    words = _WORD.findall(text or "")
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def fts_available(conn):
+    """True if the database has the full-text index"""
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'transactions_fts'").fetchone()
+    return row is not None
+
+
+def search_transactions(conn, text, limit=DEFAULT_LIMIT, transaction_filter=None):
+    """Best ``limit`` matches for ``text`` as a DataFrame (RESULT_COLUMNS), best first"""
+    query = match_query(text)
+    if query is None:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+
+    conditions, params = filter_conditions(transaction_filter)
+    # amount from amount_cents: SQLite hands back the generated REAL column as
+    # an int for whole amounts once the rows have been through a sort
+    columns = "t.id, t.date, t.type, t.category, t.description, t.amount_cents / 100.0 as amount"
+    if fts_available(conn):
+        matching = ""
+        if conditions:
+            matching = (f"JOIN (SELECT id FROM transactions {where_clause(conditions)}) matching "
+                        "ON matching.id = transactions_fts.rowid")
+        # Only the RANK_WINDOW most recently added matches are ranked: scoring every match of
+        # a common word ("coffee" in 60k rows) would cost ~100 ms. The filter
+        # goes in a subquery on transactions so its column names are not
+        # confused with the FTS table's ``category`` column.
+        sql = f'''
+            SELECT {columns}
+            FROM (
+                SELECT transactions_fts.rowid as id, transactions_fts.rank as rank
+                FROM transactions_fts
+                {matching}
+                WHERE transactions_fts MATCH ?
+                ORDER BY transactions_fts.rowid DESC
+                LIMIT ?
+            ) candidates
+            JOIN transactions t ON t.id = candidates.id
+            ORDER BY candidates.rank, t.date DESC, t.id DESC
+            LIMIT ?
+        '''
+        params.extend([query, RANK_WINDOW, limit])
+    else:
+        for word in _WORD.findall(text):
+            conditions.append("(description LIKE ? OR category LIKE ?)")
+            params.extend([f"%{word}%", f"%{word}%"])
+        sql = f'''
+            SELECT {columns}
+            FROM transactions t
+            {where_clause(conditions)}
+            ORDER BY t.date DESC, t.id DESC
+            LIMIT ?
+        '''
+        params.append(limit)
+
+    rows = conn.execute(sql, params).fetchall()
+    return pd.DataFrame([tuple(row) for row in rows], columns=RESULT_COLUMNS)
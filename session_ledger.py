@@ -0,0 +1,44 @@
+"""Per-session ledger behind E-App.py's default 'memory' storage engine.
+
+E-App used to keep its transactions in a DataFrame and add each new row
+with ``pd.concat``, which copies the whole frame, so loading N rows cost
+O(N^2). Deleting several checked rows called ``drop`` + ``reset_index`` once
+per row, and after the first drop the remaining positions pointed at the
+wrong rows.
+
+SessionLedger is a ColumnarLedger (typed arrays that grow by doubling, so
+appends are amortized O(1)). Every row has a stable id, and delete() removes
+a set of ids in one pass. The history table is built from the arrays when
+needed; the totals come from storage_engines.MemoryEngine, like every
+other engine's.
+"""
+import numpy as np
+import pandas as pd
+
+from columnar_ledger import ColumnarLedger
+from money import MINOR_UNITS
+
+
+DISPLAY_COLUMNS = ['ID', 'Date', 'Category', 'Description', 'Amount', 'Type']
+
+
+class SessionLedger(ColumnarLedger):
+    """ColumnarLedger + the history table E-App displays"""
+
+    def __init__(self, capacity=256):
+        super().__init__(capacity=capacity)
+
+    # -----------------------------
+    # Display
+    # -----------------------------
+    def to_frame(self):
+        """Rows for the history table and CSV export (dates as ISO text)"""
+        data = self.columns()
+        return pd.DataFrame({
+            'ID': data['id'],
+            'Date': np.datetime_as_string(data['day'].astype('datetime64[D]')),
+            'Category': pd.Categorical.from_codes(data['category'], self.categories.values),
+            'Description': pd.Categorical.from_codes(data['description'], self.descriptions.values),
+            'Amount': data['amount'] / MINOR_UNITS,
+            'Type': pd.Categorical.from_codes(data['type'], self.types.values),
+        }, columns=DISPLAY_COLUMNS)
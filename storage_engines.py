@@ -0,0 +1,511 @@
+"""One storage interface for the trackers, with interchangeable engines.
+
+The four front-ends grew their own storage: ExpensesApp.py and
+Expense_App.py keep ``expenses.json`` (snapshot + journal), E_APP1.py keeps
+``expenses.db`` (SQLite) and E-App.py keeps typed columns in session state.
+Every engine here stores the same records behind the same methods, so one
+workload can be run against each (benchmarks/bench_storage.py) and data can
+be moved from one to another in bulk (migrate(), or this module as a CLI):
+
+    json     expenses.json as one JSON list, rewritten on every change
+    journal  expenses.json + expenses.json.log (expense_ledger.py): one
+             appended line per change, totals kept up to date as it goes
+    sqlite   expenses.db with the E_APP1 schema (migrations.py): totals read
+             from the trigger-maintained rollup table
+    memory   typed NumPy columns (columnar_ledger.py): fastest, but gone
+             when the process exits
+
+A record is a dict with ``date`` ('YYYY-MM-DD'), ``category``,
+``description``, ``amount`` (major units, rounded to the cent) and ``type``
+('Expense' or 'Income'). The JSON files keep the apps' own shape: expenses
+are written without a type, and a missing type reads back as 'Expense'.
+entries() pairs each record with the id delete() takes: the row id for
+sqlite and memory. The JSON files store no ids, so there it is the
+record's position plus a digest of its content ('12:9f3a...'); delete()
+finds the record again if other writers moved it and skips it if it was
+changed or deleted, instead of removing whatever is now at that position.
+
+E-App.py picks its engine from the EXPENSES_STORAGE environment variable
+(an open_engine() spec, default 'memory'), e.g.
+``EXPENSES_STORAGE=sqlite:expenses.db streamlit run E-App.py``.
+
+Usage:
+    python storage_engines.py json:expenses.json sqlite:expenses.db
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from itertools import islice
+
+from expense_journal import _atomic_write, _file_id
+from file_lock import FileLock
+from money import from_cents, to_cents
+
+
+DEFAULT_BATCH_SIZE = 10_000
+
+DEFAULT_PATHS = {
+    "json": "expenses.json",
+    "journal": "expenses.json",
+    "sqlite": "expenses.db",
+}
+
+
+def normalize(record):
+    """A record in any of the apps' shapes (E-App capitalizes its keys) -> the common shape"""
+    record = {str(key).lower(): value for key, value in record.items()}
+    return {
+        "date": str(record["date"])[:10],
+        "category": record["category"],
+        "description": record.get("description", ""),
+        "amount": from_cents(to_cents(record["amount"])),
+        "type": record.get("type") or "Expense",
+    }
+
+
+def _to_json(record):
+    """Common record -> what the JSON apps store (no type for expenses)"""
+    record = dict(record)
+    if record["type"] == "Expense":
+        del record["type"]
+    return record
+
+
+def _digest(expense):
+    return hashlib.sha1(json.dumps(expense, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+def _json_entries(expenses):
+    """(id, record) pairs of a JSON list: the id is 'position:digest'"""
+    return ((f"{position}:{_digest(expense)}", normalize(expense)) for position, expense in enumerate(expenses))
+
+
+def _locate_json_ids(expenses, ids):
+    """Current positions of the records named by _json_entries() ids; records no longer there are skipped"""
+    positions = set()
+    digests = None
+    for entry_id in ids:
+        position, _, digest = str(entry_id).partition(":")
+        position = int(position)
+        if 0 <= position < len(expenses) and position not in positions and _digest(expenses[position]) == digest:
+            positions.add(position)
+            continue
+        # Moved by another writer (or never there): look for it by content
+        if digests is None:
+            digests = [_digest(expense) for expense in expenses]
+        for index, candidate in enumerate(digests):
+            if candidate == digest and index not in positions:
+                positions.add(index)
+                break
+    return positions
+
+
+class StorageEngine(ABC):
+    """Base class: every engine implements add_many(), records() and delete().
+
+    The totals here scan every record; engines that keep totals (journal,
+    sqlite) or can compute them vectorized (memory) override them.
+    """
+    name = None
+    persistent = True
+
+    def add(self, record):
+        self.add_many([record])
+
+    @abstractmethod
+    def add_many(self, records):
+        """Store records (any shape normalize() accepts) as one write"""
+
+    @abstractmethod
+    def records(self):
+        """Iterator over every record in the common shape, oldest first"""
+
+    def entries(self):
+        """(id, record) pairs, oldest first"""
+        return enumerate(self.records())
+
+    @abstractmethod
+    def delete(self, ids):
+        """Remove the records with the given entries() ids as one write; returns the number removed"""
+
+    def clear(self):
+        self.delete([entry_id for entry_id, _ in self.entries()])
+
+    def count(self):
+        return sum(1 for _ in self.records())
+
+    def to_frame(self):
+        """DataFrame of entries(): id, date, category, description, amount, type"""
+        import pandas as pd
+
+        return pd.DataFrame([{"id": entry_id, **record} for entry_id, record in self.entries()],
+                            columns=["id", "date", "category", "description", "amount", "type"])
+
+    def _scan_totals(self):
+        income, expenses, categories, months = 0, 0, {}, {"Expense": {}, "Income": {}}
+        for record in self.records():
+            cents = to_cents(record["amount"])
+            month = record["date"][:7]
+            by_month = months.setdefault(record["type"], {})
+            by_month[month] = by_month.get(month, 0) + cents
+            if record["type"] == "Income":
+                income += cents
+                continue
+            expenses += cents
+            categories[record["category"]] = categories.get(record["category"], 0) + cents
+        return income, expenses, categories, months
+
+    def summary(self):
+        """(total income, total expenses, balance)"""
+        income, expenses, _, _ = self._scan_totals()
+        return from_cents(income), from_cents(expenses), from_cents(income - expenses)
+
+    def category_totals(self):
+        """{category: expense total}"""
+        _, _, categories, _ = self._scan_totals()
+        return {category: from_cents(cents) for category, cents in categories.items()}
+
+    def month_totals(self, trans_type="Expense"):
+        """{'YYYY-MM': total of ``trans_type``}, oldest month first"""
+        _, _, _, months = self._scan_totals()
+        months = months.get(trans_type, {})
+        return {month: from_cents(months[month]) for month in sorted(months)}
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# -----------------------------
+# Engines
+# -----------------------------
+class JsonEngine(StorageEngine):
+    """expenses.json as one JSON list, rewritten (atomically, under a file lock) on every write"""
+    name = "json"
+
+    def __init__(self, path=DEFAULT_PATHS["json"]):
+        self.path = path
+        self._file_lock = FileLock(f"{path}.lock")
+        self._expenses = []
+        self._seen = False  # _file_id of the file we last read or wrote
+        with self._file_lock:
+            self._reload()
+
+    def _reload(self):
+        """Re-read the file if another writer replaced it"""
+        file_id = _file_id(self.path)
+        if file_id == self._seen:
+            return
+        try:
+            with open(self.path, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            data = b""
+        self._expenses = json.loads(data) if data.strip() else []
+        self._seen = file_id
+
+    def add_many(self, records):
+        with self._file_lock:
+            self._reload()
+            self._write(self._expenses + [_to_json(normalize(record)) for record in records])
+
+    def records(self):
+        with self._file_lock:
+            self._reload()
+            expenses = list(self._expenses)
+        return (normalize(expense) for expense in expenses)
+
+    def _write(self, expenses):
+        _atomic_write(self.path, json.dumps(expenses, indent=4).encode("utf-8"))
+        self._expenses = expenses
+        self._seen = _file_id(self.path)
+
+    def entries(self):
+        with self._file_lock:
+            self._reload()
+            expenses = list(self._expenses)
+        return _json_entries(expenses)
+
+    def delete(self, ids):
+        with self._file_lock:
+            self._reload()
+            positions = _locate_json_ids(self._expenses, ids)
+            if positions:
+                self._write([expense for index, expense in enumerate(self._expenses) if index not in positions])
+            return len(positions)
+
+    def clear(self):
+        with self._file_lock:
+            self._write([])
+
+    def count(self):
+        with self._file_lock:
+            self._reload()
+            return len(self._expenses)
+
+
+class JournalEngine(StorageEngine):
+    """Snapshot + append-only log with running totals (the JSON apps' current storage)"""
+    name = "journal"
+
+    def __init__(self, path=DEFAULT_PATHS["journal"], **kwargs):
+        # Imported here: the JSON engine and the CLI's other engines don't need it
+        from expense_ledger import ExpenseLedger
+
+        self.ledger = ExpenseLedger(path, **kwargs)
+        self.ledger.load()
+
+    def add_many(self, records):
+        self.ledger.add_many([_to_json(normalize(record)) for record in records])
+
+    def records(self):
+        with self.ledger.lock:
+            expenses = list(self.ledger.refresh())
+        return (normalize(expense) for expense in expenses)
+
+    def entries(self):
+        with self.ledger.lock:
+            expenses = list(self.ledger.refresh())
+        return _json_entries(expenses)
+
+    def delete(self, ids):
+        with self.ledger.lock:
+            return self.ledger.delete_many(_locate_json_ids(self.ledger.refresh(), ids))
+
+    def count(self):
+        with self.ledger.lock:
+            return len(self.ledger.refresh())
+
+    def summary(self):
+        with self.ledger.lock:
+            self.ledger.refresh()
+            return (self.ledger.income, self.ledger.total,
+                    from_cents(self.ledger.income_cents - self.ledger.total_cents))
+
+    def category_totals(self):
+        with self.ledger.lock:
+            self.ledger.refresh()
+            return self.ledger.category_totals
+
+    def month_totals(self, trans_type="Expense"):
+        if trans_type != "Expense":
+            # The ledger only keeps expense totals per month
+            return super().month_totals(trans_type)
+        with self.ledger.lock:
+            self.ledger.refresh()
+            return dict(sorted(self.ledger.month_totals.items()))
+
+    def close(self):
+        self.ledger.compact()
+
+
+class SqliteEngine(StorageEngine):
+    """The E_APP1 database: one transaction per add_many(), totals from transaction_rollup"""
+    name = "sqlite"
+
+    INSERT_SQL = ("INSERT INTO transactions (date, category, description, amount_cents, type) "
+                  "VALUES (?, ?, ?, ?, ?)")
+
+    def __init__(self, path=DEFAULT_PATHS["sqlite"]):
+        from db_pool import get_pool
+        from migrations import run_migrations
+
+        self.pool = get_pool(path)
+        with self.pool.connection() as conn:
+            run_migrations(conn)
+
+    def add_many(self, records):
+        rows = []
+        for record in records:
+            record = normalize(record)
+            rows.append((record["date"], record["category"], record["description"],
+                         to_cents(record["amount"]), record["type"]))
+        with self.pool.connection() as conn:
+            conn.executemany(self.INSERT_SQL, rows)
+            conn.commit()
+
+    def records(self):
+        return (record for _, record in self.entries())
+
+    def entries(self):
+        with self.pool.connection() as conn:
+            cursor = conn.execute("SELECT id, date, category, description, amount_cents, type "
+                                  "FROM transactions ORDER BY id")
+            while True:
+                rows = cursor.fetchmany(DEFAULT_BATCH_SIZE)
+                if not rows:
+                    break
+                for row_id, date, category, description, amount_cents, trans_type in rows:
+                    yield row_id, {"date": str(date)[:10], "category": category, "description": description,
+                                   "amount": from_cents(amount_cents), "type": trans_type}
+
+    def delete(self, ids):
+        with self.pool.connection() as conn:
+            removed = conn.executemany("DELETE FROM transactions WHERE id = ?",
+                                       [(int(row_id),) for row_id in ids]).rowcount
+            conn.commit()
+        return removed
+
+    def clear(self):
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM transactions")
+            conn.commit()
+
+    def count(self):
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+
+    def summary(self):
+        with self.pool.connection() as conn:
+            totals = dict(conn.execute("SELECT type, SUM(total_cents) FROM transaction_rollup "
+                                       "GROUP BY type").fetchall())
+        income, expenses = totals.get("Income") or 0, totals.get("Expense") or 0
+        return from_cents(income), from_cents(expenses), from_cents(income - expenses)
+
+    def _rollup_totals(self, column, trans_type="Expense"):
+        with self.pool.connection() as conn:
+            rows = conn.execute(f'''
+                SELECT {column}, SUM(total_cents) FROM transaction_rollup
+                WHERE type = ? AND transaction_count > 0
+                GROUP BY {column} ORDER BY {column}
+            ''', (trans_type,)).fetchall()
+        return {key: from_cents(cents) for key, cents in rows}
+
+    def category_totals(self):
+        return self._rollup_totals("category")
+
+    def month_totals(self, trans_type="Expense"):
+        return self._rollup_totals("year_month", trans_type)
+
+    def close(self):
+        self.pool.close_all()
+
+
+class MemoryEngine(StorageEngine):
+    """Typed columns in RAM (E-App's default); nothing is written to disk"""
+    name = "memory"
+    persistent = False
+
+    def __init__(self, path=None):
+        from session_ledger import SessionLedger
+
+        self.ledger = SessionLedger()
+        self._lock = threading.Lock()
+
+    def add_many(self, records):
+        records = [normalize(record) for record in records]
+        with self._lock:
+            self.ledger.extend([r["date"] for r in records], [r["category"] for r in records],
+                               [r["description"] for r in records], [r["amount"] for r in records],
+                               [r["type"] for r in records])
+
+    def records(self):
+        return (record for _, record in self.entries())
+
+    def entries(self):
+        with self._lock:
+            rows = self.ledger.to_records()
+        return ((row["id"], normalize(row)) for row in rows)
+
+    def delete(self, ids):
+        with self._lock:
+            return self.ledger.delete(ids)
+
+    def clear(self):
+        with self._lock:
+            self.ledger.clear()
+
+    def count(self):
+        return len(self.ledger)
+
+    def to_frame(self):
+        with self._lock:
+            return self.ledger.to_frame().rename(columns=str.lower)
+
+    def summary(self):
+        with self._lock:
+            income = self.ledger.total_minor(self.ledger.mask(trans_type="Income"))
+            expenses = self.ledger.total_minor(self.ledger.mask(trans_type="Expense"))
+        return from_cents(income), from_cents(expenses), from_cents(income - expenses)
+
+    def category_totals(self):
+        with self._lock:
+            return self.ledger.totals_by_category(self.ledger.mask(trans_type="Expense"))
+
+    def month_totals(self, trans_type="Expense"):
+        with self._lock:
+            return self.ledger.totals_by_month(self.ledger.mask(trans_type=trans_type))
+
+
+ENGINES = {engine.name: engine for engine in (JsonEngine, JournalEngine, SqliteEngine, MemoryEngine)}
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def open_engine(spec, **kwargs):
+    """'sqlite:expenses.db', 'journal:other.json', 'memory', or just 'json' (default file)"""
+    name, _, path = spec.partition(":")
+    if name not in ENGINES:
+        raise ValueError(f"unknown storage engine {name!r} (choose from {', '.join(ENGINES)})")
+    return ENGINES[name](path or DEFAULT_PATHS.get(name), **kwargs)
+
+
+def shared_engine(spec):
+    """One open engine per spec for the whole process; a memory engine is never shared (one per caller)"""
+    if not ENGINES.get(spec.partition(":")[0], MemoryEngine).persistent:
+        return open_engine(spec)
+    with _shared_lock:
+        engine = _shared.get(spec)
+        if engine is None:
+            engine = _shared[spec] = open_engine(spec)
+        return engine
+
+
+# -----------------------------
+# Bulk migration
+# -----------------------------
+def migrate(source, target, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """Copy every record of ``source`` into ``target``, ``batch_size`` records per write.
+
+    Returns the number of records copied. ``progress(copied)`` is called
+    after each batch.
+    """
+    copied = 0
+    records = source.records()
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+        target.add_many(batch)
+        copied += len(batch)
+        if progress is not None:
+            progress(copied)
+    return copied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy expense records from one storage engine to another")
+    parser.add_argument("source", help="e.g. json:expenses.json")
+    parser.add_argument("target", help="e.g. sqlite:expenses.db")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with open_engine(args.source) as source, open_engine(args.target) as target:
+        copied = migrate(source, target, args.batch_size,
+                         progress=lambda copied: print(f"\r{copied:,} records", end="", flush=True))
+        elapsed = time.perf_counter() - started
+        print(f"\r{copied:,} records copied in {elapsed:.2f}s; {args.target} now holds {target.count():,}")
+
+
+if __name__ == "__main__":
+    main()
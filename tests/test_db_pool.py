@@ -0,0 +1,34 @@
+"""A failed statement returns its connection to the pool; a broken connection is dropped."""
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_pool import ConnectionPool  # noqa: E402
+
+
+def test_integrity_error_keeps_the_connection(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"))
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE categories (name TEXT UNIQUE)")
+        conn.execute("INSERT INTO categories VALUES ('Food')")
+        conn.commit()
+    for _ in range(3):
+        with pytest.raises(sqlite3.IntegrityError):
+            with pool.connection() as conn:
+                conn.execute("INSERT INTO categories VALUES ('Food')")
+    stats = pool.stats()
+    assert (stats["created"], stats["closed"], stats["idle"]) == (1, 0, 1)
+
+
+def test_closed_connection_is_discarded(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"))
+    with pytest.raises(sqlite3.ProgrammingError):
+        with pool.connection() as conn:
+            conn.close()
+            conn.execute("SELECT 1")
+    stats = pool.stats()
+    assert (stats["closed"], stats["idle"], stats["checked_out"]) == (1, 0, 0)
@@ -0,0 +1,35 @@
+"""A bad cell is one invalid row and a bad header is a clean error, never an exception."""
+import io
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from importer import import_stream  # noqa: E402
+from migrations import run_migrations  # noqa: E402
+
+
+def _database():
+    conn = sqlite3.connect(":memory:")
+    run_migrations(conn)
+    return conn
+
+
+def test_bad_debit_cell_is_one_invalid_row():
+    conn = _database()
+    statement = ("Date,Description,Debit,Credit\n"
+                 "2024-01-01,Lunch,12.50,\n"
+                 "2024-01-02,Refund,n/a,\n"
+                 "2024-01-03,Salary,,3000\n")
+    report = import_stream(conn, io.StringIO(statement), batch_size=1)
+    assert (report.rows_read, report.inserted, report.invalid, report.error) == (3, 2, 1, None)
+    assert "n/a" in report.errors[0]
+    assert conn.execute("SELECT type, amount_cents FROM transactions ORDER BY date").fetchall() == \
+        [("Expense", 1250), ("Income", 300000)]
+
+
+def test_missing_amount_column_is_reported():
+    report = import_stream(_database(), io.StringIO("Date,Description\n2024-01-01,Lunch\n"))
+    assert report.inserted == 0
+    assert "amount" in report.error
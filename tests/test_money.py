@@ -0,0 +1,44 @@
+"""Every path that turns an amount into cents must round the same way (half up on the shortest decimal form)."""
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from columnar_ledger import ColumnarLedger  # noqa: E402
+from migrations import run_migrations  # noqa: E402
+from money import to_cents, to_cents_array  # noqa: E402
+
+# amount -> cents; the binary product x * 100 of the first ones sits just
+# below (1.005, 2.675) or exactly on (0.125) the half cent
+CASES = {1.005: 101, 0.125: 13, 2.675: 268, 0.375: 38, -0.125: -13, 12.345: 1235, 0.1: 10, 19.99: 1999}
+
+
+def test_to_cents_rounds_half_up():
+    assert [to_cents(amount) for amount in CASES] == list(CASES.values())
+
+
+def test_to_cents_array_matches_to_cents():
+    assert to_cents_array(list(CASES)).tolist() == list(CASES.values())
+
+
+def test_columnar_ledger_append_and_extend_agree():
+    single, bulk = ColumnarLedger(), ColumnarLedger()
+    for amount in CASES:
+        single.append("2024-01-01", "Food", "", amount, "Expense")
+    bulk.extend(["2024-01-01"] * len(CASES), ["Food"] * len(CASES), [""] * len(CASES), list(CASES),
+                ["Expense"] * len(CASES))
+    assert single.column("amount").tolist() == bulk.column("amount").tolist() == list(CASES.values())
+
+
+def test_cents_migration_matches_to_cents():
+    conn = sqlite3.connect(":memory:")
+    run_migrations(conn, target=5)
+    conn.executemany("INSERT INTO transactions (date, category, description, amount, type) "
+                     "VALUES ('2024-01-01', 'Food', '', ?, 'Expense')", [(amount,) for amount in CASES])
+    conn.execute("INSERT INTO budgets (category, monthly_limit, year_month) VALUES ('Food', 1.005, '2024-01')")
+    conn.commit()
+    run_migrations(conn)
+    assert [row[0] for row in conn.execute("SELECT amount_cents FROM transactions ORDER BY id")] == \
+        list(CASES.values())
+    assert conn.execute("SELECT limit_cents FROM budgets").fetchone()[0] == 101
@@ -0,0 +1,26 @@
+"""Deleting by entries() id removes the record the caller saw, even after other writers moved it."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage_engines  # noqa: E402
+
+
+@pytest.mark.parametrize("name", ["json", "journal", "sqlite", "memory"])
+def test_delete_after_another_session_changed_the_list(name, tmp_path):
+    spec = name if name == "memory" else f"{name}:{tmp_path / 'expenses'}"
+    mine = storage_engines.open_engine(spec)
+    other = mine if name == "memory" else storage_engines.open_engine(spec)
+    mine.add_many([{"date": f"2024-01-0{day}", "category": "Food", "description": f"d{day}", "amount": day}
+                   for day in range(1, 6)])
+    seen = {record["description"]: entry_id for entry_id, record in mine.entries()}
+
+    other.delete([entry_id for entry_id, record in other.entries() if record["description"] in ("d1", "d2")])
+    other.add({"date": "2024-02-01", "category": "Food", "description": "new", "amount": 9})
+
+    # d4 moved, d2 is already gone
+    assert mine.delete([seen["d4"], seen["d2"]]) == 1
+    assert [record["description"] for record in mine.records()] == ["d3", "d5", "new"]
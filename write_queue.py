@@ -0,0 +1,313 @@
+"""Write-behind queue: form submits hand rows to a worker thread.
+
+Each save used to open a transaction, insert one row and commit, with its
+own fsync, before the page could continue. When several entries (or
+several users) arrive together they queue up behind each other's disk
+flushes. A WriteQueue takes every write through a sink on one background
+thread. Whatever has arrived while the previous commit was running is
+written together in the next transaction, so a burst costs one commit
+instead of one per row (group commit).
+
+Durability levels (the apps read the ``WRITE_DURABILITY`` env var):
+    sync    no queue: the write commits in the caller's thread (the default,
+            same behaviour as before)
+    group   the caller still waits until its row is committed, but rows that
+            arrive together share one commit
+    async   the caller returns at once and the row is committed a moment
+            later. A crash (not a normal exit) can lose the rows still queued.
+
+Read-your-writes: queued rows are tracked per session, so a page can show
+its own not-yet-committed rows (pending()) and report failed async writes
+(take_failures()).
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+
+SYNC = "sync"
+GROUP = "group"
+ASYNC = "async"
+DURABILITY_LEVELS = (SYNC, GROUP, ASYNC)
+
+DEFAULT_MAX_BATCH = 1000
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def durability_from_env(default=SYNC):
+    """Durability level from the WRITE_DURABILITY env var (falls back to ``default``)"""
+    value = os.environ.get("WRITE_DURABILITY", default).strip().lower()
+    return value if value in DURABILITY_LEVELS else default
+
+
+class WriteTicket:
+    """One queued write: wait() for it, or check done / result / error"""
+
+    def __init__(self, record, session=None):
+        self.record = record
+        self.session = session
+        self.result = None
+        self.error = None
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block until committed. Returns the sink's result, or raises the write error"""
+        if not self._done.wait(timeout):
+            raise TimeoutError("write not committed yet")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def _finish(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self._done.set()
+
+
+# -----------------------------
+# Sinks: where a batch is written
+# -----------------------------
+class SQLiteSink:
+    """Runs one INSERT per record inside a single transaction per batch"""
+
+    def __init__(self, pool, statement):
+        self.pool = pool
+        self.statement = statement
+
+    def write_batch(self, records):
+        """Insert the rows; returns their ids"""
+        with self.pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                ids = [conn.execute(self.statement, record).lastrowid for record in records]
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return ids
+
+
+class JournalSink:
+    """Appends expenses to an ExpenseJournal with one log write + fsync per batch"""
+
+    def __init__(self, journal):
+        self.journal = journal
+
+    def write_batch(self, records):
+        # add_many() locks the files and catches up with other writers first
+        self.journal.add_many(records)
+        return [None] * len(records)
+
+
+# -----------------------------
+# Queue
+# -----------------------------
+class WriteQueue:
+    """Funnels writes through ``sink.write_batch`` with group commits.
+
+    ``max_delay`` (seconds) makes the worker wait a little for more rows
+    before committing. 0 only groups what arrived during the previous
+    commit. ``on_commit`` is called after every successful batch (e.g.
+    bump_data_version).
+    """
+
+    def __init__(self, sink, durability=GROUP, max_batch=DEFAULT_MAX_BATCH, max_delay=0.0, on_commit=None):
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"unknown durability {durability!r}; expected one of {DURABILITY_LEVELS}")
+        self.sink = sink
+        self.durability = durability
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.on_commit = on_commit
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = {}   # session -> [WriteTicket] not committed yet
+        self._failed = {}    # session -> [WriteTicket] failed, not yet reported
+        self._thread = None
+        self._closed = False
+        self._stats = {"submitted": 0, "committed": 0, "failed": 0, "batches": 0, "largest_batch": 0}
+
+    def submit(self, record, session=None):
+        """Queue one record. Returns its WriteTicket (already finished unless durability is async)"""
+        ticket = WriteTicket(record, session)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("write queue is closed")
+            self._stats["submitted"] += 1
+            if self.durability != SYNC:
+                self._pending.setdefault(session, []).append(ticket)
+                self._start_worker()
+
+        if self.durability == SYNC:
+            self._write([ticket])
+        else:
+            self._queue.put(ticket)
+        if self.durability != ASYNC:
+            ticket.wait()
+        return ticket
+
+    # -----------------------------
+    # Read-your-writes
+    # -----------------------------
+    def pending(self, session=None):
+        """Records queued by ``session`` that are not committed yet (oldest first)"""
+        with self._lock:
+            return [ticket.record for ticket in self._pending.get(session, ()) if not ticket.done]
+
+    def take_failures(self, session=None):
+        """Failed tickets of ``session`` since the last call"""
+        with self._lock:
+            return self._failed.pop(session, [])
+
+    def flush(self):
+        """Block until everything submitted so far has been written"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        """Write what is queued and stop the worker"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["queued"] = sum(1 for tickets in self._pending.values() for t in tickets if not t.done)
+        stats["durability"] = self.durability
+        return stats
+
+    # -----------------------------
+    # Worker
+    # -----------------------------
+    def _start_worker(self):
+        # Called with self._lock held
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="write-queue", daemon=True)
+            self._thread.start()
+
+    def _next_batch(self):
+        """Wait for one ticket, then take what else is queued (up to max_batch).
+
+        Returns (batch, stop)
+        """
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.monotonic()
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.task_done()
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        while True:
+            batch, stop = self._next_batch()
+            if batch:
+                try:
+                    self._write(batch)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+            else:
+                self._queue.task_done()
+            if stop:
+                break
+
+    def _write(self, batch):
+        try:
+            results = self.sink.write_batch([ticket.record for ticket in batch])
+        except Exception as exc:
+            error = exc
+        else:
+            if self.on_commit is not None:
+                self.on_commit()
+            self._finish(batch, results=results)
+            return
+
+        if len(batch) > 1:
+            # One bad row must not fail everybody else's: retry one by one
+            for ticket in batch:
+                self._write([ticket])
+        else:
+            logger.warning("write failed: %r (%s)", batch[0].record, error)
+            self._finish(batch, error=error)
+
+    def _finish(self, batch, results=None, error=None):
+        with self._lock:
+            if error is None:
+                self._stats["committed"] += len(batch)
+                self._stats["batches"] += 1
+                self._stats["largest_batch"] = max(self._stats["largest_batch"], len(batch))
+            else:
+                self._stats["failed"] += len(batch)
+            for i, ticket in enumerate(batch):
+                if error is None:
+                    ticket._finish(result=results[i])
+                else:
+                    ticket._finish(error=error)
+                    if self.durability == ASYNC:
+                        self._failed.setdefault(ticket.session, []).append(ticket)
+                tickets = self._pending.get(ticket.session)
+                if tickets is not None:
+                    try:
+                        tickets.remove(ticket)
+                    except ValueError:
+                        pass
+                    if not tickets:
+                        del self._pending[ticket.session]
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_write_queue(key, make_sink, **kwargs):
+    """Return the shared queue for ``key``, creating it (with make_sink()) on first use.
+
+    Streamlit re-executes the page script on every rerun, so the queue (and
+    its worker thread) lives here rather than in the page module.
+    """
+    with _queues_lock:
+        write_queue = _queues.get(key)
+        if write_queue is None:
+            write_queue = WriteQueue(make_sink(), **kwargs)
+            _queues[key] = write_queue
+        return write_queue
+
+
+def queue_stats():
+    with _queues_lock:
+        return {key: write_queue.stats() for key, write_queue in _queues.items()}
+
+
+@atexit.register
+def close_all_queues():
+    """Write everything still queued (runs at interpreter exit)"""
+    with _queues_lock:
+        queues = list(_queues.values())
+    for write_queue in queues:
+        write_queue.close()